@@ -0,0 +1,62 @@
+"""Benchmark: cashflow_date row-wise (apply) vs ledger.hitung_cashflow_date (vektor).
+
+Jalankan dari root repo:  python benchmarks/bench_cashflow.py
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import ledger  # noqa: E402
+
+
+def cashflow_date(row):
+    """Versi lama (per baris) sebagai pembanding"""
+    if row["Kategori"]=="Scheduled Settlement" and row["Status"]=="Cleared":
+        if pd.notna(row["Tanggal_Bayar"]) and str(row["Tanggal_Bayar"]).strip():
+            return row["Tanggal_Bayar"]
+    return row["Tanggal"]
+
+
+def buat_ledger(n, seed=0):
+    rng = np.random.default_rng(seed)
+    tanggal = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 800, n), unit="D")
+    bayar = (tanggal + pd.to_timedelta(rng.integers(0, 30, n), unit="D")).strftime("%Y-%m-%d").to_numpy(dtype=object)
+    bayar[rng.random(n) < 0.3] = ""
+    bayar[rng.random(n) < 0.1] = None
+    return pd.DataFrame({
+        "Tanggal": tanggal.strftime("%Y-%m-%d"),
+        "Tipe": rng.choice(["Pengeluaran", "Pemasukan"], n),
+        "Kategori": rng.choice(["Makan (Sahur/Buka)", "Scheduled Settlement", "Bensin / Mobilitas"], n),
+        "Nominal": rng.integers(1, 500, n) * 1000,
+        "Status": rng.choice(["Cleared", "Pending"], n),
+        "Tanggal_Bayar": bayar,
+    })
+
+
+def ukur(fungsi, ulang=3):
+    terbaik = float("inf")
+    for _ in range(ulang):
+        mulai = time.perf_counter()
+        hasil = fungsi()
+        terbaik = min(terbaik, time.perf_counter() - mulai)
+    return terbaik, hasil
+
+
+def main():
+    print(f"{'baris':>8} {'apply (s)':>10} {'vektor (s)':>11} {'speed-up':>9}")
+    for n in [1_000, 10_000, 50_000, 200_000]:
+        df = buat_ledger(n)
+
+        t_lama, dt_lama = ukur(lambda: pd.to_datetime(df.apply(cashflow_date, axis=1), errors="coerce"))
+        t_baru, (_, dt_baru) = ukur(lambda: ledger.hitung_cashflow_date(df))
+
+        pd.testing.assert_series_equal(dt_lama, dt_baru, check_names=False)
+        print(f"{n:>8} {t_lama:>10.4f} {t_baru:>11.4f} {t_lama / t_baru:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark: fetch RFC822 per email (versi lama) vs FETCH batch header + part teks (mandiri_imap),
+plus scan ulang dengan cache parse per Message-ID (mandiri_cache) yang sudah terisi.
+
+Server IMAP lokal (benchmarks/imap_lokal.py) menyajikan beberapa ribu email sintetis
+ala Livin' Mandiri (text/plain + text/html + lampiran, ~10% transaksi gagal).
+
+Jalankan dari root repo:  python benchmarks/bench_imap.py [jumlah_email]
+"""
+import email
+import imaplib
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import mandiri_imap  # noqa: E402
+import mandiri_parser  # noqa: E402
+from imap_lokal import PENGIRIM, ServerImap, buat_email_mandiri  # noqa: E402
+
+
+def fetch_lama(mail, limit):
+    """Versi lama: SEARCH, lalu satu round trip RFC822 per email + walk semua part"""
+    results = []
+    mail.select("inbox")
+    _, data = mail.search(None, f'FROM "{PENGIRIM}"')
+    for eid in data[0].split()[-limit:][::-1]:
+        _, msg_data = mail.fetch(eid, "(RFC822)")
+        msg = email.message_from_bytes(msg_data[0][1])
+        subject = mandiri_imap._subject(msg)
+        if any(k in subject for k in mandiri_imap.SUBJECT_GAGAL):
+            continue
+        body = ""
+        body_html = ""
+        for part in msg.walk():
+            ct = part.get_content_type()
+            if ct == "text/plain":
+                body = part.get_payload(decode=True).decode("utf-8", errors="ignore")
+            elif ct == "text/html":
+                body_html = part.get_payload(decode=True).decode("utf-8", errors="ignore")
+        if not body.strip() and body_html:
+            body = mandiri_parser.html_ke_teks(body_html)
+        transaksi = mandiri_parser.parse_transaksi(subject, body)
+        if transaksi:
+            results.append(transaksi)
+    return results
+
+
+def ukur(srv, fungsi):
+    mail = imaplib.IMAP4("127.0.0.1", srv.port)
+    mail.login("kamu@gmail.com", "rahasia")
+    srv.byte_terkirim = 0
+    srv.perintah.clear()
+    t0 = time.perf_counter()
+    hasil = fungsi(mail)
+    dt = time.perf_counter() - t0
+    mail.logout()
+    fetch = sum(1 for p in srv.perintah if p.endswith("FETCH"))
+    return hasil, dt, srv.byte_terkirim, fetch
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    print(f"Membuat {n} email sintetis...")
+    pesan = buat_email_mandiri(n)
+
+    with ServerImap(pesan) as srv, tempfile.TemporaryDirectory() as tmp:
+        state = os.path.join(tmp, "state.json")
+        cache = os.path.join(tmp, "cache.sqlite")
+        lama, t_lama, b_lama, f_lama = ukur(srv, lambda m: fetch_lama(m, n))
+        baru, t_baru, b_baru, f_baru = ukur(
+            srv, lambda m: mandiri_imap.sinkron(m, "kamu@gmail.com", limit=n, full_rescan=True,
+                                                state_file=state, cache_file=cache)
+        )
+        # Klik kedua tanpa email baru: cuma SEARCH, nol FETCH
+        _, t_ulang, b_ulang, f_ulang = ukur(
+            srv, lambda m: mandiri_imap.sinkron(m, "kamu@gmail.com", limit=n, state_file=state, cache_file=cache)
+        )
+        # Scan ulang semua email: cache sudah terisi -> cuma FETCH header, tanpa body & parse
+        cached, t_cache, b_cache, f_cache = ukur(
+            srv, lambda m: mandiri_imap.sinkron(m, "kamu@gmail.com", limit=n, full_rescan=True,
+                                                state_file=state, cache_file=cache)
+        )
+
+    assert lama == baru == cached, "hasil parse berbeda"
+    print(f"{'':<28}{'waktu':>10}{'MB terkirim':>14}{'FETCH':>8}")
+    print(f"{'RFC822 per email (lama)':<28}{t_lama:>9.2f}s{b_lama / 1e6:>14.2f}{f_lama:>8}")
+    print(f"{'batch header + part teks':<28}{t_baru:>9.2f}s{b_baru / 1e6:>14.2f}{f_baru:>8}")
+    print(f"{'sinkron ulang (inkremental)':<28}{t_ulang:>9.2f}s{b_ulang / 1e6:>14.2f}{f_ulang:>8}")
+    print(f"{'scan ulang (cache parse)':<28}{t_cache:>9.2f}s{b_cache / 1e6:>14.2f}{f_cache:>8}")
+    print(f"{len(baru)} transaksi; {t_lama / t_baru:.1f}x lebih cepat, {b_lama / b_baru:.1f}x lebih sedikit byte")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Benchmark + regresi parser email Mandiri: regex berantai lama vs mandiri_parser.
+
+Body contoh (dianonimkan) + hasil yang diharapkan ada di benchmarks/corpus_mandiri.json;
+skrip ini gagal kalau parser baru tidak menghasilkan dict yang sama persis.
+
+Jalankan dari root repo:  python benchmarks/bench_parser.py
+"""
+import datetime
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import mandiri_parser  # noqa: E402
+
+CORPUS = Path(__file__).resolve().parent / "corpus_mandiri.json"
+
+
+def parse_lama(subject, body, today):
+    """Versi lama (regex berantai, pd.to_datetime per email) sebagai pembanding"""
+
+    nominal_match = re.search(r'Total\s*Transaksi\s*Rp\s*([\d.,]+)', body)
+    if not nominal_match:
+        nominal_match = re.search(r'Nominal\s*Transaksi\s*Rp\s*([\d.,]+)', body)
+    if not nominal_match:
+        nominal_match = re.search(r'Nominal\s*Top-?up\s*Rp\s*([\d.,]+)', body)
+    if not nominal_match:
+        nominal_match = re.search(r'Nominal\s*Transfer\s*Rp\s*([\d.,]+)', body)
+    if not nominal_match:
+        nominal_match = re.search(r'Rp\s*([\d.,]+)', body)
+    nominal = 0
+    if nominal_match:
+        nominal_str = nominal_match.group(1).replace('.', '').replace(',', '.')
+        try: nominal = int(float(nominal_str))
+        except: pass  # noqa: E722
+
+    tgl_match = re.search(r'Tanggal\s*(\d{1,2}\s+\w+\s+\d{4})', body)
+    if not tgl_match:
+        tgl_match = re.search(r'(\d{1,2}\s+(?:Jan|Feb|Mar|Apr|Mei|Jun|Jul|Agu|Sep|Okt|Nov|Des)\s+\d{4})', body)
+    if not tgl_match:
+        tgl_match = re.search(r'(\d{1,2}\s+(?:Januari|Februari|Maret|April|Mei|Juni|Juli|Agustus|September|Oktober|November|Desember)\s+\d{4})', body)
+    tanggal = str(today)
+    if tgl_match:
+        try:
+            raw_tgl = tgl_match.group(1)
+            bulan_map = {
+                "Januari":"Jan","Februari":"Feb","Maret":"Mar","April":"Apr",
+                "Mei":"May","Juni":"Jun","Juli":"Jul","Agustus":"Aug",
+                "September":"Sep","Oktober":"Oct","November":"Nov","Desember":"Dec",
+                "Agu":"Aug","Okt":"Oct","Des":"Dec"
+            }
+            for id_bln, en_bln in bulan_map.items():
+                raw_tgl = raw_tgl.replace(id_bln, en_bln)
+            tanggal = pd.to_datetime(raw_tgl, dayfirst=True).strftime("%Y-%m-%d")
+        except:  # noqa: E722
+            tanggal = str(today)
+
+    jam_match = re.search(r'(\d{2}:\d{2}:\d{2})\s*WIB', body)
+    if not jam_match:
+        jam_match = re.search(r'Jam\s*(\d{2}:\d{2}:\d{2})', body)
+    jam = jam_match.group(1) if jam_match else ""
+
+    penerima = "Mandiri Transaction"
+
+    penerima_match = re.search(
+        r'Penerima\s+"?(.*?)"?\s+[\w\s().,\-]*?\s*-\s*ID',
+        body, re.IGNORECASE | re.DOTALL
+    )
+    if penerima_match:
+        kandidat = penerima_match.group(1).strip()
+        if 2 < len(kandidat) < 80 and not any(k in kandidat for k in ["Tanggal","Nominal","Jam","Halo","Berikut"]):
+            penerima = kandidat
+
+    if penerima == "Mandiri Transaction":
+        penyedia_match = re.search(r'Penyedia\s*Jasa\s+([\w\s]+?)(?:\s*\*{4}\d+)', body)
+        if penyedia_match:
+            penerima = penyedia_match.group(1).strip()
+
+    if penerima == "Mandiri Transaction":
+        transfer_match = re.search(
+            r'(?:Tujuan|Kepada)\s+([A-Za-z0-9\s,.\-]{3,50}?)(?:\s{2,}|\d{10,})',
+            body
+        )
+        if transfer_match:
+            penerima = transfer_match.group(1).strip()
+
+    if penerima == "Mandiri Transaction":
+        fallback = re.search(
+            r'(?:Penerima|Penyedia\s*Jasa|Tujuan|Kepada)\s+"?([\w\s\',.\-&/()]{3,60}?)"?(?:\s*-\s*ID|\*{4}|\s{2,})',
+            body, re.IGNORECASE
+        )
+        if fallback:
+            penerima = fallback.group(1).strip()
+
+    penerima = re.sub(r'["\']', '', penerima)
+    penerima = re.sub(r'\s+', ' ', penerima).strip()
+
+    if any(k in subject for k in ["Pembayaran", "Debit", "Transfer Keluar", "Tarik", "Top-up", "Top Up"]):
+        tipe = "Pengeluaran"
+    elif any(k in subject for k in ["Kredit", "Transfer Masuk", "Terima", "Masuk"]):
+        tipe = "Pemasukan"
+    else:
+        tipe = "Pengeluaran"
+
+    if nominal <= 0:
+        return None
+    return {
+        "Tanggal": tanggal,
+        "Tipe": tipe,
+        "Kategori": "Lainnya",
+        "Nominal": nominal,
+        "Catatan": f"[{jam}] {penerima}" if jam else penerima,
+        "Status": "Cleared",
+        "Tanggal_Bayar": tanggal,
+        "subject": subject
+    }
+
+
+def throughput(fungsi, emails, today, ulang):
+    t0 = time.perf_counter()
+    for _ in range(ulang):
+        for e in emails:
+            fungsi(e["subject"], e["body"], today)
+    return ulang * len(emails) / (time.perf_counter() - t0)
+
+
+def main():
+    corpus = json.loads(CORPUS.read_text(encoding="utf-8"))
+    today = datetime.date.fromisoformat(corpus["today"])
+    emails = corpus["emails"]
+
+    gagal = 0
+    for e in emails:
+        hasil = mandiri_parser.parse_transaksi(e["subject"], e["body"], today)
+        if hasil != e["expected"]:
+            gagal += 1
+            print(f"BEDA  {e['subject']!r}\n  dapat    {hasil}\n  harapan  {e['expected']}")
+    print(f"Regresi: {len(emails) - gagal}/{len(emails)} email cocok dengan corpus")
+    if gagal:
+        sys.exit(1)
+
+    ulang = 200
+    lama = throughput(parse_lama, emails, today, ulang)
+    baru = throughput(mandiri_parser.parse_transaksi, emails, today, ulang)
+    print(f"{'parser lama':<16}{lama:>12,.0f} email/detik")
+    print(f"{'mandiri_parser':<16}{baru:>12,.0f} email/detik  ({baru / lama:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Benchmark: jadwal recurring per rule (iterrows) vs ledger.jadwal_recurring (satu join).
+
+Mode biasa (periode berjalan) dan catch_up (backfill sejak Tanggal_Mulai), dengan
+jumlah rule dan ukuran ledger yang diperbesar.
+
+Jalankan dari root repo:  python benchmarks/bench_recurring.py
+"""
+import datetime
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import ledger  # noqa: E402
+
+KATEGORI = ["Langganan", "Listrik / Air", "Internet", "Cicilan", "Asuransi", "Makan (Sahur/Buka)"]
+
+
+def jadwal_lama(df_recurring, df_main, today, penanda=None, catch_up=False):
+    """Versi sebelumnya (iterrows per rule + lookup dict per jatuh tempo) sebagai pembanding"""
+    penanda = dict(penanda or {})
+    if df_recurring.empty:
+        return [], penanda
+
+    tercatat = {}
+    if not df_main.empty:
+        tgl = ledger.parse_tanggal(df_main["Tanggal"]).dropna()
+        catatan = df_main.loc[tgl.index, "Catatan"].astype(str)
+        kat = df_main.loc[tgl.index, "Kategori"]
+        iso = tgl.dt.isocalendar()
+        for jenis, a, b in (("B", tgl.dt.year, tgl.dt.month), ("M", iso["year"], iso["week"])):
+            grup = catatan.groupby([kat, pd.Series(jenis, index=tgl.index), a.astype(int), b.astype(int)],
+                                   observed=True).agg(list)
+            tercatat.update(grup.to_dict())
+
+    mulai_rule = ledger.parse_tanggal(df_recurring["Tanggal_Mulai"])
+    hasil = []
+    for (_, r), mulai in zip(df_recurring.iterrows(), mulai_rule):
+        if str(r.get("Aktif", "True")).lower() != "true" or pd.isna(mulai):
+            continue
+        frek = r.get("Frekuensi", "Bulanan")
+        kunci = ledger.kunci_rule(r)
+        dari = ledger._awal_periode(frek, today)
+        if penanda.get(kunci):
+            terakhir = datetime.date.fromisoformat(penanda[kunci]) + datetime.timedelta(days=1)
+            dari = terakhir if catch_up else max(dari, terakhir)
+        elif catch_up:
+            dari = mulai.date()
+
+        tempo = ledger.jatuh_tempo(mulai.date(), frek, dari, today)
+        for tgl in tempo:
+            catatan_periode = tercatat.get((r["Kategori"],) + ledger._kunci_periode(frek, tgl), [])
+            if any(str(r["Nama"]) in c for c in catatan_periode):
+                continue
+            hasil.append({
+                "Tanggal": tgl.strftime("%Y-%m-%d"),
+                "Tipe": "Pengeluaran", "Kategori": r["Kategori"],
+                "Nominal": r["Nominal"], "Catatan": f"[Auto] {r['Nama']}",
+                "Status": "Cleared", "Tenggat_Waktu": "",
+                "Tanggal_Bayar": tgl.strftime("%Y-%m-%d"),
+            })
+        if tempo:
+            penanda[kunci] = tempo[-1].isoformat()
+    return hasil, penanda
+
+
+def buat_rules(n, seed=0):
+    rng = np.random.default_rng(seed)
+    mulai = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 600, n), unit="D")
+    return pd.DataFrame({
+        "Nama": [f"Rule {i}" for i in range(n)],
+        "Kategori": rng.choice(KATEGORI, n),
+        "Nominal": rng.integers(10, 500, n) * 1000,
+        "Tanggal_Mulai": mulai.strftime("%Y-%m-%d"),
+        "Frekuensi": rng.choice(["Bulanan", "Bulanan", "Bulanan", "Mingguan"], n),
+        "Aktif": rng.choice(["True", "True", "True", "False"], n),
+        "Catatan": "",
+    })
+
+
+def buat_ledger(n, n_rules, today, seed=1):
+    rng = np.random.default_rng(seed)
+    tanggal = pd.Timestamp(today) - pd.to_timedelta(rng.integers(0, 400, n), unit="D")
+    # Sebagian transaksi bulan ini sudah berisi "[Auto] Rule x" supaya cabang skip ikut teruji
+    catatan = np.where(rng.random(n) < 0.3, [f"[Auto] Rule {i}" for i in rng.integers(0, n_rules, n)], "Belanja")
+    return pd.DataFrame({
+        "Tanggal": tanggal.strftime("%Y-%m-%d"),
+        "Tipe": "Pengeluaran",
+        "Kategori": rng.choice(KATEGORI, n),
+        "Nominal": rng.integers(1, 500, n) * 1000,
+        "Catatan": catatan,
+        "Status": "Cleared",
+    })
+
+
+def ukur(fungsi, ulang=3):
+    terbaik = float("inf")
+    for _ in range(ulang):
+        mulai = time.perf_counter()
+        hasil = fungsi()
+        terbaik = min(terbaik, time.perf_counter() - mulai)
+    return terbaik, hasil
+
+
+def main():
+    today = datetime.date(2026, 3, 20)
+    print(f"{'mode':>8} {'rules':>6} {'baris':>8} {'dibuat':>7} {'lama (s)':>9} {'join (s)':>9} {'speed-up':>9}")
+    for catch_up in [False, True]:
+        for n_rules in [10, 50, 200]:
+            rules = buat_rules(n_rules)
+            for n in [1_000, 10_000, 50_000]:
+                df = buat_ledger(n, n_rules, today)
+
+                t_lama, lama = ukur(lambda: jadwal_lama(rules, df, today, catch_up=catch_up), ulang=1)
+                t_baru, baru = ukur(lambda: ledger.jadwal_recurring(rules, df, today, catch_up=catch_up))
+
+                assert lama == baru, "hasil jadwal berbeda"
+                mode = "catch-up" if catch_up else "biasa"
+                print(f"{mode:>8} {n_rules:>6} {n:>8} {len(baru[0]):>7} {t_lama:>9.4f} {t_baru:>9.4f} "
+                      f"{t_lama / t_baru:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
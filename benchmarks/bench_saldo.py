@@ -0,0 +1,112 @@
+"""Uji + benchmark mutasi saldo: RPC atomik vs read-modify-write lama, di benchmarks/supabase_lokal.py.
+
+1. Banyak thread mencatat transaksi cash bersamaan -> saldo akhir harus tepat,
+   jumlah baris transaksi = jumlah panggilan. Versi lama (baca saldo, tulis saldo baru)
+   dijalankan dengan beban yang sama untuk menghitung update yang hilang.
+2. Transaksi yang membuat saldo cash negatif ditolak dan transaksinya tidak tersimpan.
+3. Setor / tarik tabungan bersamaan -> nominal_terkumpul, status Selesai dan histori konsisten;
+   tarik melebihi saldo ditolak tanpa histori.
+
+Jalankan dari root repo:  python benchmarks/bench_saldo.py
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from supabase_lokal import GalatRpc, SupabaseLokal  # noqa: E402
+
+THREAD = 8
+PER_THREAD = 150
+CASH_AWAL = 10_000_000
+
+
+def transaksi(nominal, catatan):
+    return {"tanggal": "2026-01-15", "tipe": "Pengeluaran", "kategori": "Lainnya", "nominal": nominal,
+            "catatan": catatan, "status": "Cleared", "tenggat_waktu": "", "tanggal_bayar": "2026-01-15",
+            "sumber": "Cash"}
+
+
+def jalankan_paralel(fungsi):
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(THREAD) as pool:
+        list(pool.map(fungsi, range(THREAD * PER_THREAD)))
+    return time.perf_counter() - t0
+
+
+def uji_cash():
+    nominal = lambda i: 1000 + i % 7 * 500  # noqa: E731
+    total = sum(nominal(i) for i in range(THREAD * PER_THREAD))
+
+    with SupabaseLokal(cash_awal=CASH_AWAL) as db:
+        def atomik(i):
+            db.rpc("catat_transaksi_atomik", {
+                "p_transaksi": [transaksi(nominal(i), f"atomik {i}")],
+                "p_delta_cash": -nominal(i), "p_catatan_cash": f"atomik {i}",
+            }).execute()
+        dt = jalankan_paralel(atomik)
+        assert db.saldo_cash() == CASH_AWAL - total, "saldo atomik meleset"
+        assert db.query("SELECT count(*) FROM transaksi")[0][0] == THREAD * PER_THREAD
+        print(f"RPC atomik        : {THREAD * PER_THREAD} transaksi, {dt:.2f} s, saldo tepat")
+
+    with SupabaseLokal(cash_awal=CASH_AWAL) as db:
+        def lama(i):
+            # Alur lama: save_to_cloud + load_cash_cloud + update_cash_cloud (3 request terpisah)
+            db.query("INSERT INTO transaksi (nominal, catatan) VALUES (?, ?)", nominal(i), f"lama {i}")
+            saldo = db.saldo_cash()
+            db.query("INSERT INTO cash (nominal, catatan) VALUES (?, ?)", saldo - nominal(i), f"lama {i}")
+        dt = jalankan_paralel(lama)
+        selisih = db.saldo_cash() - (CASH_AWAL - total)
+        print(f"Read-modify-write : {THREAD * PER_THREAD} transaksi, {dt:.2f} s, "
+              f"saldo meleset Rp {selisih:,} (update hilang)")
+
+
+def uji_cash_kurang():
+    with SupabaseLokal(cash_awal=5000) as db:
+        try:
+            db.rpc("catat_transaksi_atomik", {
+                "p_transaksi": [transaksi(8000, "kebanyakan")], "p_delta_cash": -8000,
+            }).execute()
+            raise AssertionError("saldo negatif harus ditolak")
+        except GalatRpc:
+            pass
+        assert db.saldo_cash() == 5000
+        assert db.query("SELECT count(*) FROM transaksi")[0][0] == 0, "transaksi harus ikut rollback"
+        print("Saldo kurang      : ditolak, transaksi ikut batal")
+
+
+def uji_tabungan():
+    with SupabaseLokal() as db:
+        target = THREAD * PER_THREAD * 1000
+        tid = db.tambah_tabungan("Laptop", target)
+
+        def setor(i):
+            db.rpc("mutasi_tabungan_atomik", {"p_tabungan_id": tid, "p_delta": 1000,
+                                              "p_catatan": f"setor {i}"}).execute()
+        dt = jalankan_paralel(setor)
+        terkumpul, status = db.query("SELECT nominal_terkumpul, status FROM tabungan WHERE id = ?", tid)[0]
+        assert (terkumpul, status) == (target, "Selesai"), (terkumpul, status)
+
+        hasil = db.rpc("mutasi_tabungan_atomik", {"p_tabungan_id": tid, "p_delta": -5000}).execute().data
+        assert hasil == {"terkumpul": target - 5000, "status": "Selesai"}, hasil
+        try:
+            db.rpc("mutasi_tabungan_atomik", {"p_tabungan_id": tid, "p_delta": -target}).execute()
+            raise AssertionError("tarik melebihi saldo harus ditolak")
+        except GalatRpc:
+            pass
+
+        histori = db.query("SELECT tipe, count(*), sum(nominal) FROM transaksi_tabungan GROUP BY tipe ORDER BY tipe")
+        assert histori == [("Setor", THREAD * PER_THREAD, target), ("Tarik", 1, 5000)], histori
+        print(f"Tabungan          : {THREAD * PER_THREAD} setor paralel {dt:.2f} s, status Selesai, "
+              f"histori cocok, tarik berlebih ditolak")
+
+
+def main():
+    uji_cash()
+    uji_cash_kurang()
+    uji_tabungan()
+
+
+if __name__ == "__main__":
+    main()
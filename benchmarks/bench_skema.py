@@ -0,0 +1,70 @@
+"""Benchmark: ledger mentah (object / float / string tanggal) vs ledger.normalisasi_ledger.
+
+Jalankan dari root repo:  python benchmarks/bench_skema.py
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import ledger  # noqa: E402
+
+
+def buat_ledger(n, seed=0):
+    """Bentuk frame persis seperti hasil _siapkan_transaksi (string dari Supabase)"""
+    rng = np.random.default_rng(seed)
+    tanggal = (pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 800, n), unit="D")).strftime("%Y-%m-%d")
+    bayar = tanggal.to_numpy(dtype=object).copy()
+    bayar[rng.random(n) < 0.5] = ""
+    return pd.DataFrame({
+        "id": np.arange(n),
+        "Tanggal": tanggal.to_numpy(dtype=object),
+        "Tipe": rng.choice(["Pengeluaran", "Pemasukan"], n).astype(object),
+        "Kategori": rng.choice(["Makan (Sahur/Buka)", "Scheduled Settlement", "Bensin / Mobilitas",
+                                "Bukber / Hiburan", "Kebutuhan Lab / Magang", "Lainnya"], n).astype(object),
+        "Nominal": (rng.integers(1, 500, n) * 1000).astype(float),
+        "Catatan": rng.choice(["Makan siang", "Transfer", "[Auto] Kos", "QRIS"], n).astype(object),
+        "Status": rng.choice(["Cleared", "Pending"], n).astype(object),
+        "Tenggat_Waktu": np.full(n, "", dtype=object),
+        "Tanggal_Bayar": bayar,
+        "Sumber": rng.choice(["Bank", "Cash"], n).astype(object),
+    })
+
+
+def ukur(fungsi, ulang=5):
+    terbaik = float("inf")
+    for _ in range(ulang):
+        mulai = time.perf_counter()
+        fungsi()
+        terbaik = min(terbaik, time.perf_counter() - mulai)
+    return terbaik
+
+
+def mask_aktif(df):
+    return (df["Tipe"] == "Pengeluaran") & ~((df["Kategori"] == "Scheduled Settlement") & (df["Status"] == "Pending")) \
+        & (df["Sumber"] == "Bank")
+
+
+def main():
+    print(f"{'baris':>8} {'MB mentah':>10} {'MB skema':>9} {'hemat':>6} {'mask mentah':>12} {'mask skema':>11} {'normalisasi':>12}")
+    for n in [10_000, 50_000, 200_000]:
+        mentah = buat_ledger(n)
+        # Mentah + Tanggal_dt seperti pub.py lama, supaya perbandingan adil
+        mentah["Tanggal_dt"] = ledger.hitung_cashflow_date(mentah)[1]
+        t_norm = ukur(lambda: ledger.normalisasi_ledger(mentah), ulang=3)
+        skema = ledger.normalisasi_ledger(mentah)
+
+        mb_mentah = mentah.memory_usage(deep=True).sum() / 1e6
+        mb_skema = skema.memory_usage(deep=True).sum() / 1e6
+        assert mask_aktif(mentah).equals(mask_aktif(skema))
+        t_mentah = ukur(lambda: mask_aktif(mentah))
+        t_skema = ukur(lambda: mask_aktif(skema))
+        print(f"{n:>8} {mb_mentah:>10.1f} {mb_skema:>9.1f} {mb_mentah / mb_skema:>5.1f}x "
+              f"{t_mentah * 1000:>10.2f}ms {t_skema * 1000:>9.2f}ms {t_norm * 1000:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Skenario + latensi watcher IMAP IDLE (mandiri_watcher) terhadap server IMAP lokal.
+
+1. Watcher start, susul email lama, lalu IDLE (tanpa perintah lain selama mailbox sepi).
+2. Email baru dikirim satu per satu -> ukur jeda sampai transaksi ada di antrean.
+3. Semua koneksi diputus + 2x login gagal -> watcher harus sambung ulang (backoff)
+   dan tetap mengambil email yang masuk selama putus.
+4. EXISTS datang satu paket di belakang baris untagged lain (mis. FETCH FLAGS) ->
+   tetap langsung terbaca, bukan tertahan di buffer sampai IDLE diperbarui.
+5. Watcher dihentikan -> thread harus selesai cepat walau sedang IDLE.
+
+Jalankan dari root repo:  python benchmarks/bench_watcher.py
+"""
+import imaplib
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import mandiri_watcher  # noqa: E402
+from imap_lokal import ServerImap, buat_email_mandiri  # noqa: E402
+
+AKUN = "kamu@gmail.com"
+
+
+def tunggu_sampai(kondisi, batas=10.0):
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < batas:
+        if kondisi():
+            return time.perf_counter() - t0
+        time.sleep(0.005)
+    raise TimeoutError("kondisi tidak terpenuhi")
+
+
+def main():
+    mandiri_watcher.BACKOFF_AWAL = 0.2  # supaya skenario reconnect tidak makan waktu lama
+    lama = buat_email_mandiri(20, seed=1, rasio_gagal=0)
+    baru = buat_email_mandiri(65, seed=2, rasio_gagal=0)
+
+    with ServerImap(lama) as srv, tempfile.TemporaryDirectory() as tmp:
+        def buat_koneksi():
+            mail = imaplib.IMAP4("127.0.0.1", srv.port)
+            mail.login(AKUN, "rahasia")
+            return mail
+
+        antrean = mandiri_watcher.buat_antrean(os.path.join(tmp, "antrean.json"))
+        handle = mandiri_watcher.mulai(
+            AKUN, buat_koneksi, antrean,
+            state_file=os.path.join(tmp, "state.json"), cache_file=os.path.join(tmp, "cache.sqlite"),
+            log=lambda *_: None,
+        )
+        jumlah = lambda: len(mandiri_watcher.isi_antrean(antrean))  # noqa: E731
+
+        # 1. Susul: sinkron pertama ambil 10 email terakhir
+        t = tunggu_sampai(lambda: jumlah() >= 10 and handle["status"].get("keadaan") == "idle")
+        print(f"Sinkron awal      : {jumlah()} transaksi dalam {t * 1000:.0f} ms")
+        # keadaan "idle" di-set sebelum perintah IDLE terkirim: kosongkan log setelah IDLE sampai
+        tunggu_sampai(lambda: "IDLE" in srv.perintah)
+        srv.perintah.clear()
+        time.sleep(1)
+        assert not srv.perintah, f"watcher tidak diam saat IDLE: {srv.perintah[:6]}"
+
+        # 2. Latensi email baru -> antrean
+        latensi = []
+        for msg in baru[:50]:
+            sebelum = jumlah()
+            srv.tambah(msg)
+            latensi.append(tunggu_sampai(lambda: jumlah() > sebelum))
+        latensi_ms = sorted(x * 1000 for x in latensi)
+        print(f"Email baru (50)   : p50 {statistics.median(latensi_ms):.0f} ms, "
+              f"p95 {latensi_ms[int(len(latensi_ms) * 0.95) - 1]:.0f} ms, maks {latensi_ms[-1]:.0f} ms")
+
+        # 3. Putus + login gagal 2x; email masuk selama putus tetap terambil
+        sebelum = jumlah()
+        srv.gagal_login = 2
+        srv.putus_semua()
+        for msg in baru[50:55]:
+            srv.tambah(msg)
+        t = tunggu_sampai(lambda: jumlah() >= sebelum + 5, batas=30)
+        print(f"Reconnect         : 5 email susulan masuk {t:.1f} s setelah putus "
+              f"(gagal berturut: {handle['status'].get('gagal')})")
+
+        # 4. EXISTS di belakang baris lain dalam satu paket
+        srv.awalan_exists = "* 1 FETCH (FLAGS (\\Seen))\r\n"
+        latensi = []
+        for msg in baru[55:60]:
+            sebelum = jumlah()
+            srv.tambah(msg)
+            latensi.append(tunggu_sampai(lambda: jumlah() > sebelum))
+        srv.awalan_exists = ""
+        print(f"EXISTS tertumpuk  : maks {max(latensi) * 1000:.0f} ms")
+
+        # 5. Berhenti saat IDLE
+        t0 = time.perf_counter()
+        mandiri_watcher.hentikan(handle, tunggu=5)
+        print(f"Berhenti          : {(time.perf_counter() - t0) * 1000:.0f} ms, thread hidup={handle['thread'].is_alive()}")
+
+        # Antrean bertahan lewat restart (dibaca ulang dari file)
+        dimuat = mandiri_watcher.buat_antrean(antrean["path"])
+        assert len(mandiri_watcher.isi_antrean(dimuat)) == jumlah() == 70
+        print(f"Antrean di disk   : {jumlah()} transaksi")
+
+
+if __name__ == "__main__":
+    main()
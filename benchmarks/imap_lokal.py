@@ -0,0 +1,353 @@
+"""Server IMAP lokal (pengganti Gmail) untuk benchmark & uji mandiri_imap.
+
+Cuma subset IMAP4rev1 yang dipakai app: CAPABILITY, LOGIN, SELECT, STATUS, NOOP,
+LOGOUT, IDLE, (UID) SEARCH (FROM / UID n:*), (UID) FETCH (UID, RFC822, BODYSTRUCTURE,
+BODY.PEEK[HEADER.FIELDS (...)], BODY.PEEK[n.n]). Byte yang dikirim ke client
+dihitung supaya benchmark bisa membandingkan volume transfer. tambah() mengirim
+email baru (client yang sedang IDLE dapat `* n EXISTS`), putus_semua() dan
+gagal_login mensimulasikan gangguan jaringan / server; awalan_exists menyelipkan
+baris untagged lain di paket yang sama dengan EXISTS.
+
+Pemakaian:
+    with ServerImap(buat_email_mandiri(3000)) as srv:
+        mail = imaplib.IMAP4("127.0.0.1", srv.port)
+"""
+import random
+import re
+import select
+import socket
+import socketserver
+import threading
+from email.message import EmailMessage
+
+CRLF = b"\r\n"
+PENGIRIM = "noreply.livin@bankmandiri.co.id"
+
+BULAN = ["Januari", "Februari", "Maret", "April", "Mei", "Juni", "Juli",
+         "Agustus", "September", "Oktober", "November", "Desember"]
+PENERIMA = ["WARUNG SATE PAK DIN", "INDOMARET CIPUTAT", "PT KERETA COMMUTER", "SPBU 34-15401",
+            "TOKO BUKU GRAMEDIA", "KOPI KENANGAN", "APOTEK K24", "LAUNDRY BERSIH"]
+
+
+# ===== EMAIL SINTETIS =====
+def buat_email_mandiri(n, seed=0, rasio_gagal=0.1, lampiran_kb=24):
+    """n email notifikasi ala Livin' Mandiri: text/plain + text/html + lampiran gambar"""
+    rng = random.Random(seed)
+    logo = bytes(rng.getrandbits(8) for _ in range(lampiran_kb * 1024))
+    hasil = []
+    for i in range(n):
+        gagal = rng.random() < rasio_gagal
+        masuk = rng.random() < 0.2
+        nominal = rng.randint(5, 900) * 1000
+        tgl = f"{rng.randint(1, 28)} {rng.choice(BULAN)} 2026"
+        jam = f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}"
+        penerima = rng.choice(PENERIMA)
+        if gagal:
+            subject = "Transaksi Tidak Berhasil"
+        elif masuk:
+            subject = "Transfer Masuk Berhasil"
+        else:
+            subject = "Pembayaran Berhasil"
+
+        rp = f"{nominal:,}".replace(",", ".") + ",00"
+        teks = (
+            f"Halo, berikut detail transaksi kamu\n"
+            f"Tanggal {tgl}\nJam {jam} WIB\n"
+            f"Penerima \"{penerima}\" Bank Mandiri - ID 00{i:08d}\n"
+            f"Nominal Transaksi Rp {rp}\n"
+            f"Total Transaksi Rp {rp}\n"
+        )
+        msg = EmailMessage()
+        msg["From"] = f"Livin' by Mandiri <{PENGIRIM}>"
+        msg["To"] = "kamu@gmail.com"
+        msg["Subject"] = subject
+        msg["Date"] = "Mon, 05 Jan 2026 10:00:00 +0700"
+        msg["Message-ID"] = f"<livin-{seed}-{i}@bankmandiri.co.id>"
+        msg.set_content(teks)
+        msg.add_alternative(
+            "<html><body><table>" + "".join(f"<tr><td>{b}</td></tr>" for b in teks.splitlines())
+            + "</table>" + "<p>&nbsp;</p>" * 200 + "</body></html>",
+            subtype="html",
+        )
+        msg.add_attachment(logo, maintype="image", subtype="png", filename="livin.png")
+        hasil.append(msg)
+    return hasil
+
+
+# ===== BODYSTRUCTURE / SECTION =====
+def _q(s):
+    return "NIL" if s is None else '"' + str(s).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _raw_part(part):
+    return part.as_bytes().split(b"\n\n", 1)[-1].replace(b"\n", b"\r\n")
+
+
+def bodystructure(part):
+    if part.is_multipart():
+        return "(" + "".join(bodystructure(p) for p in part.get_payload()) + f" {_q(part.get_content_subtype().upper())})"
+    params = " ".join(f"{_q(k.upper())} {_q(v)}" for k, v in part.get_params()[1:]) if part.get_params() else ""
+    raw = _raw_part(part)
+    enc = part.get("Content-Transfer-Encoding", "7bit")
+    struktur = (f"{_q(part.get_content_maintype().upper())} {_q(part.get_content_subtype().upper())} "
+                f"({params or 'NIL'}) NIL NIL {_q(enc.upper())} {len(raw)}")
+    if part.get_content_maintype() == "text":
+        struktur += f" {raw.count(CRLF)}"
+    return f"({struktur})"
+
+
+def section(msg, nomor):
+    part = msg
+    for i in nomor.split("."):
+        if part.is_multipart():
+            part = part.get_payload()[int(i) - 1]
+        elif i != "1":
+            return b""
+    return _raw_part(part)
+
+
+def header_fields(msg, fields):
+    baris = [f"{k}: {v}" for k, v in msg.items() if k.upper() in fields]
+    return ("\r\n".join(baris) + "\r\n\r\n").encode()
+
+
+def siapkan(msg):
+    """Serialisasi sekali per email (RFC822, BODYSTRUCTURE, section) supaya waktu
+    server tidak ikut terukur di benchmark client"""
+    if not hasattr(msg, "_imap_lokal"):
+        msg._imap_lokal = {
+            "rfc822": msg.as_bytes().replace(b"\n", b"\r\n"),
+            "bodystructure": bodystructure(msg),
+            "section": {},
+        }
+    return msg._imap_lokal
+
+
+def ambil_section(msg, sec):
+    cache = siapkan(msg)["section"]
+    if sec not in cache:
+        if sec.upper().startswith("HEADER.FIELDS"):
+            fields = set(sec[sec.index("(") + 1:sec.index(")")].upper().split())
+            cache[sec] = header_fields(msg, fields)
+        else:
+            cache[sec] = section(msg, sec)
+    return cache[sec]
+
+
+# ===== SERVER =====
+class _Handler(socketserver.StreamRequestHandler):
+    # Tanpa ini tiap round trip kecil kena delay Nagle + delayed ACK (~40 ms) di loopback
+    disable_nagle_algorithm = True
+
+    def kirim(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        self.server.byte_terkirim += len(data)
+        self.wfile.write(data)
+
+    def handle(self):
+        self.server.koneksi.add(self.request)
+        try:
+            self.layani()
+        except OSError:
+            pass  # koneksi diputus (putus_semua) di tengah perintah
+        finally:
+            self.server.koneksi.discard(self.request)
+
+    def layani(self):
+        self.kirim("* OK IMAP4rev1 lokal siap\r\n")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            tag, _, sisa = line.decode().rstrip("\r\n").partition(" ")
+            cmd, _, args = sisa.partition(" ")
+            cmd = cmd.upper()
+            self.server.perintah.append(cmd if cmd != "UID" else "UID " + args.split(" ", 1)[0].upper())
+            if cmd == "CAPABILITY":
+                self.kirim(f"* CAPABILITY IMAP4rev1 IDLE\r\n{tag} OK CAPABILITY selesai\r\n")
+            elif cmd == "LOGIN" and self.server.gagal_login > 0:
+                self.server.gagal_login -= 1
+                self.kirim(f"{tag} NO [UNAVAILABLE] server sedang sibuk\r\n")
+            elif cmd == "IDLE":
+                if not self.idle(tag):
+                    return
+            elif cmd == "NOOP":
+                self.kabari_exists()
+                self.kirim(f"{tag} OK NOOP selesai\r\n")
+            elif cmd in ("LOGIN", "CLOSE"):
+                self.kirim(f"{tag} OK {cmd} selesai\r\n")
+            elif cmd in ("SELECT", "EXAMINE"):
+                self.dilihat = len(self.server.pesan)
+                self.kirim(f"* {self.dilihat} EXISTS\r\n"
+                           f"* OK [UIDVALIDITY {self.server.uidvalidity}] UID valid\r\n"
+                           f"* OK [UIDNEXT {self.server.uid_berikut()}] UID berikutnya\r\n"
+                           f"{tag} OK [READ-WRITE] SELECT selesai\r\n")
+            elif cmd == "STATUS":
+                self.kirim(f"* STATUS INBOX (UIDVALIDITY {self.server.uidvalidity})\r\n{tag} OK STATUS selesai\r\n")
+            elif cmd == "LOGOUT":
+                self.kirim(f"* BYE sampai jumpa\r\n{tag} OK LOGOUT selesai\r\n")
+                return
+            elif cmd == "SEARCH":
+                self.search(tag, args, pakai_uid=False)
+            elif cmd == "FETCH":
+                self.fetch(tag, args, pakai_uid=False)
+            elif cmd == "UID":
+                sub, _, args = args.partition(" ")
+                if sub.upper() == "SEARCH":
+                    self.search(tag, args)
+                elif sub.upper() == "FETCH":
+                    self.fetch(tag, args)
+                else:
+                    self.kirim(f"{tag} BAD UID {sub} tidak didukung\r\n")
+            else:
+                self.kirim(f"{tag} BAD {cmd} tidak didukung\r\n")
+
+    dilihat = 0  # jumlah email yang sudah dikabarkan ke client (SELECT / EXISTS terakhir)
+
+    def kabari_exists(self):
+        jumlah = len(self.server.pesan)
+        if jumlah > self.dilihat:
+            # awalan_exists: baris untagged lain yang ikut satu paket sebelum EXISTS
+            self.kirim(f"{self.server.awalan_exists}* {jumlah} EXISTS\r\n")
+            self.dilihat = jumlah
+
+    def idle(self, tag):
+        """Kirim `* n EXISTS` tiap ada email baru sampai client kirim DONE; False kalau koneksi putus.
+
+        Seperti server asli, email yang masuk sejak kabar terakhir langsung dikabarkan
+        begitu IDLE dimulai.
+        """
+        self.kirim("+ idling\r\n")
+        while True:
+            with self.server.ada_baru:
+                if len(self.server.pesan) == self.dilihat:
+                    self.server.ada_baru.wait(0.005)  # sekaligus jeda cek DONE dari client
+            self.kabari_exists()
+            if select.select([self.request], [], [], 0)[0]:
+                line = self.rfile.readline()
+                if not line:
+                    return False
+                if line.strip().upper() == b"DONE":
+                    self.kirim(f"{tag} OK IDLE selesai\r\n")
+                    return True
+
+    def search(self, tag, args, pakai_uid=True):
+        with self.server.lock:
+            pesan = list(self.server.pesan)
+        uids = [uid for uid, _ in pesan]
+        nomor = {uid: seq for seq, (uid, _) in enumerate(pesan, start=1)}
+        m = re.search(r"UID (\d+):(\*|\d+)", args)
+        if m:
+            lo = int(m.group(1))
+            hi = max(uids, default=0) if m.group(2) == "*" else int(m.group(2))
+            # Seperti server asli: "n:*" dengan n > UID tertinggi tetap mengembalikan UID tertinggi
+            uids = [u for u in uids if lo <= u <= hi] or ([max(uids)] if uids and m.group(2) == "*" else [])
+        m = re.search(r'FROM "([^"]+)"', args)
+        if m:
+            dari = dict(pesan)
+            uids = [u for u in uids if m.group(1) in dari[u]["From"]]
+        if not pakai_uid:
+            uids = [nomor[u] for u in uids]
+        self.kirim(f"* SEARCH {' '.join(map(str, uids))}\r\n{tag} OK SEARCH selesai\r\n")
+
+    def fetch(self, tag, args, pakai_uid=True):
+        set_uid, _, items = args.partition(" ")
+        with self.server.lock:
+            pesan = list(self.server.pesan)
+        rentang = []
+        for potong in set_uid.split(","):
+            a, _, b = potong.partition(":")
+            rentang.append((int(a), float("inf") if b == "*" else int(b or a)))
+        items = items.strip("()")
+        nomor = {(uid if pakai_uid else seq): seq for seq, (uid, _) in enumerate(pesan, start=1)}
+        kena = sorted({n for lo, hi in rentang for n in nomor if lo <= n <= hi}
+                      if any(hi == float("inf") for _, hi in rentang) or len(rentang) > 50
+                      else {n for lo, hi in rentang for n in range(lo, int(hi) + 1) if n in nomor})
+        for seq, (uid, msg) in ((nomor[n], pesan[nomor[n] - 1]) for n in kena):
+            bagian = [f"UID {uid}"]
+            literal = []
+            for item in re.findall(r"BODY(?:\.PEEK)?\[[^\]]*\]|RFC822|BODYSTRUCTURE", items):
+                if item == "BODYSTRUCTURE":
+                    bagian.append(f"BODYSTRUCTURE {siapkan(msg)['bodystructure']}")
+                elif item == "RFC822":
+                    literal.append(("RFC822", siapkan(msg)["rfc822"]))
+                else:
+                    sec = item[item.index("[") + 1:-1]
+                    literal.append((f"BODY[{sec}]", ambil_section(msg, sec)))
+            # Item literal dikirim di urutan permintaan; BODYSTRUCTURE menyusul setelahnya
+            depan = " ".join(b for b in bagian if not b.startswith("BODYSTRUCTURE"))
+            belakang = "".join(" " + b for b in bagian if b.startswith("BODYSTRUCTURE"))
+            self.kirim(f"* {seq} FETCH ({depan}")
+            for nama, data in literal:
+                self.kirim(f" {nama} {{{len(data)}}}\r\n")
+                self.kirim(data)
+            self.kirim(f"{belakang})\r\n")
+        self.kirim(f"{tag} OK FETCH selesai\r\n")
+
+
+class ServerImap(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, pesan=(), uidvalidity=1, port=0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.pesan = [(i + 1, m) for i, m in enumerate(pesan)]
+        for _, m in self.pesan:
+            siapkan(m)
+        self.uidvalidity = uidvalidity
+        self.lock = threading.Lock()
+        self.ada_baru = threading.Condition(self.lock)
+        self.koneksi = set()
+        self.gagal_login = 0
+        self.awalan_exists = ""
+        self.byte_terkirim = 0
+        self.perintah = []
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def uid_berikut(self):
+        with self.lock:
+            return self.pesan[-1][0] + 1 if self.pesan else 1
+
+    def tambah(self, msg):
+        """Kirim email baru ke mailbox; return UID-nya"""
+        siapkan(msg)
+        with self.lock:
+            uid = self.pesan[-1][0] + 1 if self.pesan else 1
+            self.pesan.append((uid, msg))
+            self.ada_baru.notify_all()
+        return uid
+
+    def putus_semua(self):
+        """Putus paksa semua koneksi client (simulasi jaringan / server restart)"""
+        for sock in list(self.koneksi):
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    import imaplib
+
+    with ServerImap(buat_email_mandiri(5)) as srv:
+        mail = imaplib.IMAP4("127.0.0.1", srv.port)
+        mail.login("kamu@gmail.com", "rahasia")
+        mail.select("inbox")
+        print(mail.uid("SEARCH", None, f'FROM "{PENGIRIM}"'))
+        print(mail.uid("FETCH", "1", "(UID BODYSTRUCTURE)"))
+        mail.logout()
+        print(srv.byte_terkirim, "byte terkirim")
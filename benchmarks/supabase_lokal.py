@@ -0,0 +1,139 @@
+"""Pengganti lokal (SQLite) untuk RPC catat_transaksi_atomik & mutasi_tabungan_atomik.
+
+Semantik sama dengan supabase/migrations/002_mutasi_saldo_atomik.sql:
+- catat_transaksi_atomik: insert transaksi + baris saldo cash baru dalam satu transaksi
+  DB; saldo negatif -> exception dan tidak ada yang tersimpan.
+- mutasi_tabungan_atomik: update nominal_terkumpul / status + histori
+  transaksi_tabungan; tarik melebihi saldo -> exception.
+BEGIN IMMEDIATE menggantikan pg_advisory_xact_lock: semua mutasi antri satu per satu.
+
+Pemakaian (bentuk panggilannya sama dengan conn.client di pub.py):
+    with SupabaseLokal(cash_awal=100_000) as db:
+        db.rpc("catat_transaksi_atomik", {"p_transaksi": [...], "p_delta_cash": -5000}).execute()
+"""
+import datetime
+import os
+import sqlite3
+import tempfile
+import threading
+from types import SimpleNamespace
+
+KOLOM_TRANSAKSI = ["tanggal", "tipe", "kategori", "nominal", "catatan", "status",
+                   "tenggat_waktu", "tanggal_bayar", "sumber"]
+
+_SKEMA = f"""
+CREATE TABLE transaksi (id INTEGER PRIMARY KEY AUTOINCREMENT, {", ".join(KOLOM_TRANSAKSI)});
+CREATE TABLE cash (id INTEGER PRIMARY KEY AUTOINCREMENT, nominal INTEGER NOT NULL,
+                   tanggal_update TEXT, catatan TEXT);
+CREATE TABLE tabungan (id INTEGER PRIMARY KEY AUTOINCREMENT, nama TEXT,
+                       target_nominal INTEGER NOT NULL, nominal_terkumpul INTEGER NOT NULL DEFAULT 0,
+                       status TEXT NOT NULL DEFAULT 'Aktif');
+CREATE TABLE transaksi_tabungan (id INTEGER PRIMARY KEY AUTOINCREMENT, tabungan_id INTEGER,
+                                 tanggal TEXT, nominal INTEGER, tipe TEXT, catatan TEXT);
+"""
+
+
+class GalatRpc(Exception):
+    """Pengganti exception PostgREST saat fungsi Postgres raise"""
+
+
+def _hari_ini():
+    return str((datetime.datetime.utcnow() + datetime.timedelta(hours=7)).date())
+
+
+class SupabaseLokal:
+    """Database SQLite sementara + rpc() yang meniru dua fungsi atomik di atas"""
+
+    def __init__(self, cash_awal=0):
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._dir.name, "lokal.sqlite")
+        self._lokal = threading.local()
+        db = self._koneksi()
+        db.executescript(_SKEMA)
+        if cash_awal:
+            db.execute("INSERT INTO cash (nominal, tanggal_update, catatan) VALUES (?, ?, 'Saldo awal')",
+                       (cash_awal, _hari_ini()))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._dir.cleanup()
+
+    def _koneksi(self):
+        """Satu koneksi per thread, autocommit; transaksi dibuka manual dengan BEGIN IMMEDIATE"""
+        db = getattr(self._lokal, "db", None)
+        if db is None:
+            db = self._lokal.db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        return db
+
+    def query(self, sql, *params):
+        return self._koneksi().execute(sql, params).fetchall()
+
+    def saldo_cash(self):
+        baris = self.query("SELECT nominal FROM cash ORDER BY id DESC LIMIT 1")
+        return baris[0][0] if baris else 0
+
+    def tambah_tabungan(self, nama, target):
+        return self._koneksi().execute(
+            "INSERT INTO tabungan (nama, target_nominal) VALUES (?, ?)", (nama, target)
+        ).lastrowid
+
+    # ===== RPC =====
+    def rpc(self, fungsi, params):
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data=getattr(self, fungsi)(**params)))
+
+    def _atomik(self, badan):
+        db = self._koneksi()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            hasil = badan(db)
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+        return hasil
+
+    def catat_transaksi_atomik(self, p_transaksi, p_delta_cash=0, p_catatan_cash=""):
+        def badan(db):
+            ids = [
+                db.execute(
+                    f"INSERT INTO transaksi ({', '.join(KOLOM_TRANSAKSI)}) VALUES ({', '.join('?' * len(KOLOM_TRANSAKSI))})",
+                    [r.get(k) for k in KOLOM_TRANSAKSI],
+                ).lastrowid
+                for r in p_transaksi
+            ]
+            cash = None
+            if p_delta_cash:
+                baris = db.execute("SELECT nominal FROM cash ORDER BY id DESC LIMIT 1").fetchone()
+                cash = (baris[0] if baris else 0) + p_delta_cash
+                if cash < 0:
+                    raise GalatRpc(f"Saldo cash tidak cukup (sisa {cash - p_delta_cash})")
+                db.execute("INSERT INTO cash (nominal, tanggal_update, catatan) VALUES (?, ?, ?)",
+                           (cash, _hari_ini(), p_catatan_cash))
+            return {"ids": ids or None, "cash": cash}
+        return self._atomik(badan)
+
+    def mutasi_tabungan_atomik(self, p_tabungan_id, p_delta, p_catatan="", p_tanggal=None):
+        def badan(db):
+            baris = db.execute(
+                """UPDATE tabungan
+                   SET nominal_terkumpul = nominal_terkumpul + ?1,
+                       status = CASE
+                           WHEN ?1 > 0 AND nominal_terkumpul + ?1 >= target_nominal THEN 'Selesai'
+                           WHEN ?1 > 0 THEN 'Aktif'
+                           ELSE status
+                       END
+                   WHERE id = ?2 AND nominal_terkumpul + ?1 >= 0
+                   RETURNING nominal_terkumpul, status""",
+                (p_delta, p_tabungan_id),
+            ).fetchone()
+            if baris is None:
+                raise GalatRpc(f"Tabungan {p_tabungan_id} tidak ada atau saldo tidak cukup")
+            db.execute(
+                "INSERT INTO transaksi_tabungan (tabungan_id, tanggal, nominal, tipe, catatan) VALUES (?, ?, ?, ?, ?)",
+                (p_tabungan_id, p_tanggal or _hari_ini(), abs(p_delta),
+                 "Setor" if p_delta > 0 else "Tarik", p_catatan),
+            )
+            return {"terkumpul": baris[0], "status": baris[1]}
+        return self._atomik(badan)
@@ -0,0 +1,496 @@
+"""Logika ledger (pandas murni) yang dipakai pub.py.
+
+Tidak ada Streamlit / Supabase di sini supaya bisa di-import dan di-benchmark terpisah.
+"""
+import calendar
+import datetime
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+
+# ===== VALIDASI + KARANTINA =====
+KOLOM_WAJIB = ["Tanggal", "Tipe", "Kategori", "Nominal"]
+NILAI_VALID = {
+    "Tipe": ["Pengeluaran", "Pemasukan"],
+    "Sumber": ["Bank", "Cash"],
+    "Status": ["Cleared", "Pending"],
+}
+# Kolom opsional: diisi default kalau tidak ada / kosong (None = biarkan kosong)
+DEFAULT_KOLOM = {"Sumber": "Bank", "Status": "Cleared", "Catatan": "", "Tenggat_Waktu": None, "Tanggal_Bayar": None}
+
+
+def _kosong(kolom):
+    return kolom.isna() | kolom.astype(str).str.strip().eq("")
+
+
+def validasi_transaksi(df, asal):
+    """Satu tahap validasi untuk semua baris transaksi (cloud, CSV, import Mandiri).
+
+    Return (bersih, karantina). bersih: tanggal sudah datetime64, Nominal int64,
+    default Sumber / Status terisi. karantina: baris asli yang gagal + kolom Asal & Alasan.
+    """
+    kurang = [k for k in KOLOM_WAJIB if k not in df.columns]
+    if kurang:
+        return df.iloc[0:0], df.assign(Asal=asal, Alasan=f"Kolom wajib tidak ada: {', '.join(kurang)}")
+
+    bersih = df.copy()
+    for kol, default in DEFAULT_KOLOM.items():
+        if kol not in bersih.columns:
+            bersih[kol] = default
+        elif default is not None:
+            bersih[kol] = bersih[kol].astype(object).where(~_kosong(bersih[kol]), default)
+
+    nominal = pd.to_numeric(bersih["Nominal"], errors="coerce")
+    tanggal = {kol: parse_tanggal(bersih[kol]) for kol in KOLOM_TANGGAL}
+    cek = [
+        (nominal.isna(), "Nominal kosong / bukan angka"),
+        (nominal < 0, "Nominal negatif"),
+        (tanggal["Tanggal"].isna(), "Tanggal tidak valid"),
+    ]
+    cek += [(tanggal[kol].isna() & ~_kosong(bersih[kol]), f"{kol} tidak valid") for kol in KOLOM_TANGGAL[1:]]
+    cek += [(~bersih[kol].isin(nilai), f"{kol} tidak dikenal") for kol, nilai in NILAI_VALID.items()]
+
+    alasan = pd.Series("", index=df.index, dtype=object)
+    for mask, pesan in cek:
+        alasan = alasan.mask(mask.fillna(False).astype(bool), alasan + pesan + "; ")
+    gagal = alasan.ne("")
+
+    for kol, hasil in tanggal.items():
+        bersih[kol] = hasil
+    bersih["Nominal"] = nominal.fillna(0).round().astype("int64")
+    karantina = df[gagal].assign(Asal=asal, Alasan=alasan[gagal].str.rstrip("; "))
+    return bersih[~gagal], karantina
+
+
+# ===== SKEMA LEDGER (DITERAPKAN SEKALI SAAT LOAD) =====
+KOLOM_KATEGORIKAL = ["Tipe", "Kategori", "Sumber", "Status"]
+KOLOM_TANGGAL = ["Tanggal", "Tenggat_Waktu", "Tanggal_Bayar"]
+
+
+def normalisasi_ledger(df):
+    """Skema ringkas ledger: dipanggil sekali per load, kode lain tinggal pakai kolomnya.
+
+    Tipe / Kategori / Sumber / Status -> category, Nominal -> int64 rupiah utuh,
+    Tanggal / Tenggat_Waktu / Tanggal_Bayar -> datetime64 (NaT kalau kosong),
+    plus Tanggal_dt = tanggal arus kas.
+    """
+    df = df.copy()
+    for kol in KOLOM_TANGGAL:
+        if kol in df.columns:
+            df[kol] = parse_tanggal(df[kol])
+    df["Nominal"] = pd.to_numeric(df["Nominal"], errors="coerce").fillna(0).round().astype("int64")
+    for kol in KOLOM_KATEGORIKAL:
+        if kol in df.columns:
+            df[kol] = df[kol].astype("category")
+    df["Tanggal_dt"] = hitung_cashflow_date(df)[1]
+    return df
+
+
+def gabung_ledger(df, baru):
+    """Concat dua frame hasil normalisasi_ledger; kolom category tetap category"""
+    if baru.empty:
+        return df
+    if df.empty:
+        return baru
+    df, baru = df.copy(deep=False), baru.copy(deep=False)
+    for kol in KOLOM_KATEGORIKAL:
+        if kol in df.columns and kol in baru.columns:
+            kategori = df[kol].cat.categories.union(baru[kol].cat.categories)
+            df[kol] = df[kol].cat.set_categories(kategori)
+            baru[kol] = baru[kol].cat.set_categories(kategori)
+    return pd.concat([df, baru])
+
+
+# ===== ROLLUP HARIAN =====
+KUNCI_ROLLUP = ["Tanggal", "Kategori", "Sumber", "Tipe", "Status"]
+
+
+def _rollup_kosong():
+    return pd.DataFrame({
+        "Tanggal": pd.Series(dtype="datetime64[ns]"),
+        "Kategori": pd.Series(dtype=object),
+        "Sumber": pd.Series(dtype=object),
+        "Tipe": pd.Series(dtype=object),
+        "Status": pd.Series(dtype=object),
+        "Nominal": pd.Series(dtype="float64"),
+        "Jumlah": pd.Series(dtype="int64"),
+    })
+
+
+def bangun_rollup(df):
+    """Rollup harian per (tanggal arus kas, Kategori, Sumber, Tipe, Status) -> Nominal & Jumlah.
+
+    Dibangun penuh sekali per snapshot, sesudahnya cukup perbarui_rollup().
+    Sumber kosong dihitung sebagai Bank (sama seperti mask_bank lama).
+    """
+    if df.empty:
+        return _rollup_kosong()
+    tanggal_dt = df["Tanggal_dt"] if "Tanggal_dt" in df.columns else hitung_cashflow_date(df)[1]
+    if "Sumber" in df.columns:
+        sumber = df["Sumber"].astype(object).where(df["Sumber"].notna(), "Bank")
+    else:
+        sumber = pd.Series("Bank", index=df.index)
+    return df.groupby(
+        [tanggal_dt.dt.normalize().rename("Tanggal"), df["Kategori"],
+         sumber.rename("Sumber"), df["Tipe"], df["Status"]],
+        dropna=False, observed=True,
+    )["Nominal"].agg(Nominal="sum", Jumlah="size").reset_index()
+
+
+def perbarui_rollup(rollup, lama=None, baru=None):
+    """Update rollup inkremental: kurangi baris versi lama, tambah baris versi baru.
+
+    Insert = baru saja, delete = lama saja, edit = keduanya.
+    Biayanya sebanding baris yang berubah + ukuran rollup, bukan ukuran ledger.
+    """
+    bagian = [rollup] if not rollup.empty else []
+    if lama is not None and not lama.empty:
+        kurang = bangun_rollup(lama)
+        kurang[["Nominal", "Jumlah"]] *= -1
+        bagian.append(kurang)
+    if baru is not None and not baru.empty:
+        bagian.append(bangun_rollup(baru))
+    if not bagian:
+        return _rollup_kosong()
+    hasil = (
+        pd.concat(bagian, ignore_index=True)
+        .groupby(KUNCI_ROLLUP, dropna=False, observed=True)[["Nominal", "Jumlah"]].sum()
+        .reset_index()
+    )
+    return hasil[hasil["Jumlah"] != 0].reset_index(drop=True)
+
+
+def mask_pending(rollup):
+    """Scheduled Settlement yang masih Pending (belum memotong saldo)"""
+    return (rollup["Kategori"] == "Scheduled Settlement") & (rollup["Status"] == "Pending")
+
+
+def pilih_rollup(rollup, tipe=None, sumber=None, pending=None, mulai=None, sampai=None):
+    """Filter rollup harian; mulai / sampai = batas tanggal (inklusif)"""
+    mask = pd.Series(True, index=rollup.index)
+    if tipe is not None:
+        mask &= rollup["Tipe"] == tipe
+    if sumber is not None:
+        mask &= rollup["Sumber"] == sumber
+    if pending is not None:
+        mask &= mask_pending(rollup) == pending
+    if mulai is not None:
+        mask &= rollup["Tanggal"] >= pd.Timestamp(mulai)
+    if sampai is not None:
+        mask &= rollup["Tanggal"] <= pd.Timestamp(sampai)
+    return rollup[mask]
+
+
+# ===== INDEX SALDO KUMULATIF (PREFIX SUM HARIAN) =====
+# Satu kolom kumulatif per (Sumber, Tipe, Pending)
+SERI_INDEX = [(sumber, tipe, pending)
+              for sumber in ("Bank", "Cash")
+              for tipe in ("Pengeluaran", "Pemasukan")
+              for pending in (False, True)]
+
+
+def _vektor_seri(df):
+    """Nominal per tanggal x seri (matrix hari x len(SERI_INDEX)) dari rollup"""
+    pending = mask_pending(df)
+    kolom = []
+    for sumber, tipe, p in SERI_INDEX:
+        mask = (df["Sumber"] == sumber) & (df["Tipe"] == tipe) & (pending == p)
+        kolom.append(df["Nominal"].where(mask, 0))
+    per_hari = pd.concat(kolom, axis=1).groupby(df["Tanggal"]).sum()
+    return per_hari.index.values.astype("datetime64[D]"), per_hari.to_numpy(dtype="float64")
+
+
+def bangun_index_saldo(rollup):
+    """Prefix sum harian dari rollup: total rentang tanggal apa pun = dua lookup.
+
+    kumulatif[i] = total semua hari sebelum tanggal[i]; baris terakhir = total keseluruhan.
+    """
+    harian = rollup[rollup["Tanggal"].notna()]
+    tanggal, nilai = _vektor_seri(harian) if not harian.empty else \
+        (np.array([], dtype="datetime64[D]"), np.zeros((0, len(SERI_INDEX))))
+    kumulatif = np.vstack([np.zeros((1, len(SERI_INDEX))), np.cumsum(nilai, axis=0)])
+    return {"tanggal": tanggal, "kumulatif": kumulatif}
+
+
+def perbarui_index_saldo(index, baru):
+    """Tambah transaksi baru (sudah divalidasi) ke index tanpa bangun ulang.
+
+    Append di tanggal terakhir cuma update satu baris; tanggal lama menggeser suffix.
+    """
+    harian = bangun_rollup(baru)
+    if harian.empty:
+        return index
+    tanggal, kumulatif = index["tanggal"], index["kumulatif"].copy()
+    for tgl, nilai in zip(*_vektor_seri(harian)):
+        pos = np.searchsorted(tanggal, tgl)
+        if pos == len(tanggal) or tanggal[pos] != tgl:
+            tanggal = np.insert(tanggal, pos, tgl)
+            kumulatif = np.insert(kumulatif, pos + 1, kumulatif[pos], axis=0)
+        kumulatif[pos + 1:] += nilai
+    return {"tanggal": tanggal, "kumulatif": kumulatif}
+
+
+def total_rentang(index, mulai=None, sampai=None, tipe=None, sumber=None, pending=None):
+    """Total Nominal di [mulai, sampai] (inklusif, None = tanpa batas) untuk seri yang cocok"""
+    tanggal, kumulatif = index["tanggal"], index["kumulatif"]
+    awal = 0 if mulai is None else np.searchsorted(tanggal, np.datetime64(mulai, "D"), side="left")
+    akhir = len(tanggal) if sampai is None else np.searchsorted(tanggal, np.datetime64(sampai, "D"), side="right")
+    pilih = [i for i, (s, t, p) in enumerate(SERI_INDEX)
+             if (sumber is None or s == sumber) and (tipe is None or t == tipe) and (pending is None or p == pending)]
+    return float((kumulatif[akhir, pilih] - kumulatif[awal, pilih]).sum())
+
+
+# ===== AGREGASI PERIODE (HARI / MINGGU / BULAN / TOTAL) =====
+PERIODE = ["hari", "minggu", "bulan", "total"]
+KUNCI_AGREGAT = ["Kategori", "Sumber", "Tipe", "Pending"]
+
+
+def agregasi_periode(rollup, hari_ini):
+    """Pecah rollup harian jadi bucket hari / minggu / bulan / total.
+
+    Hasilnya tabel kecil (Periode, Kategori, Sumber, Tipe, Pending, Nominal) yang dibaca
+    semua metric card dan tab; biayanya ikut jumlah hari, bukan jumlah transaksi.
+    """
+    harian = rollup.assign(Pending=mask_pending(rollup))
+
+    tgl = harian["Tanggal"]
+    iso = tgl.dt.isocalendar()
+    tahun_iso, minggu_iso, _ = hari_ini.isocalendar()
+    mask_periode = {
+        "hari": tgl == pd.Timestamp(hari_ini),
+        "minggu": (iso["year"] == tahun_iso) & (iso["week"] == minggu_iso),
+        "bulan": (tgl.dt.year == hari_ini.year) & (tgl.dt.month == hari_ini.month),
+        "total": pd.Series(True, index=harian.index),
+    }
+
+    potongan = [
+        harian.loc[mask.fillna(False).astype(bool), KUNCI_AGREGAT + ["Nominal"]].assign(Periode=periode)
+        for periode, mask in mask_periode.items()
+    ]
+    return (
+        pd.concat(potongan, ignore_index=True)
+        .groupby(["Periode"] + KUNCI_AGREGAT, dropna=False, observed=True)["Nominal"].sum()
+        .reset_index()
+    )
+
+
+def pilih_agregat(agg, periode, tipe=None, sumber=None, pending=None):
+    """Ambil baris hasil agregasi_periode untuk satu periode + filter opsional"""
+    mask = agg["Periode"] == periode
+    if tipe is not None:
+        mask &= agg["Tipe"] == tipe
+    if sumber is not None:
+        mask &= agg["Sumber"] == sumber
+    if pending is not None:
+        mask &= agg["Pending"] == pending
+    return agg[mask]
+
+
+def total_agregat(agg, periode, **filter):
+    """Total Nominal untuk satu periode (filter sama dengan pilih_agregat)"""
+    return pilih_agregat(agg, periode, **filter)["Nominal"].sum()
+
+
+# ===== TANGGAL ARUS KAS =====
+def hitung_cashflow_date(df):
+    """Tanggal arus kas versi vektor (pengganti df.apply(cashflow_date, axis=1)).
+
+    Scheduled Settlement yang sudah Cleared pakai Tanggal_Bayar kalau terisi,
+    selain itu pakai Tanggal. Return (Cashflow_Date, Tanggal_dt) dengan satu kali parse.
+    """
+    bayar = df["Tanggal_Bayar"]
+    pakai_bayar = (df["Kategori"] == "Scheduled Settlement") & (df["Status"] == "Cleared") & bayar.notna()
+    # Cek string kosong cuma di subset kandidat (biasanya kecil)
+    pakai_bayar[pakai_bayar] = bayar[pakai_bayar].astype(str).str.strip().ne("")
+    cashflow = df["Tanggal"].where(~pakai_bayar, bayar)
+    return cashflow, parse_tanggal(cashflow)
+
+
+def parse_tanggal(kolom):
+    """Parse kolom tanggal ke datetime64; jalur cepat ISO, sisanya fallback parser umum"""
+    hasil = pd.to_datetime(kolom, errors="coerce", format="ISO8601")
+    gagal = hasil.isna() & kolom.notna()
+    if gagal.any():
+        gagal[gagal] = kolom[gagal].astype(str).str.strip().ne("")
+        if gagal.any():
+            hasil[gagal] = pd.to_datetime(kolom[gagal], errors="coerce")
+    return hasil
+
+
+# ===== JADWAL RECURRING (DIPAKAI recurring_job.py) =====
+def kunci_rule(rule):
+    """Kunci stabil satu rule recurring untuk file penanda"""
+    return f"{rule['Nama']}|{rule['Kategori']}|{rule.get('Frekuensi', 'Bulanan')}"
+
+
+def jatuh_tempo(mulai, frekuensi, dari, sampai):
+    """Semua tanggal jatuh tempo rule di rentang [dari, sampai], tidak sebelum tanggal mulai.
+
+    Bulanan: tanggal yang sama tiap bulan (29-31 dipotong ke akhir bulan).
+    Mingguan: tiap 7 hari dari tanggal mulai.
+    """
+    dari = max(dari, mulai)
+    hasil = []
+    if frekuensi == "Bulanan":
+        tahun, bulan = dari.year, dari.month
+        while (tahun, bulan) <= (sampai.year, sampai.month):
+            hari = min(mulai.day, calendar.monthrange(tahun, bulan)[1])
+            tgl = datetime.date(tahun, bulan, hari)
+            if dari <= tgl <= sampai:
+                hasil.append(tgl)
+            tahun, bulan = (tahun + 1, 1) if bulan == 12 else (tahun, bulan + 1)
+    elif frekuensi == "Mingguan":
+        tgl = dari + datetime.timedelta(days=(mulai - dari).days % 7)
+        while tgl <= sampai:
+            hasil.append(tgl)
+            tgl += datetime.timedelta(days=7)
+    return hasil
+
+
+def _awal_periode(frekuensi, today):
+    if frekuensi == "Mingguan":
+        return today - datetime.timedelta(days=today.weekday())
+    return today.replace(day=1)
+
+
+def _kunci_periode(frekuensi, tgl):
+    if frekuensi == "Mingguan":
+        return ("M",) + tuple(tgl.isocalendar()[:2])
+    return ("B", tgl.year, tgl.month)
+
+
+def _index_periode(df_main):
+    """Ledger -> frame (Kategori, jenis, a, b, Catatan) per periode bulan ("B", tahun, bulan)
+    dan minggu ISO ("M", tahun, minggu); tanggal di-parse sekali"""
+    kolom = ["Kategori", "jenis", "a", "b", "Catatan"]
+    if df_main.empty:
+        return pd.DataFrame(columns=kolom)
+    tgl = parse_tanggal(df_main["Tanggal"])
+    tgl = tgl[tgl.notna() & df_main["Kategori"].notna()]
+    dasar = pd.DataFrame({
+        "Kategori": df_main.loc[tgl.index, "Kategori"].astype(object).values,
+        "Catatan": df_main.loc[tgl.index, "Catatan"].astype(str).values,
+    })
+    iso = tgl.dt.isocalendar()
+    bulan = dasar.assign(jenis="B", a=tgl.dt.year.values, b=tgl.dt.month.values)
+    minggu = dasar.assign(jenis="M", a=iso["year"].astype(int).values, b=iso["week"].astype(int).values)
+    # Catatan yang sama berulang di satu periode cukup dicek sekali
+    return pd.concat([bulan, minggu], ignore_index=True)[kolom].drop_duplicates()
+
+
+def jadwal_recurring(df_recurring, df_main, today, penanda=None, catch_up=False):
+    """Baris recurring yang harus dibuat + penanda baru.
+
+    penanda = {kunci_rule: "YYYY-MM-DD"} jatuh tempo terakhir yang sudah diproses.
+    Mode biasa hanya melihat periode berjalan (bulan / minggu ini); catch_up
+    mem-backfill semua jatuh tempo sejak penanda (atau Tanggal_Mulai) sampai today.
+    Jatuh tempo yang sudah ada di ledger (Kategori sama, periode sama, Catatan memuat
+    Nama) dilewati, jadi aman untuk transaksi yang dulu dibuat dari render path.
+    Semua jatuh tempo dicocokkan ke ledger lewat satu join (Kategori, periode), bukan scan per rule.
+    """
+    penanda = dict(penanda or {})
+    if df_recurring.empty:
+        return [], penanda
+
+    # Jatuh tempo per rule (biasanya 0-1 per rule; catch_up bisa banyak)
+    rules = df_recurring.to_dict("records")
+    mulai_rule = parse_tanggal(df_recurring["Tanggal_Mulai"])
+    tempo_rule, tempo_tgl = [], []
+    for i, (r, mulai) in enumerate(zip(rules, mulai_rule)):
+        if str(r.get("Aktif", "True")).lower() != "true" or pd.isna(mulai):
+            continue
+        frek = r.get("Frekuensi", "Bulanan")
+        kunci = kunci_rule(r)
+        dari = _awal_periode(frek, today)
+        if penanda.get(kunci):
+            terakhir = datetime.date.fromisoformat(penanda[kunci]) + datetime.timedelta(days=1)
+            dari = terakhir if catch_up else max(dari, terakhir)
+        elif catch_up:
+            dari = mulai.date()
+
+        tempo = jatuh_tempo(mulai.date(), frek, dari, today)
+        tempo_rule += [i] * len(tempo)
+        tempo_tgl += tempo
+        if tempo:
+            penanda[kunci] = tempo[-1].isoformat()
+    if not tempo_rule:
+        return [], penanda
+
+    kandidat = pd.DataFrame([
+        (i, rules[i]["Kategori"], str(rules[i]["Nama"])) + _kunci_periode(rules[i].get("Frekuensi", "Bulanan"), tgl)
+        for i, tgl in zip(tempo_rule, tempo_tgl)
+    ], columns=["rule", "Kategori", "Nama", "jenis", "a", "b"]).astype({"Kategori": object})
+    pasangan = kandidat.reset_index().merge(_index_periode(df_main), on=["Kategori", "jenis", "a", "b"])
+    cocok = [nama in catatan for nama, catatan in zip(pasangan["Nama"], pasangan["Catatan"])]
+    sudah_ada = set(pasangan.loc[cocok, "index"])
+
+    hasil = []
+    for j, (i, tgl) in enumerate(zip(tempo_rule, tempo_tgl)):
+        if j in sudah_ada:
+            continue
+        r = rules[i]
+        hasil.append({
+            "Tanggal": tgl.strftime("%Y-%m-%d"),
+            "Tipe": "Pengeluaran", "Kategori": r["Kategori"],
+            "Nominal": r["Nominal"], "Catatan": f"[Auto] {r['Nama']}",
+            "Status": "Cleared", "Tenggat_Waktu": "",
+            "Tanggal_Bayar": tgl.strftime("%Y-%m-%d"),
+        })
+    return hasil, penanda
+
+
+# ===== DIFF EDITOR LOG TRANSAKSI =====
+def diff_halaman(asli, hasil, kolom):
+    """Bandingkan halaman asli vs hasil st.data_editor berdasarkan id.
+
+    Return (diubah, ditambah, ids_dihapus): baris lama yang isinya berubah,
+    baris baru (id kosong), dan id yang hilang dari editor.
+    """
+    hasil_ada_id = hasil[hasil["id"].notna()]
+    ditambah = hasil[hasil["id"].isna()]
+    ids_dihapus = [int(i) for i in asli.loc[~asli["id"].isin(hasil_ada_id["id"]), "id"].dropna()]
+
+    lama = asli.set_index("id")[kolom]
+    baru = hasil_ada_id.set_index("id")[kolom]
+    lama = lama.loc[baru.index.intersection(lama.index)]
+    baru = baru.loc[lama.index]
+    sama = (lama == baru) | (lama.isna() & baru.isna())
+    ids_diubah = sama.index[~sama.all(axis=1)]
+    diubah = hasil_ada_id[hasil_ada_id["id"].isin(ids_diubah)]
+    return diubah, ditambah, ids_dihapus
+
+
+# ===== SIDIK DEDUP IMPORT MANDIRI =====
+PANJANG_CATATAN_SIDIK = 20
+
+
+def normalisasi_catatan(catatan):
+    """Huruf kecil, spasi dirapikan, dipotong ke PANJANG_CATATAN_SIDIK karakter"""
+    if catatan is None or (isinstance(catatan, float) and np.isnan(catatan)):
+        return ""
+    return " ".join(str(catatan).split()).lower()[:PANJANG_CATATAN_SIDIK]
+
+
+def sidik_transaksi(tanggal, nominal, catatan):
+    """Fingerprint stabil (tanggal, nominal, awalan catatan).
+
+    Rumusnya sama dengan kolom transaksi.sidik di migrasi 004 (md5 atas
+    "YYYY-MM-DD|nominal|catatan"), jadi Supabase bisa menolak duplikat juga.
+    """
+    kunci = f"{pd.Timestamp(tanggal):%Y-%m-%d}|{int(round(float(nominal)))}|{normalisasi_catatan(catatan)}"
+    return hashlib.md5(kunci.encode("utf-8")).hexdigest()
+
+
+def index_sidik(df):
+    """Set sidik semua baris ledger; dibangun sekali, lookup per baris import O(1)"""
+    if df.empty:
+        return set()
+    tanggal = pd.to_datetime(df["Tanggal"], errors="coerce")
+    nominal = pd.to_numeric(df["Nominal"], errors="coerce")
+    ok = tanggal.notna() & nominal.notna()
+    return {
+        sidik_transaksi(t, n, c)
+        for t, n, c in zip(tanggal[ok], nominal[ok], df.loc[ok, "Catatan"])
+    }
@@ -0,0 +1,66 @@
+"""Cache hasil parse email Mandiri per Message-ID, di SQLite (mandiri_parse_cache.sqlite).
+
+Email yang Message-ID-nya sudah ada di cache tidak perlu diunduh body-nya lagi,
+cukup header dari FETCH pertama. Email yang bukan transaksi (parse -> None) ikut
+dicatat supaya tidak diparse ulang. Setiap entri menyimpan VERSI_PARSER; entri dari
+versi lain dibuang saat cache dibuka, jadi naikkan VERSI_PARSER kalau hasil parse
+berubah.
+"""
+import contextlib
+import datetime
+import json
+import sqlite3
+
+from mandiri_parser import VERSI_PARSER
+
+CACHE_FILE = "mandiri_parse_cache.sqlite"
+
+_SKEMA = """
+CREATE TABLE IF NOT EXISTS parse_cache (
+    message_id TEXT PRIMARY KEY,
+    versi      INTEGER NOT NULL,
+    transaksi  TEXT,
+    dibuat     TEXT NOT NULL
+)
+"""
+_MAKS_PARAM = 500  # placeholder per query, jauh di bawah batas SQLite
+
+
+@contextlib.contextmanager
+def buka(path=CACHE_FILE):
+    """Koneksi ke cache; entri versi parser lain langsung dihapus. Commit saat keluar"""
+    db = sqlite3.connect(path)
+    try:
+        db.execute(_SKEMA)
+        db.execute("DELETE FROM parse_cache WHERE versi != ?", (VERSI_PARSER,))
+        yield db
+        db.commit()
+    finally:
+        db.close()
+
+
+def ambil(db, message_ids):
+    """{message_id: transaksi (dict) atau None} untuk yang sudah ada di cache"""
+    ids = [m for m in message_ids if m]
+    hasil = {}
+    for i in range(0, len(ids), _MAKS_PARAM):
+        batch = ids[i:i + _MAKS_PARAM]
+        baris = db.execute(
+            f"SELECT message_id, transaksi FROM parse_cache WHERE versi = ? AND message_id IN ({','.join('?' * len(batch))})",
+            (VERSI_PARSER, *batch),
+        )
+        for message_id, transaksi in baris:
+            hasil[message_id] = json.loads(transaksi) if transaksi is not None else None
+    return hasil
+
+
+def simpan(db, entri):
+    """Simpan {message_id: transaksi atau None}; email tanpa Message-ID tidak dicache"""
+    dibuat = datetime.datetime.utcnow().isoformat(timespec="seconds")
+    db.executemany(
+        "INSERT OR REPLACE INTO parse_cache (message_id, versi, transaksi, dibuat) VALUES (?, ?, ?, ?)",
+        [
+            (m, VERSI_PARSER, json.dumps(t, ensure_ascii=False) if t is not None else None, dibuat)
+            for m, t in entri.items() if m
+        ],
+    )
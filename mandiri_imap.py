@@ -0,0 +1,333 @@
+"""Sinkronisasi email notifikasi Livin' Mandiri lewat IMAP, inkremental per UID.
+
+UID terakhir yang sudah diproses disimpan per akun + mailbox di mandiri_state.json,
+bersama UIDVALIDITY mailbox-nya. Fetch berikutnya cuma `UID SEARCH` / `UID FETCH`
+email yang lebih baru; kalau UIDVALIDITY berubah (mailbox dibuat ulang server),
+penanda dibuang dan sinkron mulai lagi dari `limit` email terakhir.
+
+Per sinkron cuma dua jenis FETCH, masing-masing satu per batch UID: header
+(Subject / Date / Message-ID) + BODYSTRUCTURE, lalu part teks email yang lolos.
+HTML lengkap dan lampiran tidak pernah diunduh. Email yang Message-ID-nya sudah
+ada di cache parse (mandiri_cache) dilewati di FETCH kedua.
+"""
+import base64
+import contextlib
+import email
+import imaplib
+import json
+import os
+import quopri
+import re
+import threading
+from email.header import decode_header
+
+import mandiri_cache
+import mandiri_parser
+
+IMAP_HOST    = "imap.gmail.com"
+MAILBOX      = "inbox"
+PENGIRIM     = "noreply.livin@bankmandiri.co.id"
+STATE_FILE   = "mandiri_state.json"
+
+SUBJECT_GAGAL = ["Tidak Berhasil", "Gagal", "Failed", "Ditolak"]
+UKURAN_BATCH  = 500  # UID per perintah FETCH, supaya baris perintah tidak kepanjangan
+
+# Fetch dari tombol dan (nanti) worker jalan di proses yang sama -> file penanda jangan ditulis barengan
+_lock = threading.Lock()
+
+
+# ===== PENANDA UID =====
+def kunci_mailbox(akun, mailbox=MAILBOX):
+    return f"{akun}|{mailbox}"
+
+
+def baca_penanda(path=STATE_FILE):
+    """{kunci_mailbox: {"uidvalidity": int, "uid_terakhir": int}}"""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def simpan_penanda(penanda, path=STATE_FILE):
+    # Tulis ke file sementara dulu supaya file penanda tidak pernah setengah jadi
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(penanda, f, indent=4)
+    os.replace(tmp, path)
+
+
+def _uidvalidity(mail):
+    """UIDVALIDITY mailbox yang barusan di-select"""
+    _, data = mail.response("UIDVALIDITY")
+    if data and data[0] is not None:
+        return int(data[0])
+    _, data = mail.status(MAILBOX, "(UIDVALIDITY)")
+    return int(re.search(rb"UIDVALIDITY (\d+)", data[0]).group(1))
+
+
+def uid_baru(mail, penanda_mailbox, uidvalidity, limit, full_rescan=False):
+    """UID email Mandiri yang perlu diproses, urut naik.
+
+    Sinkron pertama / full rescan / UIDVALIDITY berubah -> `limit` email terakhir.
+    Selain itu semua email dengan UID > uid_terakhir (limit tidak berlaku).
+    """
+    kriteria = f'FROM "{PENGIRIM}"'
+    inkremental = (
+        not full_rescan
+        and penanda_mailbox
+        and penanda_mailbox.get("uidvalidity") == uidvalidity
+    )
+    if inkremental:
+        terakhir = int(penanda_mailbox.get("uid_terakhir", 0))
+        _, data = mail.uid("SEARCH", None, f"UID {terakhir + 1}:*", kriteria)
+        # "n:*" selalu ikut mengembalikan UID tertinggi walau <= terakhir
+        return sorted(u for u in map(int, data[0].split()) if u > terakhir)
+
+    _, data = mail.uid("SEARCH", None, kriteria)
+    return sorted(map(int, data[0].split()))[-limit:]
+
+
+# ===== HEADER =====
+def _subject(msg):
+    subject_raw = decode_header(msg["Subject"] or "")[0]
+    return subject_raw[0].decode(subject_raw[1] or "utf-8") if isinstance(subject_raw[0], bytes) else subject_raw[0]
+
+
+# ===== FETCH BERTAHAP: HEADER + BODYSTRUCTURE DULU, LALU PART TEKS SAJA =====
+ITEM_KEPALA = "(UID BODY.PEEK[HEADER.FIELDS (SUBJECT DATE MESSAGE-ID)] BODYSTRUCTURE)"
+
+_TOKEN = re.compile(rb'\(|\)|"(?:[^"\\]|\\.)*"|[^\s()"]+')
+_AWAL_FETCH = re.compile(rb"^\d+ \(")
+_LITERAL = re.compile(rb"(BODY\[[^\]]*\](?:<\d+>)?) \{\d+\}$")
+
+
+def set_uid(uids):
+    """[1,2,3,7,9,10] -> "1:3,7,9:10" """
+    potongan = []
+    for uid in sorted(uids):
+        if potongan and uid == potongan[-1][1] + 1:
+            potongan[-1][1] = uid
+        else:
+            potongan.append([uid, uid])
+    return ",".join(str(a) if a == b else f"{a}:{b}" for a, b in potongan)
+
+
+def _batch(uids):
+    for i in range(0, len(uids), UKURAN_BATCH):
+        yield uids[i:i + UKURAN_BATCH]
+
+
+def _respons_fetch(data):
+    """Respons imaplib untuk FETCH banyak email -> {uid: (meta, {item: literal})}.
+
+    imaplib memecah satu respons jadi tuple (meta, literal) + bytes lanjutan
+    (mis. b' BODYSTRUCTURE (...))'); potongan itu digabung lagi per email.
+    """
+    hasil = []
+    for item in data:
+        if item is None:
+            continue
+        meta = item[0] if isinstance(item, tuple) else item
+        if _AWAL_FETCH.match(meta) or not hasil:
+            hasil.append([b"", {}])
+        if isinstance(item, tuple):
+            m = _LITERAL.search(meta)
+            if m:
+                hasil[-1][1][m.group(1).decode().upper()] = item[1]
+                meta = meta[:m.start()]
+            else:
+                # Literal di dalam BODYSTRUCTURE (jarang): ganti string kosong
+                meta = re.sub(rb"\{\d+\}$", b'""', meta)
+        hasil[-1][0] += meta
+
+    per_uid = {}
+    for meta, literal in hasil:
+        m = re.search(rb"UID (\d+)", meta)
+        if m:
+            per_uid[int(m.group(1))] = (meta, literal)
+    return per_uid
+
+
+def _bodystructure(meta):
+    """Parse list BODYSTRUCTURE dari meta respons FETCH jadi list Python bersarang"""
+    i = meta.find(b"BODYSTRUCTURE ")
+    if i < 0:
+        return None
+    stack = [[]]
+    for m in _TOKEN.finditer(meta, i + len(b"BODYSTRUCTURE ")):
+        t = m.group()
+        if t == b"(":
+            stack.append([])
+        elif t == b")":
+            if len(stack) == 1:
+                break
+            top = stack.pop()
+            stack[-1].append(top)
+            if len(stack) == 1:
+                return top
+        elif t.startswith(b'"'):
+            stack[-1].append(t[1:-1].replace(b'\\"', b'"').replace(b"\\\\", b"\\").decode("utf-8", "replace"))
+        elif t.upper() == b"NIL":
+            stack[-1].append(None)
+        else:
+            stack[-1].append(t.decode("ascii", "replace"))
+    return None
+
+
+def part_teks(struktur):
+    """(section, subtype, encoding, charset) part text/plain, atau text/html kalau tidak ada"""
+    kandidat = []
+
+    def jalan(node, nomor):
+        if not isinstance(node, list) or not node:
+            return
+        if isinstance(node[0], list):  # multipart: anak-anak dulu, baru subtype
+            for i, anak in enumerate(n for n in node if isinstance(n, list)):
+                jalan(anak, f"{nomor}.{i + 1}" if nomor else str(i + 1))
+        elif len(node) >= 6 and str(node[0]).lower() == "text":
+            sub = str(node[1]).lower()
+            if sub in ("plain", "html"):
+                params = node[2] if isinstance(node[2], list) else []
+                param = {str(k).lower(): v for k, v in zip(params[::2], params[1::2])}
+                kandidat.append((nomor or "1", sub, str(node[5] or "7bit").lower(), param.get("charset")))
+
+    jalan(struktur, "")
+    for sub in ("plain", "html"):
+        for k in kandidat:
+            if k[1] == sub:
+                return k
+    return None
+
+
+def _decode_part(raw, encoding, charset):
+    if encoding == "base64":
+        raw = base64.b64decode(raw)
+    elif encoding == "quoted-printable":
+        raw = quopri.decodestring(raw)
+    try:
+        return raw.decode(charset or "utf-8", errors="ignore")
+    except LookupError:
+        return raw.decode("utf-8", errors="ignore")
+
+
+def ambil_kepala(mail, uids):
+    """{uid: {"subject", "message_id", "part"}} lewat satu FETCH per batch UID"""
+    kepala = {}
+    for batch in _batch(uids):
+        _, data = mail.uid("FETCH", set_uid(batch), ITEM_KEPALA)
+        for uid, (meta, literal) in _respons_fetch(data).items():
+            header = next((v for k, v in literal.items() if k.startswith("BODY[HEADER")), b"")
+            msg = email.message_from_bytes(header)
+            kepala[uid] = {
+                "subject": _subject(msg),
+                "message_id": (msg["Message-ID"] or "").strip(),
+                "part": part_teks(_bodystructure(meta)),
+            }
+    return kepala
+
+
+def ambil_body(mail, part_per_uid):
+    """{uid: body teks}; cuma part teks yang diunduh, dikelompokkan per section"""
+    per_section = {}
+    for uid, part in part_per_uid.items():
+        if part:
+            per_section.setdefault(part[0], []).append(uid)
+
+    bodies = {}
+    for section, uids in per_section.items():
+        for batch in _batch(sorted(uids)):
+            _, data = mail.uid("FETCH", set_uid(batch), f"(UID BODY.PEEK[{section}])")
+            for uid, (_, literal) in _respons_fetch(data).items():
+                if uid not in part_per_uid:
+                    continue
+                _, sub, encoding, charset = part_per_uid[uid]
+                body = _decode_part(literal.get(f"BODY[{section}]", b""), encoding, charset)
+                bodies[uid] = mandiri_parser.html_ke_teks(body) if sub == "html" else body
+    return bodies
+
+
+# ===== SINKRON =====
+def sinkron(mail, akun, limit=10, full_rescan=False, state_file=STATE_FILE, today=None, debug=None,
+            cache_file=mandiri_cache.CACHE_FILE):
+    """Proses email Mandiri baru di koneksi IMAP yang sudah login; return list transaksi.
+
+    `mail` = objek imaplib.IMAP4 (atau pengganti untuk tes). `debug` (dict, opsional)
+    diisi body email pertama yang diunduh di key "body" untuk panel debug di app.
+    cache_file=None mematikan cache parse.
+    Penanda UID baru cuma maju sampai sebelum email pertama yang header / body-nya gagal
+    terunduh; email itu dan sesudahnya diproses lagi di sinkron berikutnya (yang sudah
+    diparse diambil dari cache), jadi transaksinya juga baru dikembalikan saat itu.
+    """
+    results = []
+    with _lock, (mandiri_cache.buka(cache_file) if cache_file else contextlib.nullcontext()) as cache:
+        mail.select(MAILBOX)
+        uidvalidity = _uidvalidity(mail)
+        penanda = baca_penanda(state_file)
+        kunci = kunci_mailbox(akun)
+
+        uids = uid_baru(mail, penanda.get(kunci), uidvalidity, limit, full_rescan)
+
+        # Header + BODYSTRUCTURE dulu; email gagal dibuang sebelum body apa pun diunduh
+        kepala = ambil_kepala(mail, uids)
+        lolos = [u for u in uids if u in kepala and not any(k in kepala[u]["subject"] for k in SUBJECT_GAGAL)]
+        # Yang sudah pernah diparse (versi parser sama) tidak perlu body-nya lagi
+        tersimpan = mandiri_cache.ambil(cache, [kepala[u]["message_id"] for u in lolos]) if cache else {}
+        bodies = ambil_body(mail, {u: kepala[u]["part"] for u in lolos if kepala[u]["message_id"] not in tersimpan})
+
+        gagal_unduh = [
+            u for u in uids
+            if u not in kepala
+            or (u in lolos and kepala[u]["message_id"] not in tersimpan and kepala[u]["part"] and u not in bodies)
+        ]
+        batas = min(gagal_unduh) if gagal_unduh else None
+
+        # Terbaru dulu, sama seperti urutan preview sebelumnya
+        hasil_baru = {}
+        for uid in reversed(lolos):
+            message_id = kepala[uid]["message_id"]
+            if message_id in tersimpan:
+                transaksi = tersimpan[message_id]
+            else:
+                body = bodies.get(uid, "")
+                if debug is not None and "body" not in debug:
+                    debug["body"] = body[:3000]
+                transaksi = mandiri_parser.parse_transaksi(kepala[uid]["subject"], body, today)
+                # Body yang gagal terunduh jangan dicache sebagai "bukan transaksi"
+                if uid in bodies or not kepala[uid]["part"]:
+                    hasil_baru[message_id] = transaksi
+            if transaksi and (batas is None or uid < batas):
+                results.append(transaksi)
+        if cache:
+            mandiri_cache.simpan(cache, hasil_baru)
+
+        lama = penanda.get(kunci) or {}
+        terakhir = lama.get("uid_terakhir", 0) if lama.get("uidvalidity") == uidvalidity else 0
+        penanda[kunci] = {
+            "uidvalidity": uidvalidity,
+            # batas - 1, bukan UID sukses terakhir: sinkron pertama tetap tidak mundur melewati `limit`
+            "uid_terakhir": max([terakhir] + uids) if batas is None else max(terakhir, batas - 1),
+        }
+        simpan_penanda(penanda, state_file)
+    return results
+
+
+def login(gmail_user, gmail_pass, host=IMAP_HOST):
+    """Koneksi IMAP SSL yang sudah login"""
+    mail = imaplib.IMAP4_SSL(host)
+    mail.login(gmail_user, gmail_pass)
+    return mail
+
+
+def fetch_mandiri_emails(gmail_user, gmail_pass, limit=10, full_rescan=False, debug=None):
+    """Login Gmail, sinkron email Mandiri baru; return (rows, error)"""
+    try:
+        mail = login(gmail_user, gmail_pass)
+        try:
+            results = sinkron(mail, gmail_user, limit, full_rescan, debug=debug)
+        finally:
+            mail.logout()
+    except Exception as e:
+        return [], str(e)
+    return results, None
@@ -0,0 +1,164 @@
+"""Parser body email notifikasi Livin' Mandiri -> dict transaksi.
+
+Pola regex dikompilasi sekali saat import. Nominal, tanggal dan jam masing-masing
+diambil dengan satu finditer (kandidat dengan label terkuat menang, sama dengan
+urutan fallback lama); penerima masih berlapis, tapi lapis berikutnya hanya dicoba
+kalau lapis sebelumnya gagal. Tanggal dibangun langsung dari tabel nama bulan,
+tanpa pd.to_datetime.
+
+Regresi: benchmarks/corpus_mandiri.json (body contoh yang sudah dianonimkan +
+hasil yang diharapkan), dijalankan oleh benchmarks/bench_parser.py.
+"""
+import datetime
+import html
+import re
+
+VERSI_PARSER = 1
+
+# ===== POLA =====
+# Label nominal, urut prioritas; kandidat tanpa label = "Rp <angka>" pertama di body
+LABEL_NOMINAL = [r"Total\s*Transaksi", r"Nominal\s*Transaksi", r"Nominal\s*Top-?up", r"Nominal\s*Transfer"]
+_NOMINAL = re.compile(
+    r"(?:" + "|".join(f"(?P<l{i}>{p})" for i, p in enumerate(LABEL_NOMINAL)) + r")?\s*Rp\s*(?P<angka>[\d.,]+)"
+)
+# Lookahead: kandidat boleh tumpang tindih ("2026 Mei 2026" -> "26 Mei 2026" tetap ketemu)
+_TANGGAL = re.compile(r"(?=(?P<label>Tanggal\s*)?(?P<hari>\d{1,2})\s+(?P<bulan>\w+)\s+(?P<tahun>\d{4}))")
+_JAM = re.compile(r"(?P<label>Jam\s*)?(?P<jam>\d{2}:\d{2}:\d{2})(?P<wib>\s*WIB)?")
+
+_PENERIMA = [
+    re.compile(r'Penerima\s+"?(.*?)"?\s+[\w\s().,\-]*?\s*-\s*ID', re.IGNORECASE | re.DOTALL),
+    re.compile(r'Penyedia\s*Jasa\s+([\w\s]+?)(?:\s*\*{4}\d+)'),
+    re.compile(r'(?:Tujuan|Kepada)\s+([A-Za-z0-9\s,.\-]{3,50}?)(?:\s{2,}|\d{10,})'),
+    re.compile(
+        r'(?:Penerima|Penyedia\s*Jasa|Tujuan|Kepada)\s+"?([\w\s\',.\-&/()]{3,60}?)"?(?:\s*-\s*ID|\*{4}|\s{2,})',
+        re.IGNORECASE,
+    ),
+]
+PENERIMA_DEFAULT = "Mandiri Transaction"
+_BUKAN_PENERIMA = ("Tanggal", "Nominal", "Jam", "Halo", "Berikut")
+
+_KELUAR = re.compile(r"Pembayaran|Debit|Transfer Keluar|Tarik|Top-up|Top Up")
+_MASUK = re.compile(r"Kredit|Transfer Masuk|Terima|Masuk")
+
+_TAG_HTML = re.compile(r"<[^>]+>")
+_SPASI = re.compile(r"\s+")
+
+# "1.250.000,50" -> "1250000.50" dalam satu str.translate
+_ANGKA = str.maketrans({".": None, ",": "."})
+_KUTIP = str.maketrans({'"': None, "'": None})
+
+# ===== TABEL BULAN =====
+# Singkatan & nama lengkap Indonesia + Inggris (yang dulu bisa dibaca pd.to_datetime)
+_BULAN_SINGKAT = ["jan", "feb", "mar", "apr", "mei", "jun", "jul", "agu", "sep", "okt", "nov", "des"]
+_BULAN_PENUH = ["januari", "februari", "maret", "april", "mei", "juni", "juli", "agustus",
+                "september", "oktober", "november", "desember"]
+_MONTH = ["january", "february", "march", "april", "may", "june", "july", "august",
+          "september", "october", "november", "december"]
+BULAN = {}
+for _i, _nama in enumerate(_MONTH):
+    BULAN[_nama] = BULAN[_nama[:3]] = _i + 1
+for _i, _nama in enumerate(_BULAN_PENUH):
+    BULAN[_nama] = BULAN[_BULAN_SINGKAT[_i]] = _i + 1
+BULAN["sept"] = 9
+
+# Tanpa label "Tanggal", cuma nama bulan Indonesia yang dulu dikenali (singkatan dulu, baru lengkap)
+_PRIORITAS_BULAN = {**{b.title(): 2 for b in _BULAN_PENUH}, **{b.title(): 1 for b in _BULAN_SINGKAT}}
+
+
+def hari_ini_wib():
+    return (datetime.datetime.utcnow() + datetime.timedelta(hours=7)).date()
+
+
+def html_ke_teks(body_html):
+    """Body text/html -> teks satu baris"""
+    body = html.unescape(_TAG_HTML.sub(" ", body_html))
+    return _SPASI.sub(" ", body).strip()
+
+
+# ===== EKSTRAKSI =====
+def cari_nominal(body):
+    terbaik, rank = None, len(LABEL_NOMINAL) + 1
+    for m in _NOMINAL.finditer(body):
+        r = next((i for i in range(len(LABEL_NOMINAL)) if m.group(f"l{i}")), len(LABEL_NOMINAL))
+        if r < rank:
+            terbaik, rank = m, r
+            if r == 0:
+                break
+    if not terbaik:
+        return 0
+    try:
+        return int(float(terbaik.group("angka").translate(_ANGKA)))
+    except ValueError:
+        return 0
+
+
+def cari_tanggal(body, today):
+    terbaik, rank = None, 3
+    for m in _TANGGAL.finditer(body):
+        r = 0 if m.group("label") else _PRIORITAS_BULAN.get(m.group("bulan"), 3)
+        if r < rank:
+            terbaik, rank = m, r
+            if r == 0:
+                break
+    if not terbaik:
+        return str(today)
+    nama = terbaik.group("bulan")
+    bulan = int(nama) if nama.isdigit() else BULAN.get(nama.lower())
+    try:
+        return datetime.date(int(terbaik.group("tahun")), bulan, int(terbaik.group("hari"))).isoformat()
+    except (TypeError, ValueError):
+        return str(today)
+
+
+def cari_jam(body):
+    cadangan = ""
+    for m in _JAM.finditer(body):
+        if m.group("wib"):
+            return m.group("jam")
+        if m.group("label") and not cadangan:
+            cadangan = m.group("jam")
+    return cadangan
+
+
+def cari_penerima(body):
+    penerima = PENERIMA_DEFAULT
+    m = _PENERIMA[0].search(body)
+    if m:
+        kandidat = m.group(1).strip()
+        if 2 < len(kandidat) < 80 and not any(k in kandidat for k in _BUKAN_PENERIMA):
+            penerima = kandidat
+    for pola in _PENERIMA[1:]:
+        if penerima != PENERIMA_DEFAULT:
+            break
+        m = pola.search(body)
+        if m:
+            penerima = m.group(1).strip()
+    return " ".join(penerima.translate(_KUTIP).split())
+
+
+def arah(subject):
+    if _KELUAR.search(subject):
+        return "Pengeluaran"
+    if _MASUK.search(subject):
+        return "Pemasukan"
+    return "Pengeluaran"
+
+
+def parse_transaksi(subject, body, today=None):
+    """Dict transaksi dari subject + body email, atau None kalau nominal tidak ketemu"""
+    nominal = cari_nominal(body)
+    if nominal <= 0:
+        return None
+    tanggal = cari_tanggal(body, today or hari_ini_wib())
+    jam = cari_jam(body)
+    penerima = cari_penerima(body)
+    return {
+        "Tanggal": tanggal,
+        "Tipe": arah(subject),
+        "Kategori": "Lainnya",
+        "Nominal": nominal,
+        "Catatan": f"[{jam}] {penerima}" if jam else penerima,
+        "Status": "Cleared",
+        "Tanggal_Bayar": tanggal,
+        "subject": subject
+    }
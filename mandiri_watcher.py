@@ -0,0 +1,241 @@
+"""Worker IMAP IDLE: tunggu notifikasi Mandiri baru, parse, taruh di antrean import.
+
+Satu thread per akun memegang koneksi IDLE. Setiap server mengabarkan email baru
+(`* n EXISTS`), worker menjalankan mandiri_imap.sinkron (cuma UID baru) dan hasilnya
+masuk antrean pending di mandiri_antrean.json; tab Mandiri tinggal menampilkan
+antrean itu. Koneksi putus / login gagal -> sambung ulang dengan backoff eksponensial.
+
+Tidak ada Streamlit di sini; pub.py yang menyimpan handle worker di cache_resource.
+"""
+import datetime
+import imaplib
+import itertools
+import json
+import os
+import random
+import re
+import select
+import ssl
+import threading
+
+import ledger
+import mandiri_cache
+import mandiri_imap
+
+ANTREAN_FILE = "mandiri_antrean.json"
+
+IDLE_MAKS    = 25 * 60  # RFC 2177: perbarui IDLE sebelum 29 menit
+POLL_NOOP    = 60       # server tanpa IDLE: NOOP + sinkron tiap sekian detik
+BACKOFF_AWAL = 2
+BACKOFF_MAKS = 300
+
+_EMAIL_BARU = re.compile(rb"^\* \d+ (EXISTS|RECENT)")
+_nomor_tag = itertools.count(1)
+
+
+# ===== ANTREAN PENDING IMPORT =====
+def _sidik_row(row):
+    return ledger.sidik_transaksi(row["Tanggal"], row["Nominal"], row["Catatan"])
+
+
+def buat_antrean(path=ANTREAN_FILE):
+    """Antrean bersama worker + tab Mandiri; isinya bertahan lewat restart app"""
+    try:
+        with open(path, "r") as f:
+            rows = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        rows = []
+    return {"path": path, "rows": rows, "lock": threading.Lock()}
+
+
+def _simpan_antrean(antrean):
+    tmp = antrean["path"] + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(antrean["rows"], f, indent=4, ensure_ascii=False)
+    os.replace(tmp, antrean["path"])
+
+
+def tambah_antrean(antrean, rows):
+    """Tambah transaksi hasil parse; yang sidiknya sudah ada di antrean dilewati. Return jumlah baru"""
+    with antrean["lock"]:
+        ada = {_sidik_row(r) for r in antrean["rows"]}
+        baru = []
+        for r in rows:
+            sidik = _sidik_row(r)
+            if sidik not in ada:
+                ada.add(sidik)
+                baru.append(r)
+        if baru:
+            antrean["rows"].extend(baru)
+            _simpan_antrean(antrean)
+        return len(baru)
+
+
+def isi_antrean(antrean):
+    with antrean["lock"]:
+        return list(antrean["rows"])
+
+
+def buang_antrean(antrean, rows):
+    """Keluarkan baris yang sudah diimport / dibatalkan dari antrean"""
+    buang = {_sidik_row(r) for r in rows}
+    with antrean["lock"]:
+        antrean["rows"] = [r for r in antrean["rows"] if _sidik_row(r) not in buang]
+        _simpan_antrean(antrean)
+
+
+# ===== IDLE =====
+def _exists_tertunda(mail):
+    """Ada EXISTS yang dikirim server di tengah sinkron (SEARCH / FETCH) dan tidak akan
+    dikabarkan ulang saat IDLE.
+
+    select() imaplib mengosongkan untagged_responses lalu meninggalkan EXISTS miliknya
+    sendiri di sana; kabar berikutnya ditumpuk di list yang sama. Jadi baru dihitung
+    tertunda kalau list-nya lebih dari satu.
+    """
+    return len(mail.untagged_responses.pop("EXISTS", [])) > 1
+
+
+def _tertahan(mail):
+    """Ada byte yang sudah diterima tapi belum dibaca: buffer SSL atau buffer mail.file.
+
+    imaplib membaca lewat BufferedReader, jadi beberapa baris dalam satu paket bisa
+    tertahan di situ padahal socket-nya sudah tidak "readable" bagi select().
+    peek() dijalankan dengan socket non-blocking supaya tidak menunggu kalau buffer kosong.
+    """
+    sock = mail.sock
+    if getattr(sock, "pending", None) and sock.pending():
+        return True
+    timeout = sock.gettimeout()
+    sock.settimeout(0)
+    try:
+        return bool(mail.file.peek(1))
+    except (BlockingIOError, ssl.SSLWantReadError):
+        return False
+    finally:
+        sock.settimeout(timeout)
+
+
+def _siap_dibaca(mail, detik):
+    if _tertahan(mail):
+        return True
+    return bool(select.select([mail.sock], [], [], detik)[0])
+
+
+def idle(mail, batas, berhenti=None):
+    """Kirim IDLE, tunggu `* n EXISTS` atau `batas` detik; return True kalau ada email baru.
+
+    imaplib (Python < 3.14) belum punya IDLE, jadi perintahnya ditulis langsung ke
+    socket. Dicek per detik supaya `berhenti` (threading.Event) cepat direspon.
+    """
+    tag = b"W%d" % next(_nomor_tag)
+    mail.send(tag + b" IDLE\r\n")
+    baris = mail.readline()
+    if not baris.startswith(b"+"):
+        raise imaplib.IMAP4.error(f"IDLE ditolak: {baris!r}")
+
+    ada = False
+    sisa = batas
+    while sisa > 0 and not ada and not (berhenti and berhenti.is_set()):
+        tunggu = min(1.0, sisa)
+        sisa -= tunggu
+        if not _siap_dibaca(mail, tunggu):
+            continue
+        baris = mail.readline()
+        if not baris or baris.startswith(b"* BYE"):
+            raise imaplib.IMAP4.abort("koneksi ditutup server saat IDLE")
+        ada = bool(_EMAIL_BARU.match(baris))
+
+    mail.send(b"DONE\r\n")
+    while True:
+        baris = mail.readline()
+        if not baris:
+            raise imaplib.IMAP4.abort("koneksi putus setelah DONE")
+        if baris.startswith(tag + b" "):
+            if not baris.startswith(tag + b" OK"):
+                raise imaplib.IMAP4.error(f"IDLE gagal: {baris!r}")
+            return ada
+        # EXISTS yang datang bareng "+ idling" bisa baru terbaca di sini
+        ada = ada or bool(_EMAIL_BARU.match(baris))
+
+
+# ===== WORKER =====
+def backoff(gagal):
+    """Detik tunggu sebelum sambung ulang ke-`gagal` (eksponensial + jitter, maks BACKOFF_MAKS)"""
+    return min(BACKOFF_MAKS, BACKOFF_AWAL * 2 ** (gagal - 1)) * random.uniform(0.8, 1.0)
+
+
+def _status(status, keadaan, **info):
+    sekarang = datetime.datetime.utcnow() + datetime.timedelta(hours=7)
+    status.update(keadaan=keadaan, sejak=sekarang.strftime("%H:%M:%S"), **info)
+
+
+def jalankan(akun, buat_koneksi, antrean, berhenti, status=None,
+             state_file=mandiri_imap.STATE_FILE, cache_file=mandiri_cache.CACHE_FILE, log=print):
+    """Loop worker sampai `berhenti` di-set.
+
+    buat_koneksi() -> objek imaplib yang sudah login (diinjeksi supaya bisa diuji
+    dengan server lokal). status (dict) di-update untuk ditampilkan di app.
+    """
+    status = {} if status is None else status
+    gagal = 0
+    while not berhenti.is_set():
+        mail = None
+        tunggu = 0
+        try:
+            _status(status, "menghubungkan")
+            mail = buat_koneksi()
+            # Susul email yang masuk selama worker mati, baru mulai IDLE
+            baru = tambah_antrean(antrean, mandiri_imap.sinkron(mail, akun, state_file=state_file, cache_file=cache_file))
+            gagal = 0
+            _status(status, "idle", ditambah=status.get("ditambah", 0) + baru, error="")
+            bisa_idle = "IDLE" in mail.capabilities
+
+            while not berhenti.is_set():
+                if bisa_idle:
+                    ada = _exists_tertunda(mail) or idle(mail, IDLE_MAKS, berhenti)
+                else:
+                    berhenti.wait(POLL_NOOP)
+                    mail.noop()
+                    ada = True
+                if ada and not berhenti.is_set():
+                    rows = mandiri_imap.sinkron(mail, akun, state_file=state_file, cache_file=cache_file)
+                    baru = tambah_antrean(antrean, rows)
+                    if baru:
+                        log(f"[mandiri] {baru} transaksi baru masuk antrean")
+                    _status(status, "idle", ditambah=status.get("ditambah", 0) + baru)
+        except Exception as e:
+            gagal += 1
+            tunggu = backoff(gagal)
+            log(f"[mandiri] Watcher error ({e}); sambung ulang dalam {tunggu:.0f} detik")
+            _status(status, "menunggu", error=str(e), gagal=gagal, coba_lagi=round(tunggu))
+        finally:
+            if mail is not None:
+                try:
+                    mail.logout()
+                except Exception:
+                    pass
+        if tunggu:
+            berhenti.wait(tunggu)
+    _status(status, "berhenti")
+
+
+def mulai(akun, buat_koneksi, antrean, **kwargs):
+    """Start worker di thread daemon; return handle {thread, berhenti, status}"""
+    berhenti = threading.Event()
+    status = {"akun": akun}
+    thread = threading.Thread(
+        target=jalankan,
+        args=(akun, buat_koneksi, antrean, berhenti, status),
+        kwargs=kwargs,
+        name=f"mandiri-watcher-{akun}",
+        daemon=True,
+    )
+    thread.start()
+    return {"thread": thread, "berhenti": berhenti, "status": status}
+
+
+def hentikan(handle, tunggu=None):
+    handle["berhenti"].set()
+    if tunggu:
+        handle["thread"].join(tunggu)
@@ -3,13 +3,16 @@ import pandas as pd
 import datetime
 import os
 import streamlit.components.v1 as components
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import plotly.express as px
 import plotly.graph_objects as go
-import imaplib
-import email
-from email.header import decode_header
-import re
 import tomllib
+import threading
+import functools
+import time
+import copy
+import calendar
+from concurrent.futures import ThreadPoolExecutor, Future
 import datetime
 now_wib = datetime.datetime.utcnow() + datetime.timedelta(hours=7)
 hari_ini_wib = now_wib.date()
@@ -84,6 +87,11 @@ h1 { font-size:1.8rem!important; }
 
 from st_supabase_connection import SupabaseConnection
 
+import ledger
+import recurring_job
+import mandiri_imap
+import mandiri_watcher
+
 try:
     with open("secrets.toml", "rb") as f:
         secrets_data = tomllib.load(f)
@@ -102,31 +110,641 @@ conn = st.connection(
 )
 
 
-@st.cache_data(ttl=5)  # Cache hanya 10 detik, atau bisa 0 untuk no cache
+# ===== CACHE REGISTRY PER TABEL =====
+CACHE_TTL = 5
+# Tabel yang punya probe perubahan: loader-nya cuma fetch ulang kalau sidik berubah,
+# TTL panjang di bawah hanya jaring pengaman
+PROBE_TABEL    = ("transaksi", "tabungan", "cash", "settings")
+PROBE_TTL      = 2
+CACHE_TTL_MAKS = 300
+# Stale-while-revalidate: snapshot yang sudah basi (TTL lewat / probe berubah) masih boleh
+# dipakai (sambil refresh di background) sampai sekian detik sejak jadi basi; lebih lama -> tunggu fetch sinkron
+SWR_MAKS_BASI  = 60
+
+
+@st.cache_resource
+def _cache_registry():
+    """Registry cache per tabel Supabase + statistik hit/miss/evict (dipakai semua session)"""
+    return {"fungsi": {}, "stat": {}, "lock": threading.Lock()}
+
+
+def _catat_cache(tabel, jenis):
+    registry = _cache_registry()
+    with registry["lock"]:
+        stat = registry["stat"].setdefault(tabel, {"panggil": 0, "miss": 0, "evict": 0, "basi": 0})
+        stat[jenis] += 1
+
+
+@st.cache_resource
+def _swr_store():
+    """Snapshot terakhir loader mode swr (dipakai semua session).
+
+    entri = kunci -> {nilai, waktu, sidik, galat, basi_sejak}; proses = fetch yang sedang jalan;
+    generasi naik tiap invalidasi supaya hasil fetch lama tidak menimpa.
+    """
+    return {"entri": {}, "proses": {}, "generasi": {}, "lock": threading.Lock()}
+
+
+def _swr_refresh(tabel, kunci, fungsi, args, kwargs, sidik):
+    """Fetch satu kunci dengan single-flight: pemanggil lain dapat future yang sama"""
+    store = _swr_store()
+    with store["lock"]:
+        future = store["proses"].get(kunci)
+        if future is not None:
+            return future
+        future = store["proses"][kunci] = Future()
+        generasi = store["generasi"].get(tabel, 0)
+    try:
+        _catat_cache(tabel, "miss")
+        nilai = fungsi(*args, **kwargs)
+        with store["lock"]:
+            if store["generasi"].get(tabel, 0) == generasi:
+                store["entri"][kunci] = {"nilai": nilai, "waktu": time.time(), "sidik": sidik, "galat": None}
+        future.set_result(nilai)
+    except Exception as e:
+        with store["lock"]:
+            entri = store["entri"].get(kunci)
+            if entri is not None:
+                entri["galat"] = str(e)
+        # Snapshot terakhir yang bagus tetap dipakai; error hanya kalau belum pernah ada data
+        if entri is not None:
+            future.set_result(entri["nilai"])
+        else:
+            future.set_exception(e)
+    finally:
+        with store["lock"]:
+            store["proses"].pop(kunci, None)
+    return future
+
+
+def _salinan(nilai):
+    """Salinan dangkal snapshot swr: kolom baru / rename di pemanggil tidak mengubah cache,
+    tanpa menyalin ulang seluruh isi ledger tiap rerun"""
+    if isinstance(nilai, pd.DataFrame):
+        return nilai.copy(deep=False)
+    if isinstance(nilai, dict):
+        return dict(nilai)
+    return nilai
+
+
+def _bungkus_swr(tabel, fungsi, ttl, pakai_probe):
+    store = _swr_store()
+
+    @functools.wraps(fungsi)
+    def pembungkus(*args, **kwargs):
+        _catat_cache(tabel, "panggil")
+        kunci = (fungsi.__name__, args, tuple(sorted(kwargs.items())))
+        sidik = probe_versi().get(tabel) if pakai_probe else None
+        with store["lock"]:
+            entri = store["entri"].get(kunci)
+
+        if entri is not None:
+            sekarang = time.time()
+            kedaluwarsa = entri["waktu"] + ttl
+            if entri["sidik"] == sidik and sekarang < kedaluwarsa:
+                return _salinan(entri["nilai"])
+            # Basi sejak TTL lewat atau sejak perubahan probe pertama kali terlihat
+            with store["lock"]:
+                if entri.get("basi_sejak") is None:
+                    entri["basi_sejak"] = min(sekarang, kedaluwarsa)
+                sedang_refresh = kunci in store["proses"]
+            if sekarang - entri["basi_sejak"] < SWR_MAKS_BASI:
+                # Kasih snapshot lama sekarang, refresh jalan di background (cukup satu)
+                _catat_cache(tabel, "basi")
+                if not sedang_refresh:
+                    _thread_pool().submit(_swr_refresh, tabel, kunci, fungsi, args, kwargs, sidik)
+                return _salinan(entri["nilai"])
+        return _salinan(_swr_refresh(tabel, kunci, fungsi, args, kwargs, sidik).result())
+
+    def bersihkan():
+        with store["lock"]:
+            store["generasi"][tabel] = store["generasi"].get(tabel, 0) + 1
+            for kunci in [k for k in store["entri"] if k[0] == fungsi.__name__]:
+                del store["entri"][kunci]
+
+    pembungkus.clear = bersihkan
+    return pembungkus
+
+
+def waktu_data_swr():
+    """(waktu fetch snapshot tertua, ada refresh yang gagal) dari semua loader swr"""
+    store = _swr_store()
+    with store["lock"]:
+        entri = list(store["entri"].values())
+    if not entri:
+        return None, False
+    return min(e["waktu"] for e in entri), any(e["galat"] for e in entri)
+
+
+def cache_tabel(tabel, ttl=None, swr=False):
+    """Decorator: cache loader dan daftarkan ke tabel Supabase yang dibacanya.
+
+    Untuk tabel di PROBE_TABEL, sidik dari probe_versi() ikut jadi key cache.
+    swr=True: snapshot terakhir langsung dikembalikan dan di-refresh di background;
+    loader-nya harus raise kalau gagal supaya snapshot lama tidak tertimpa fallback.
+    """
+    pakai_probe = tabel in PROBE_TABEL
+    if ttl is None:
+        ttl = CACHE_TTL_MAKS if pakai_probe else CACHE_TTL
+
+    def dekorator(fungsi):
+        if swr:
+            pembungkus = _bungkus_swr(tabel, fungsi, ttl, pakai_probe)
+            _cache_registry()["fungsi"].setdefault(tabel, {})[fungsi.__name__] = pembungkus
+            return pembungkus
+
+        # sidik_probe sengaja tanpa underscore: argumen "_x" tidak di-hash st.cache_data
+        def _miss(*args, sidik_probe=None, **kwargs):
+            _catat_cache(tabel, "miss")
+            return fungsi(*args, **kwargs)
+        # Nama unik supaya st.cache_data memisahkan cache tiap loader
+        _miss.__name__ = _miss.__qualname__ = fungsi.__name__
+        cached = st.cache_data(ttl=ttl, max_entries=64)(_miss)
+        _cache_registry()["fungsi"].setdefault(tabel, {})[fungsi.__name__] = cached
+
+        @functools.wraps(fungsi)
+        def pembungkus(*args, **kwargs):
+            _catat_cache(tabel, "panggil")
+            if pakai_probe:
+                kwargs["sidik_probe"] = probe_versi().get(tabel)
+            return cached(*args, **kwargs)
+        return pembungkus
+    return dekorator
+
+
+def invalidasi_tabel(*tabel):
+    """Buang cache loader yang membaca tabel tertentu (tanpa argumen = semua tabel)"""
+    registry = _cache_registry()
+    for nama in tabel or list(registry["fungsi"]):
+        for cached in registry["fungsi"].get(nama, {}).values():
+            cached.clear()
+        _catat_cache(nama, "evict")
+    # Penulis harus langsung lihat tulisannya sendiri, jangan tunggu PROBE_TTL
+    probe_versi.clear()
+
+
+def statistik_cache():
+    """Ringkasan hit/miss/evict per tabel untuk ditampilkan di sidebar"""
+    registry = _cache_registry()
+    with registry["lock"]:
+        baris = [
+            {"Tabel": tabel, "Panggil": s["panggil"], "Hit": s["panggil"] - s["miss"],
+             "Miss": s["miss"], "Basi": s["basi"], "Evict": s["evict"],
+             "Hit Rate": f"{(s['panggil'] - s['miss']) / s['panggil'] * 100:.0f}%" if s["panggil"] else "-"}
+            for tabel, s in sorted(registry["stat"].items())
+        ]
+    return pd.DataFrame(baris)
+
+
+# ===== SINGLE-FLIGHT READ SUPABASE (LINTAS SESSION) =====
+@st.cache_resource
+def _read_bersama():
+    """Query read yang sedang jalan + statistik per query (dipakai semua session)"""
+    return {"proses": {}, "stat": {}, "lock": threading.Lock()}
+
+
+def _kunci_query(query):
+    """(method, path, params, headers) query PostgREST, None kalau builder tidak dikenali"""
+    req = getattr(query, "request", query)  # postgrest baru simpan di .request
+    try:
+        return (req.http_method, str(req.path), str(req.params), str(sorted(dict(req.headers).items())))
+    except AttributeError:
+        return None
+
+
+# Ukuran respons HTTP per thread: hook httpx mengisi, baca() yang membaca
+_ukuran_respons = threading.local()
+
+
+def _catat_ukuran_respons(response):
+    """Event hook httpx: ukuran body respons untuk request yang sedang diukur baca()"""
+    if getattr(_ukuran_respons, "aktif", False):
+        response.read()  # Body memang akan dibaca execute(); di sini cuma lebih awal
+        _ukuran_respons.byte += len(response.content)
+
+
+def _pasang_hook_ukuran(query):
+    """Pasang _catat_ukuran_respons di session httpx milik query (sekali per session)"""
+    req = getattr(query, "request", query)
+    sesi = getattr(req, "session", None) or getattr(query, "session", None)
+    hooks = getattr(sesi, "event_hooks", None)
+    if hooks is None:
+        return False
+    if _catat_ukuran_respons not in hooks.get("response", []):
+        hooks["response"] = list(hooks.get("response", [])) + [_catat_ukuran_respons]
+        sesi.event_hooks = hooks
+    return True
+
+
+def _label_query(query):
+    """Label statistik: tabel + daftar kolom. Filter (mark delta sync, kursor halaman)
+    tidak ikut, supaya jumlah label tetap sebatas jumlah query di kode"""
+    req = getattr(query, "request", query)
+    try:
+        select = req.params.get("select", "*")
+    except AttributeError:
+        select = "*"
+    return f"{str(req.path).rsplit('/', 1)[-1]}?select={select}"
+
+
+def baca(query):
+    """execute() untuk query read: query identik yang sedang jalan di session lain
+    tidak dikirim ulang, tapi menunggu dan memakai hasil yang sama."""
+    kunci = _kunci_query(query)
+    if kunci is None or kunci[0] not in ("GET", "HEAD"):
+        return query.execute()
+
+    bersama = _read_bersama()
+    label = _label_query(query)
+    with bersama["lock"]:
+        stat = bersama["stat"].setdefault(label, {"panggil": 0, "dibagi": 0, "request": 0, "bytes": 0})
+        stat["panggil"] += 1
+        future = bersama["proses"].get(kunci)
+        pemilik = future is None
+        if pemilik:
+            future = bersama["proses"][kunci] = Future()
+        else:
+            stat["dibagi"] += 1
+    if not pemilik:
+        return future.result()
+
+    try:
+        # Ukuran payload diambil dari body respons HTTP, bukan serialisasi ulang res.data
+        _ukuran_respons.aktif = _pasang_hook_ukuran(query)
+        _ukuran_respons.byte = 0
+        try:
+            res = query.execute()
+        finally:
+            _ukuran_respons.aktif = False
+        ukuran = _ukuran_respons.byte
+        with bersama["lock"]:
+            stat["request"] += 1
+            stat["bytes"] += ukuran
+        future.set_result(res)
+    except Exception as e:
+        future.set_exception(e)
+    finally:
+        with bersama["lock"]:
+            bersama["proses"].pop(kunci, None)
+    return future.result()
+
+
+def statistik_query():
+    """Per query read: berapa kali dipanggil dan berapa request HTTP yang dihemat"""
+    bersama = _read_bersama()
+    with bersama["lock"]:
+        baris = [
+            {"Query": label, "Panggil": s["panggil"], "Dihemat": s["dibagi"],
+             "KB/Request": round(s["bytes"] / s["request"] / 1024, 1) if s["request"] else 0,
+             "Total KB": round(s["bytes"] / 1024, 1)}
+            for label, s in sorted(bersama["stat"].items(), key=lambda x: -x[1]["dibagi"])
+        ]
+    return pd.DataFrame(baris)
+
+
+# ===== PROBE PERUBAHAN (SEBELUM RELOAD LEDGER) =====
+def _sidik_cadangan(tabel):
+    """Probe cadangan kalau tabel versi_tabel belum ada: count + max(id).
+
+    UPDATE tidak mengubah keduanya, jadi ember waktu CACHE_TTL ikut masuk sidik
+    (perilaku edit sama seperti TTL lama, insert / delete terdeteksi lebih cepat).
+    """
+    ember = int(time.time() // CACHE_TTL)
+    try:
+        res = baca(conn.table(tabel).select("id", count="exact").order("id", desc=True).limit(1))
+        return f"{res.count}:{res.data[0]['id'] if res.data else 0}:{ember}"
+    except Exception:
+        return f"?:{ember}"
+
+
+@st.cache_data(ttl=PROBE_TTL)
+def probe_versi():
+    """Sidik perubahan per tabel di PROBE_TABEL: satu baris kecil per tabel.
+
+    Versi dinaikkan trigger statement di Supabase (supabase/migrations/003_versi_tabel.sql).
+    """
+    try:
+        res = baca(conn.table("versi_tabel").select("tabel,versi").in_("tabel", list(PROBE_TABEL)))
+        versi = {r["tabel"]: r["versi"] for r in res.data}
+        return {tabel: versi.get(tabel, 0) for tabel in PROBE_TABEL}
+    except Exception:
+        return {tabel: _sidik_cadangan(tabel) for tabel in PROBE_TABEL}
+
+
+@st.cache_resource
+def _thread_pool():
+    """Thread pool bersama untuk query Supabase yang saling independen"""
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="supabase")
+
+
+KOLOM_TRANSAKSI = {
+    "tanggal": "Tanggal",
+    "tipe": "Tipe",
+    "kategori": "Kategori",
+    "nominal": "Nominal",
+    "catatan": "Catatan",
+    "status": "Status",
+    "tenggat_waktu": "Tenggat_Waktu",
+    "tanggal_bayar": "Tanggal_Bayar",
+    "sumber": "Sumber"
+}
+
+
+# ===== PROYEKSI KOLOM: TIAP KONSUMEN DEKLARASIKAN KOLOM YANG DIPAKAI =====
+# Loader hanya select gabungan kolom konsumen tabelnya, bukan "*"
+KOLOM_KONSUMEN = {
+    "transaksi": {
+        # Snapshot ledger: metric, grafik, laporan, tab cash, dedup Mandiri; updated_at untuk delta sync
+        "ledger": ["id", "updated_at"] + list(KOLOM_TRANSAKSI),
+        "log_transaksi": ["id"] + list(KOLOM_TRANSAKSI),
+    },
+    "transaksi_hapus": {"delta_sync": ["id", "dihapus_pada"]},
+    "settings": {"settings": ["key", "value", "tipe_data"]},
+    "tabungan": {
+        "tab_tabungan": ["id", "nama", "target_nominal", "nominal_terkumpul", "tanggal_mulai",
+                         "tanggal_target", "kategori", "prioritas", "catatan", "status"],
+    },
+    "transaksi_tabungan": {"histori": ["id", "tabungan_id", "tanggal", "nominal", "tipe", "catatan"]},
+    "cash": {"saldo_cash": ["nominal"]},
+    "penggunaan_cash": {
+        "metric_cash": ["tanggal", "nominal"],
+        "pie_kategori": ["kategori", "nominal"],
+    },
+    "transaksi_cash": {"histori": ["id", "tanggal", "tipe", "nominal", "kategori", "catatan", "status"]},
+}
+
+
+def kolom_select(tabel, kecuali=()):
+    """Gabungan kolom semua konsumen tabel, siap dipakai di .select()"""
+    kolom = []
+    for daftar in KOLOM_KONSUMEN[tabel].values():
+        kolom += [k for k in daftar if k not in kolom and k not in kecuali]
+    return ",".join(kolom)
+
+
+def _siapkan_transaksi(data):
+    """Ubah baris mentah Supabase jadi DataFrame dengan nama kolom Indonesia"""
+    df = pd.DataFrame(data).rename(columns=KOLOM_TRANSAKSI)
+    df["Nominal"] = pd.to_numeric(df["Nominal"], errors="coerce").fillna(0)
+    return df
+
+
+def _ke_record_transaksi(df, dengan_id=False):
+    """Kebalikan _siapkan_transaksi: DataFrame -> list dict siap kirim ke Supabase"""
+    kolom_db = {v: k for k, v in KOLOM_TRANSAKSI.items()}
+    data = df.copy()
+    for col in ["Tanggal", "Tenggat_Waktu", "Tanggal_Bayar"]:
+        if col in data.columns:
+            data[col] = data[col].apply(
+                lambda x: x.strftime("%Y-%m-%d") if pd.notnull(x) and hasattr(x, 'strftime') else ""
+            )
+    kolom = [c for c in kolom_db if c in data.columns] + (["id"] if dengan_id else [])
+    data = data[kolom].rename(columns=kolom_db)
+    if dengan_id:
+        data["id"] = data["id"].astype(int)
+    data = data.astype(object).where(data.notna(), None)
+    return data.to_dict(orient="records")
+
+
+# ===== KARANTINA BARIS TRANSAKSI TIDAK VALID =====
+@st.cache_resource
+def _karantina_store():
+    """Baris yang ditolak ledger.validasi_transaksi, per asal (cloud / csv / mandiri)"""
+    return {"data": {}, "lock": threading.Lock()}
+
+
+def catat_karantina(asal, karantina):
+    store = _karantina_store()
+    with store["lock"]:
+        store["data"][asal] = karantina
+
+
+def data_karantina():
+    store = _karantina_store()
+    with store["lock"]:
+        bagian = [df for df in store["data"].values() if not df.empty]
+    return pd.concat(bagian, ignore_index=True) if bagian else pd.DataFrame()
+
+
+# updated_at = now() awal transaksi, id dibagi sebelum commit: baris yang commit belakangan
+# bisa berada di belakang high-water mark. Delta sync selalu baca ulang jendela ini.
+JEDA_SINKRON = datetime.timedelta(minutes=5)
+
+
+def _mundur(ts):
+    """Timestamp high-water mark dikurangi JEDA_SINKRON (ISO, siap jadi filter PostgREST)"""
+    return (pd.Timestamp(ts) - JEDA_SINKRON).isoformat()
+
+
+def _kolom_tidak_ada(e, kolom):
+    """Error PostgREST karena kolom belum ada (Postgres 42703 undefined_column)"""
+    kode = getattr(e, "code", None)
+    if kode is None and e.args and isinstance(e.args[0], dict):
+        kode = e.args[0].get("code")
+    return kode == "42703" or (kolom in str(e) and "does not exist" in str(e))
+
+
+def _pisah_valid(mentah):
+    """Baris mentah (index id) -> (ledger ternormalisasi, karantina).
+
+    Satu-satunya tempat validasi + normalisasi baris cloud: full reload lewat sini
+    sekali, delta sync hanya untuk baris delta.
+    """
+    valid, karantina = ledger.validasi_transaksi(mentah, "cloud")
+    if not valid.empty:
+        valid = ledger.normalisasi_ledger(valid)
+    return valid, karantina
+
+
+def _untuk_rollup(df):
+    """Baris ledger ternormalisasi -> bentuk input rollup (kolom kategori jadi object)"""
+    return df.astype({k: object for k in ledger.KOLOM_KATEGORIKAL if k in df.columns})
+
+
+def _updated_at(mentah):
+    if "updated_at" in mentah.columns:
+        return mentah["updated_at"].astype(object)
+    return pd.Series(None, index=mentah.index, dtype=object)
+
+
+@st.cache_resource
+def _ledger_store():
+    """Snapshot ledger lokal yang dipakai bersama semua session.
+
+    df = baris valid yang sudah dinormalisasi (index id), karantina = baris cloud
+    yang ditolak validasi, updated = updated_at mentah per id (valid + karantina).
+    hwm_id / hwm_updated / hwm_hapus = high-water mark sinkronisasi terakhir.
+    versi naik setiap kali isi snapshot berubah; rollup = rollup harian yang
+    dipelihara inkremental bersama df (lihat ledger.bangun_rollup), index_saldo =
+    prefix sum harian dari rollup itu (lihat ledger.bangun_index_saldo).
+    """
+    return {
+        "df": None,
+        "karantina": None,
+        "updated": None,
+        "rollup": None,
+        "index_saldo": None,
+        "versi": 0,
+        "hwm_id": 0,
+        "hwm_updated": None,
+        "hwm_hapus": None,
+        "lock": threading.Lock(),
+    }
+
+
+def _ambil_ledger_penuh(store):
+    """Full reload: dipakai saat pertama kali, setelah Refresh Data, atau kalau delta sync gagal"""
+    # Penanda tombstone dibaca sebelum ledger: hapus yang terjadi di antara dua read
+    # punya dihapus_pada > penanda, jadi pasti terambil di delta berikutnya
+    try:
+        hapus = baca(conn.table("transaksi_hapus").select("dihapus_pada").order("dihapus_pada", desc=True).limit(1))
+        hwm_hapus = hapus.data[0]["dihapus_pada"] if hapus.data else None
+    except Exception:
+        hwm_hapus = None
+
+    try:
+        res = baca(conn.table("transaksi").select(kolom_select("transaksi")))
+    except Exception as e:
+        # Migrasi 001 belum jalan (belum ada updated_at) -> delta sync jatuh ke full reload.
+        # Error lain (jaringan dsb.) diteruskan, jangan sampai updated_at ikut hilang
+        if not _kolom_tidak_ada(e, "updated_at"):
+            raise
+        res = baca(conn.table("transaksi").select(kolom_select("transaksi", kecuali=["updated_at"])))
+    mentah = _siapkan_transaksi(res.data) if res.data else pd.DataFrame(columns=["id"])
+    mentah = mentah.set_index("id", drop=False)
+    store["df"], store["karantina"] = _pisah_valid(mentah)
+    store["updated"] = _updated_at(mentah)
+    store["rollup"] = ledger.bangun_rollup(_untuk_rollup(store["df"]))
+    store["index_saldo"] = ledger.bangun_index_saldo(store["rollup"])
+    store["versi"] += 1
+    store["hwm_hapus"] = hwm_hapus
+
+
+def _ambil_ledger_delta(store):
+    """Ambil hanya baris yang baru/berubah/terhapus sejak high-water mark"""
+    query = conn.table("transaksi").select(kolom_select("transaksi"))
+    if store["hwm_updated"]:
+        query = query.or_(f'id.gt.{store["hwm_id"]},updated_at.gte."{_mundur(store["hwm_updated"])}"')
+    else:
+        query = query.gt("id", store["hwm_id"])
+    res = baca(query)
+
+    query_hapus = conn.table("transaksi_hapus").select(kolom_select("transaksi_hapus"))
+    if store["hwm_hapus"]:
+        query_hapus = query_hapus.gt("dihapus_pada", _mundur(store["hwm_hapus"]))
+    res_hapus = baca(query_hapus)
+
+    df, karantina, updated = store["df"], store["karantina"], store["updated"]
+    # Baris versi lama (diedit / dihapus) dan versi baru (diedit / ditambah) untuk update rollup
+    keluar, masuk = [], []
+    berubah = False
+    if res.data:
+        delta = _siapkan_transaksi(res.data).set_index("id", drop=False)
+        lama = delta.index.intersection(updated.index)
+        # Baris di jendela JEDA_SINKRON ikut terambil lagi, abaikan kalau tidak berubah
+        lama = lama[updated.loc[lama].values != _updated_at(delta).loc[lama].values]
+        delta = delta.loc[lama.union(delta.index.difference(updated.index))]
+        if not delta.empty:
+            # Validasi + normalisasi cuma untuk baris delta
+            valid, ditolak = _pisah_valid(delta)
+            keluar.append(df.loc[df.index.intersection(lama)])
+            masuk.append(valid)
+            df = ledger.gabung_ledger(df.drop(index=lama), valid)
+            karantina = pd.concat([karantina.drop(index=lama, errors="ignore"), ditolak])
+            updated = pd.concat([updated.drop(index=lama), _updated_at(delta)])
+            berubah = True
+
+    if res_hapus.data:
+        ids_hapus = updated.index.intersection([r["id"] for r in res_hapus.data])
+        if len(ids_hapus):
+            keluar.append(df.loc[df.index.intersection(ids_hapus)])
+            df = df.drop(index=ids_hapus, errors="ignore")
+            karantina = karantina.drop(index=ids_hapus, errors="ignore")
+            updated = updated.drop(index=ids_hapus)
+            berubah = True
+        store["hwm_hapus"] = max([r["dihapus_pada"] for r in res_hapus.data] + [store["hwm_hapus"] or ""])
+
+    if berubah:
+        lama = _untuk_rollup(pd.concat(keluar)) if keluar else None
+        baru = _untuk_rollup(pd.concat(masuk)) if masuk else None
+        store["rollup"] = ledger.perbarui_rollup(store["rollup"], lama=lama, baru=baru)
+        if (lama is None or lama.empty) and baru is not None:
+            # Cuma transaksi baru: cukup geser prefix sum, tidak perlu bangun ulang
+            store["index_saldo"] = ledger.perbarui_index_saldo(store["index_saldo"], baru)
+        else:
+            store["index_saldo"] = ledger.bangun_index_saldo(store["rollup"])
+        store["versi"] += 1
+    store["df"], store["karantina"], store["updated"] = df, karantina, updated
+
+
+def reset_ledger():
+    """Buang snapshot ledger; sync berikutnya full reload (tombol Refresh Data)"""
+    store = _ledger_store()
+    with store["lock"]:
+        store["df"] = None
+
+
+def sync_ledger():
+    """Sinkronisasi snapshot ledger dengan tabel transaksi.
+
+    Biaya reload sebanding jumlah baris yang berubah, bukan total baris: validasi dan
+    skema ringkas (category / int64 / datetime64) sudah diterapkan saat baris masuk store.
+    """
+    store = _ledger_store()
+    with store["lock"]:
+        if store["df"] is None:
+            _ambil_ledger_penuh(store)
+        else:
+            try:
+                _ambil_ledger_delta(store)
+            except Exception:
+                # Kolom updated_at / tabel transaksi_hapus belum ada -> full reload
+                _ambil_ledger_penuh(store)
+
+        updated = store["updated"]
+        if len(updated):
+            store["hwm_id"] = int(updated.index.max())
+            terisi = updated.dropna()
+            if len(terisi):
+                store["hwm_updated"] = terisi.max()
+        catat_karantina("cloud", store["karantina"].reset_index(drop=True))
+        df = store["df"].reset_index(drop=True)
+        df.attrs["versi"] = store["versi"]
+        return df
+
+
+@cache_tabel("transaksi")
+def load_rollup_harian(versi):
+    """Rollup harian snapshot ledger; versi ikut jadi key cache"""
+    store = _ledger_store()
+    with store["lock"]:
+        if store["rollup"] is None:
+            return ledger.bangun_rollup(pd.DataFrame())
+        return store["rollup"].copy()
+
+
+@cache_tabel("transaksi")
+def load_index_saldo(versi):
+    """Index saldo kumulatif snapshot ledger; versi ikut jadi key cache"""
+    store = _ledger_store()
+    with store["lock"]:
+        if store["index_saldo"] is None:
+            return ledger.bangun_index_saldo(ledger.bangun_rollup(pd.DataFrame()))
+        return copy.deepcopy(store["index_saldo"])
+
+
+@cache_tabel("transaksi", swr=True)  # Fetch ulang hanya kalau probe berubah, delta sync bikin reload murah
+def ambil_data_cloud():
+    """Snapshot ledger (delta sync); raise kalau gagal"""
+    return sync_ledger()
+
+
 def load_data_cloud():
-    """Fungsi ambil data dari Supabase menggunakan .table().select()"""
+    """Fungsi ambil data dari Supabase lewat snapshot ledger (delta sync)"""
     try:
-        res = conn.table("transaksi").select("*").execute()
-        
-        if res.data:
-            df = pd.DataFrame(res.data)
+        df = ambil_data_cloud()
         
-            nama_kolom_baru = {
-                "tanggal": "Tanggal",
-                "tipe": "Tipe",
-                "kategori": "Kategori",
-                "nominal": "Nominal",
-                "catatan": "Catatan",
-                "status": "Status",
-                "tenggat_waktu": "Tenggat_Waktu",
-                "tanggal_bayar": "Tanggal_Bayar",
-                "sumber": "Sumber"
-            }
-            
-            df = df.rename(columns=nama_kolom_baru)
-            
-            df["Nominal"] = pd.to_numeric(df["Nominal"], errors="coerce").fillna(0)
-            
+        if not df.empty:
             # Debug: cek apakah kolom Sumber ada
             if "Sumber" not in df.columns:
                 df["Sumber"] = "Bank"
@@ -144,31 +762,90 @@ def load_data_cloud():
         "Tanggal_Bayar","Sumber"
     ])
 
+
+# ===== LOG TRANSAKSI: FILTER DI SERVER + KEYSET PAGING =====
+def _filter_log(query, filter_tipe, filter_sumber, filter_status):
+    """Dorong filter Log Transaksi ke Supabase sebagai predikat .eq()"""
+    for kolom, nilai in [("tipe", filter_tipe), ("sumber", filter_sumber), ("status", filter_status)]:
+        if nilai != "Semua":
+            query = query.eq(kolom, nilai)
+    return query
+
+
+@cache_tabel("transaksi")
+def load_log_halaman(filter_tipe, filter_sumber, filter_status, kursor, limit):
+    """Ambil satu halaman Log Transaksi (urut tanggal, id terbaru dulu).
+
+    kursor = (tanggal, id) baris terakhir halaman sebelumnya, None = halaman pertama.
+    """
+    try:
+        # updated_at cuma dipakai delta sync, tidak perlu ikut ke editor
+        kolom = kolom_select("transaksi", kecuali=["updated_at"])
+        query = _filter_log(conn.table("transaksi").select(kolom), filter_tipe, filter_sumber, filter_status)
+        if kursor:
+            tgl, id_terakhir = kursor
+            if tgl:
+                query = query.or_(
+                    f"tanggal.lt.{tgl},and(tanggal.eq.{tgl},id.lt.{id_terakhir}),tanggal.is.null"
+                )
+            else:
+                query = query.is_("tanggal", "null").lt("id", id_terakhir)
+        res = baca(
+            query.order("tanggal", desc=True, nullsfirst=False)
+            .order("id", desc=True)
+            .limit(limit)
+        )
+        if res.data:
+            return _siapkan_transaksi(res.data)
+    except Exception as e:
+        st.error(f"Error: {e}")
+    return pd.DataFrame(columns=["id"] + list(KOLOM_TRANSAKSI.values()))
+
+
+@cache_tabel("transaksi")
+def hitung_log_transaksi(filter_tipe, filter_sumber, filter_status):
+    """Jumlah baris Log Transaksi sesuai filter (count di server, tanpa ambil data)"""
+    try:
+        query = _filter_log(conn.table("transaksi").select("id", count="exact"), filter_tipe, filter_sumber, filter_status)
+        return baca(query.limit(1)).count or 0
+    except Exception:
+        return 0
+
+
+@cache_tabel("settings", swr=True)
+def ambil_settings_cloud():
+    """Settings mentah dari Supabase (dict, None kalau tabel kosong); raise kalau gagal"""
+    res = baca(conn.table("settings").select(kolom_select("settings")))
+    if not res.data:
+        return None
+    df = pd.DataFrame(res.data)
+    settings_dict = {}
+    for _, row in df.iterrows():
+        key = row["key"]
+        value = row["value"]
+        tipe = row.get("tipe_data", "string")
+        
+        # Konversi tipe data
+        if tipe == "date" and value:
+            try:
+                value = datetime.datetime.strptime(value, "%Y-%m-%d").date()
+            except:
+                pass
+        elif tipe == "integer" and value:
+            try:
+                value = int(value)
+            except:
+                pass
+            
+        settings_dict[key] = value
+    return settings_dict
+
+
 def load_settings_cloud():
     """Load settings dari Supabase"""
     try:
-        res = conn.table("settings").select("*").execute()
-        if res.data:
-            df = pd.DataFrame(res.data)
-            settings_dict = {}
-            for _, row in df.iterrows():
-                key = row["key"]
-                value = row["value"]
-                tipe = row.get("tipe_data", "string")
-                
-                # Konversi tipe data
-                if tipe == "date" and value:
-                    try:
-                        value = datetime.datetime.strptime(value, "%Y-%m-%d").date()
-                    except:
-                        pass
-                elif tipe == "integer" and value:
-                    try:
-                        value = int(value)
-                    except:
-                        pass
-                    
-                settings_dict[key] = value
+        settings_dict = ambil_settings_cloud()
+        if settings_dict is not None:
             return settings_dict
     except Exception as e:
         st.sidebar.error(f"Gagal load settings: {e}")
@@ -188,7 +865,7 @@ def save_setting_cloud(key, value, tipe_data="string"):
             str_value = str(value)
         
         # Cek apakah sudah ada
-        existing = conn.table("settings").select("*").eq("key", key).execute()
+        existing = conn.table("settings").select("key").eq("key", key).execute()
         
         if existing.data:
             # Update
@@ -204,31 +881,39 @@ def save_setting_cloud(key, value, tipe_data="string"):
                 "tipe_data": tipe_data
             }).execute()
         
-        st.cache_data.clear()
+        invalidasi_tabel("settings")
         return True
     except Exception as e:
         st.error(f"Gagal simpan setting: {e}")
         return False
 
 
+@cache_tabel("tabungan", swr=True)
+def ambil_tabungan_cloud():
+    """Data tabungan dari Supabase (None kalau kosong); raise kalau gagal"""
+    res = baca(conn.table("tabungan").select(kolom_select("tabungan")))
+    if not res.data:
+        return None
+    df = pd.DataFrame(res.data)
+    # Rename kolom ke format Indonesia
+    return df.rename(columns={
+        "nama": "Nama",
+        "target_nominal": "Target",
+        "nominal_terkumpul": "Terkumpul",
+        "tanggal_mulai": "Tanggal_Mulai",
+        "tanggal_target": "Tanggal_Target",
+        "kategori": "Kategori",
+        "prioritas": "Prioritas",
+        "catatan": "Catatan",
+        "status": "Status"
+    })
+
+
 def load_tabungan_cloud():
     """Load data tabungan dari Supabase"""
     try:
-        res = conn.table("tabungan").select("*").execute()
-        if res.data:
-            df = pd.DataFrame(res.data)
-            # Rename kolom ke format Indonesia
-            df = df.rename(columns={
-                "nama": "Nama",
-                "target_nominal": "Target",
-                "nominal_terkumpul": "Terkumpul",
-                "tanggal_mulai": "Tanggal_Mulai",
-                "tanggal_target": "Tanggal_Target",
-                "kategori": "Kategori",
-                "prioritas": "Prioritas",
-                "catatan": "Catatan",
-                "status": "Status"
-            })
+        df = ambil_tabungan_cloud()
+        if df is not None:
             return df
     except Exception as e:
         st.sidebar.error(f"Gagal load tabungan: {e}")
@@ -242,40 +927,45 @@ def save_tabungan_to_cloud(data):
     try:
         clean_data = {k.lower(): v for k, v in data.items()}
         conn.table("tabungan").insert(clean_data).execute()
-        st.cache_data.clear()
+        invalidasi_tabel("tabungan")
         return True
     except Exception as e:
         st.error(f"Gagal simpan tabungan: {e}")
         return False
 
-def update_tabungan_cloud(tabungan_id, data):
-    """Update data tabungan di Supabase"""
+def delete_tabungan_cloud(tabungan_id):
+    """Hapus tabungan dari Supabase"""
     try:
-        clean_data = {k.lower(): v for k, v in data.items()}
-        conn.table("tabungan").update(clean_data).eq("id", tabungan_id).execute()
-        st.cache_data.clear()
+        conn.table("tabungan").delete().eq("id", tabungan_id).execute()
+        invalidasi_tabel("tabungan")
         return True
     except Exception as e:
-        st.error(f"Gagal update tabungan: {e}")
+        st.error(f"Gagal hapus tabungan: {e}")
         return False
 
-def delete_tabungan_cloud(tabungan_id):
-    """Hapus tabungan dari Supabase"""
+def mutasi_tabungan_atomik(tabungan_id, delta, catatan=""):
+    """Setor (+) / tarik (-) tabungan + catat histori dalam satu RPC atomik"""
     try:
-        conn.table("tabungan").delete().eq("id", tabungan_id).execute()
-        st.cache_data.clear()
+        conn.client.rpc("mutasi_tabungan_atomik", {
+            "p_tabungan_id": int(tabungan_id),
+            "p_delta": int(delta),
+            "p_catatan": catatan,
+            "p_tanggal": hari_ini_wib.strftime("%Y-%m-%d")
+        }).execute()
+        invalidasi_tabel("tabungan", "transaksi_tabungan")
         return True
     except Exception as e:
-        st.error(f"Gagal hapus tabungan: {e}")
+        st.error(f"Gagal update tabungan: {e}")
         return False
 
+@cache_tabel("transaksi_tabungan")
 def load_transaksi_tabungan_cloud(tabungan_id=None):
     """Load histori transaksi tabungan"""
     try:
-        query = conn.table("transaksi_tabungan").select("*")
+        query = conn.table("transaksi_tabungan").select(kolom_select("transaksi_tabungan"))
         if tabungan_id:
             query = query.eq("tabungan_id", tabungan_id)
-        res = query.execute()
+        res = baca(query)
         if res.data:
             df = pd.DataFrame(res.data)
             df = df.rename(columns={
@@ -290,46 +980,47 @@ def load_transaksi_tabungan_cloud(tabungan_id=None):
         st.sidebar.error(f"Gagal load transaksi tabungan: {e}")
     return pd.DataFrame(columns=["Tabungan_ID", "Tanggal", "Nominal", "Tipe", "Catatan"])
 
-def save_to_cloud(row_dict): 
-    """Fungsi khusus untuk insert ke tabel transaksi"""
+def catat_transaksi_atomik(rows, delta_cash=0, catatan_cash=""):
+    """Insert transaksi + ubah saldo cash dalam satu RPC atomik (tanpa read-modify-write)"""
     try:
-        clean_dict = {k.lower(): v for k, v in row_dict.items()}
-        conn.table("transaksi").insert(clean_dict).execute()
-        st.cache_data.clear()
+        conn.client.rpc("catat_transaksi_atomik", {
+            "p_transaksi": [{k.lower(): v for k, v in row.items()} for row in rows],
+            "p_delta_cash": int(delta_cash),
+            "p_catatan_cash": catatan_cash
+        }).execute()
+        invalidasi_tabel("transaksi", *(["cash"] if delta_cash else []))
         return True
     except Exception as e:
         st.error(f"Gagal simpan ke Cloud: {e}")
         return False
 
+@cache_tabel("cash")
 def load_cash_cloud():
     """Load data cash dari Supabase"""
     try:
-        res = conn.table("cash").select("*").order("created_at", desc=True).limit(1).execute()
+        res = baca(conn.table("cash").select(kolom_select("cash")).order("created_at", desc=True).limit(1))
         if res.data:
             return res.data[0]["nominal"]
     except Exception as e:
         st.sidebar.error(f"Gagal load cash: {e}")
     return 0
 
-def update_cash_cloud(nominal_baru, catatan=""):
-    """Update saldo cash"""
+@cache_tabel("penggunaan_cash")
+def load_penggunaan_cash_cloud():
+    """Load data penggunaan cash dari Supabase"""
     try:
-        data = {
-            "nominal": nominal_baru,
-            "tanggal_update": hari_ini_wib.strftime("%Y-%m-%d"),
-            "catatan": catatan
-        }
-        conn.table("cash").insert(data).execute()
-        st.cache_data.clear()
-        return True
+        res = baca(conn.table("penggunaan_cash").select(kolom_select("penggunaan_cash")))
+        if res.data:
+            return pd.DataFrame(res.data)
     except Exception as e:
-        st.error(f"Gagal update cash: {e}")
-        return False
+        st.sidebar.error(f"Gagal load penggunaan cash: {e}")
+    return pd.DataFrame(columns=["tanggal", "kategori", "nominal"])
 
+@cache_tabel("transaksi_cash")
 def load_transaksi_cash_cloud(limit=50):
     """Load history transaksi cash"""
     try:
-        res = conn.table("transaksi_cash").select("*").order("tanggal", desc=True).limit(limit).execute()
+        res = baca(conn.table("transaksi_cash").select(kolom_select("transaksi_cash")).order("tanggal", desc=True).limit(limit))
         if res.data:
             df = pd.DataFrame(res.data)
             df = df.rename(columns={
@@ -350,7 +1041,7 @@ def save_transaksi_cash_cloud(data):
     try:
         clean_data = {k.lower(): v for k, v in data.items()}
         conn.table("transaksi_cash").insert(clean_data).execute()
-        st.cache_data.clear()
+        invalidasi_tabel("transaksi_cash")
         return True
     except Exception as e:
         st.error(f"Gagal simpan transaksi cash: {e}")
@@ -360,7 +1051,7 @@ def update_status_cash_cloud(transaksi_id, status_baru):
     """Update status transaksi cash (untuk tarik)"""
     try:
         conn.table("transaksi_cash").update({"status": status_baru}).eq("id", transaksi_id).execute()
-        st.cache_data.clear()
+        invalidasi_tabel("transaksi_cash")
         return True
     except Exception as e:
         st.error(f"Gagal update status: {e}")
@@ -369,11 +1060,8 @@ def update_status_cash_cloud(transaksi_id, status_baru):
 
 def load_data():
     if os.path.exists(DATA_FILE):
-        df = pd.read_csv(DATA_FILE)
-        df["Nominal"] = pd.to_numeric(df["Nominal"], errors="coerce").fillna(0)
-        for col, default in [("Status","Cleared"),("Tenggat_Waktu",""),("Tanggal_Bayar","")]:
-            if col not in df.columns: df[col] = default
-        return df
+        # Tipe data & default kolom diurus ledger.validasi_transaksi
+        return pd.read_csv(DATA_FILE)
     return pd.DataFrame(columns=["Tanggal","Tipe","Kategori","Nominal","Catatan","Status","Tenggat_Waktu","Tanggal_Bayar"])
 
 def save_data(df):
@@ -406,194 +1094,124 @@ def load_recurring():
 
 def save_recurring(df): df.to_csv(RECURRING_FILE, index=False)
 
-def fetch_mandiri_emails(gmail_user, gmail_pass, limit=10):
-    """Ambil email notifikasi Mandiri dari Gmail dan parse transaksinya."""
-    results = []
-    try:
-        mail = imaplib.IMAP4_SSL("imap.gmail.com")
-        mail.login(gmail_user, gmail_pass)
-        mail.select("inbox")
-
-        _, data = mail.search(None, 'FROM "noreply.livin@bankmandiri.co.id"')
-        email_ids = data[0].split()
-        email_ids = email_ids[-limit:][::-1]
-
-        for eid in email_ids:
-            _, msg_data = mail.fetch(eid, "(RFC822)")
-            msg = email.message_from_bytes(msg_data[0][1])
-            subject_raw = decode_header(msg["Subject"])[0]
-            subject = subject_raw[0].decode(subject_raw[1] or "utf-8") if isinstance(subject_raw[0], bytes) else subject_raw[0]
-            if any(k in subject for k in ["Tidak Berhasil", "Gagal", "Failed", "Ditolak"]):
-                continue
-            body = ""
-            body_html = ""
-            if msg.is_multipart():
-                for part in msg.walk():
-                    ct = part.get_content_type()
-                    if ct == "text/plain":
-                        body = part.get_payload(decode=True).decode("utf-8", errors="ignore")
-                    elif ct == "text/html":
-                        body_html = part.get_payload(decode=True).decode("utf-8", errors="ignore")
-            else:
-                body = msg.get_payload(decode=True).decode("utf-8", errors="ignore")
-            if not body.strip() and body_html:
-                import html as html_parser
-                body = re.sub(r'<[^>]+>', ' ', body_html)
-                body = html_parser.unescape(body)
-                body = re.sub(r'\s+', ' ', body).strip()
-            if "debug_body" not in st.session_state:
-                st.session_state["debug_body"] = body[:3000]
-        
-            nominal_match = re.search(r'Total\s*Transaksi\s*Rp\s*([\d.,]+)', body)
-            if not nominal_match:
-                nominal_match = re.search(r'Nominal\s*Transaksi\s*Rp\s*([\d.,]+)', body)
-            if not nominal_match:
-                nominal_match = re.search(r'Nominal\s*Top-?up\s*Rp\s*([\d.,]+)', body)
-            if not nominal_match:
-                nominal_match = re.search(r'Nominal\s*Transfer\s*Rp\s*([\d.,]+)', body)
-            if not nominal_match:
-                nominal_match = re.search(r'Rp\s*([\d.,]+)', body)
-            nominal = 0
-            if nominal_match:
-                nominal_str = nominal_match.group(1).replace('.', '').replace(',', '.')
-                try: nominal = int(float(nominal_str))
-                except: pass
-
-            tgl_match = re.search(r'Tanggal\s*(\d{1,2}\s+\w+\s+\d{4})', body)
-            if not tgl_match:
-                tgl_match = re.search(r'(\d{1,2}\s+(?:Jan|Feb|Mar|Apr|Mei|Jun|Jul|Agu|Sep|Okt|Nov|Des)\s+\d{4})', body)
-            if not tgl_match:
-                tgl_match = re.search(r'(\d{1,2}\s+(?:Januari|Februari|Maret|April|Mei|Juni|Juli|Agustus|September|Oktober|November|Desember)\s+\d{4})', body)
-            tanggal = str(hari_ini_wib)
-            if tgl_match:
-                try:
-                    raw_tgl = tgl_match.group(1)
-                    bulan_map = {
-                        "Januari":"Jan","Februari":"Feb","Maret":"Mar","April":"Apr",
-                        "Mei":"May","Juni":"Jun","Juli":"Jul","Agustus":"Aug",
-                        "September":"Sep","Oktober":"Oct","November":"Nov","Desember":"Dec",
-                        "Agu":"Aug","Okt":"Oct","Des":"Dec"
-                    }
-                    for id_bln, en_bln in bulan_map.items():
-                        raw_tgl = raw_tgl.replace(id_bln, en_bln)
-                    tanggal = pd.to_datetime(raw_tgl, dayfirst=True).strftime("%Y-%m-%d")
-                except:
-                    tanggal = str(hari_ini_wib)
-
-      
-            jam_match = re.search(r'(\d{2}:\d{2}:\d{2})\s*WIB', body)
-            if not jam_match:
-                jam_match = re.search(r'Jam\s*(\d{2}:\d{2}:\d{2})', body)
-            jam = jam_match.group(1) if jam_match else ""
+   
 
-     
-            penerima = "Mandiri Transaction"
+# ===== RECURRING: TICK HARIAN DI BACKGROUND (OPSIONAL) =====
+@st.cache_resource
+def _tick_recurring_harian():
+    """Thread daemon yang menjalankan recurring_job sekali sehari, satu per proses.
+
+    Aktif kalau env RECURRING_TICK=1; kalau job sudah dipasang di cron, biarkan mati.
+    Return dict status (terakhir / dibuat / error) yang ditampilkan di tab Recurring.
+    """
+    status = {"terakhir": None, "dibuat": 0, "error": None}
+
+    def loop():
+        while True:
+            try:
+                dibuat = recurring_job.jalankan(client=conn.client, log=lambda *_: None)
+                if dibuat:
+                    invalidasi_tabel("transaksi")
+                status.update(dibuat=len(dibuat), error=None)
+            except Exception as e:
+                status["error"] = str(e)
+            status["terakhir"] = datetime.datetime.utcnow() + datetime.timedelta(hours=7)
+            # Tidur sampai 00:05 WIB berikutnya
+            sekarang = datetime.datetime.utcnow() + datetime.timedelta(hours=7)
+            besok = datetime.datetime.combine(sekarang.date() + datetime.timedelta(days=1), datetime.time(0, 5))
+            time.sleep((besok - sekarang).total_seconds())
+
+    status["thread"] = threading.Thread(target=loop, name="recurring-harian", daemon=True)
+    status["thread"].start()
+    return status
+
+
+if os.environ.get("RECURRING_TICK") == "1":
+    _tick_recurring_harian()
+
+
+# ===== MANDIRI: WATCHER IMAP IDLE DI BACKGROUND =====
+@st.cache_resource
+def _antrean_mandiri():
+    """Antrean pending import Mandiri, satu per proses (dipakai worker + semua sesi)"""
+    return mandiri_watcher.buat_antrean()
+
+
+@st.cache_resource
+def _watcher_mandiri():
+    """{akun: handle worker}; paling banyak satu worker per akun per proses"""
+    return {"lock": threading.Lock(), "handle": {}}
+
+
+def mulai_watcher_mandiri(gmail_user, gmail_pass):
+    store = _watcher_mandiri()
+    with store["lock"]:
+        handle = store["handle"].get(gmail_user)
+        if handle and handle["thread"].is_alive():
+            return handle
+        # Error / jumlah masuk antrean dibaca dari handle["status"] di panel watcher, bukan stdout
+        handle = mandiri_watcher.mulai(
+            gmail_user, lambda: mandiri_imap.login(gmail_user, gmail_pass), _antrean_mandiri(),
+            log=lambda *_: None,
+        )
+        store["handle"][gmail_user] = handle
+        return handle
 
 
-            penerima_match = re.search(
-                r'Penerima\s+"?(.*?)"?\s+[\w\s().,\-]*?\s*-\s*ID',
-                body, re.IGNORECASE | re.DOTALL
-            )
-            if penerima_match:
-                kandidat = penerima_match.group(1).strip()
-               
-                if 2 < len(kandidat) < 80 and not any(k in kandidat for k in ["Tanggal","Nominal","Jam","Halo","Berikut"]):
-                    penerima = kandidat
-
-            if penerima == "Mandiri Transaction":
-                penyedia_match = re.search(r'Penyedia\s*Jasa\s+([\w\s]+?)(?:\s*\*{4}\d+)', body)
-                if penyedia_match:
-                    penerima = penyedia_match.group(1).strip()
-
-            if penerima == "Mandiri Transaction":
-                transfer_match = re.search(
-                    r'(?:Tujuan|Kepada)\s+([A-Za-z0-9\s,.\-]{3,50}?)(?:\s{2,}|\d{10,})',
-                    body
-                )
-                if transfer_match:
-                    penerima = transfer_match.group(1).strip()
+def hentikan_watcher_mandiri(gmail_user):
+    store = _watcher_mandiri()
+    with store["lock"]:
+        handle = store["handle"].pop(gmail_user, None)
+    if handle:
+        mandiri_watcher.hentikan(handle)
 
-            if penerima == "Mandiri Transaction":
-                fallback = re.search(
-                    r'(?:Penerima|Penyedia\s*Jasa|Tujuan|Kepada)\s+"?([\w\s\',.\-&/()]{3,60}?)"?(?:\s*-\s*ID|\*{4}|\s{2,})',
-                    body, re.IGNORECASE
-                )
-                if fallback:
-                    penerima = fallback.group(1).strip()
 
-            penerima = re.sub(r'["\']', '', penerima)
-            penerima = re.sub(r'\s+', ' ', penerima).strip()
+# Start otomatis saat app jalan: MANDIRI_WATCHER=1 + MANDIRI_GMAIL / MANDIRI_APP_PASSWORD
+if os.environ.get("MANDIRI_WATCHER") == "1" and os.environ.get("MANDIRI_GMAIL"):
+    mulai_watcher_mandiri(os.environ["MANDIRI_GMAIL"], os.environ.get("MANDIRI_APP_PASSWORD", ""))
 
-            if any(k in subject for k in ["Pembayaran", "Debit", "Transfer Keluar", "Tarik", "Top-up", "Top Up"]):
-                tipe = "Pengeluaran"
-            elif any(k in subject for k in ["Kredit", "Transfer Masuk", "Terima", "Masuk"]):
-                tipe = "Pemasukan"
-            else:
-                tipe = "Pengeluaran"
-
-            if nominal > 0:
-                results.append({
-                    "Tanggal": tanggal,
-                    "Tipe": tipe,
-                    "Kategori": "Lainnya",
-                    "Nominal": nominal,
-                    "Catatan": f"[{jam}] {penerima}" if jam else penerima,
-                    "Status": "Cleared",
-                    "Tanggal_Bayar": tanggal,
-                    "subject": subject
-                })
-
-        mail.logout()
 
-    except Exception as e:
-        return [], str(e)
+# ===== BOOTSTRAP: SEMUA READ AWAL DIKIRIM BARENGAN =====
+def muat_data_awal():
+    """Jalankan semua read awal secara paralel dan return bundle frame siap pakai.
 
-    return results, None
+    Waktu tunggu = query paling lambat, bukan jumlah semua query.
+    """
+    tugas = {
+        "transaksi": load_data_cloud,
+        "tabungan": load_tabungan_cloud,
+        "cash": load_cash_cloud,
+        "settings": load_settings_cloud,
+        "penggunaan_cash": load_penggunaan_cash_cloud,
+    }
+    ctx = get_script_run_ctx()
 
-   
+    def jalankan(fungsi):
+        # Thread pool butuh context script supaya st.cache_data / st.sidebar tetap jalan;
+        # pool dipakai bersama semua sesi, jadi context dilepas lagi setelah tugas selesai
+        add_script_run_ctx(threading.current_thread(), ctx)
+        try:
+            return fungsi()
+        finally:
+            add_script_run_ctx(threading.current_thread(), None)
 
-def generate_recurring_transactions(df_recurring, df_main):
-    today = hari_ini_wib
-    new_rows = []
-    for _, r in df_recurring.iterrows():
-        if str(r.get("Aktif","True")).lower() != "true": continue
-        try: tgl_mulai = pd.to_datetime(r["Tanggal_Mulai"]).date()
-        except: continue
-        frek = r.get("Frekuensi","Bulanan")
-        if frek == "Bulanan":
-            try: target_date = today.replace(day=tgl_mulai.day)
-            except: continue
-            if target_date > today: continue
-            mask = (
-                (df_main["Kategori"] == r["Kategori"]) &
-                (df_main["Catatan"].astype(str).str.contains(str(r["Nama"]), na=False)) &
-                (pd.to_datetime(df_main["Tanggal"], errors='coerce').dt.month == today.month) &
-                (pd.to_datetime(df_main["Tanggal"], errors='coerce').dt.year  == today.year)
-            )
-            if not df_main[mask].empty: continue
-        elif frek == "Mingguan":
-            target_date = today
-        else:
-            continue
-        new_rows.append({
-            "Tanggal": target_date.strftime("%Y-%m-%d"),
-            "Tipe":"Pengeluaran","Kategori":r["Kategori"],
-            "Nominal":r["Nominal"],"Catatan":f"[Auto] {r['Nama']}",
-            "Status":"Cleared","Tenggat_Waktu":"",
-            "Tanggal_Bayar":target_date.strftime("%Y-%m-%d")
-        })
-    return new_rows
+    futures = {nama: _thread_pool().submit(jalankan, fungsi) for nama, fungsi in tugas.items()}
+    return {nama: future.result() for nama, future in futures.items()}
 
 
-df_cloud = load_data_cloud()
+data_awal = muat_data_awal()
+
+df_cloud = data_awal["transaksi"]
+versi_ledger = df_cloud.attrs.get("versi", 0)
 
 if not df_cloud.empty:
-    df_asli = df_cloud
+    df_asli = df_cloud  # sudah dinormalisasi di sync_ledger
 else:
     df_asli = load_data()  # Ini mungkin tidak perlu karena sudah cloud-only
-    # Tapi kalau tetap dipakai, pastikan:
-    if "Sumber" not in df_asli.columns:
-        df_asli["Sumber"] = "Bank"
+    # Tapi kalau tetap dipakai, lewat validasi yang sama (Sumber kosong -> Bank)
+    df_asli, karantina_csv = ledger.validasi_transaksi(df_asli, "csv")
+    catat_karantina("csv", karantina_csv)
+    df_asli = ledger.normalisasi_ledger(df_asli.reset_index(drop=True))
         
 
 
@@ -601,27 +1219,22 @@ df_piutang   = load_piutang()
 df_budget    = load_budget()
 df_recurring = load_recurring()
 
-if not df_recurring.empty:
-    new_txn = generate_recurring_transactions(df_recurring, df_asli)
-    if new_txn:
-        df_asli = pd.concat([df_asli, pd.DataFrame(new_txn)], ignore_index=True)
-        save_data(df_asli)
-        st.toast(f"🔄 {len(new_txn)} recurring expense otomatis ditambahkan!")
+# Recurring expense tidak lagi dibuat di sini: lihat recurring_job.py (cron) / _tick_recurring_harian
 
-df_tabungan = load_tabungan_cloud()
+df_tabungan = data_awal["tabungan"]
 if not df_tabungan.empty:
     REAL_DARURAT = df_tabungan["Terkumpul"].sum()  # Ambil semua, tanpa filter status
 else:
     REAL_DARURAT = 0
 
-UANG_CASH = load_cash_cloud()
+UANG_CASH = data_awal["cash"]
 
 REAL_OPERASIONAL = 0
 FIKTIF_BASE = 140000000
 MULTIPLIER = 100
 
 hari_ini_tgl = hari_ini_wib
-settings = load_settings_cloud()
+settings = data_awal["settings"]
 tanggal_gajian = settings.get("tanggal_gajian", datetime.date(2026, 3, 17))
 
 if isinstance(tanggal_gajian, str):
@@ -636,9 +1249,17 @@ with st.sidebar:
     st.markdown("### ⚙️ Settings")
     st.markdown("---")
      
-    if st.button("🔄 Refresh Data", use_container_width=True):
-        st.cache_data.clear()
-        st.rerun()
+    col_refresh, col_waktu = st.columns([3, 2])
+    with col_refresh:
+        if st.button("🔄 Refresh Data", use_container_width=True):
+            reset_ledger()
+            invalidasi_tabel()
+            st.rerun()
+    with col_waktu:
+        waktu_data, refresh_gagal = waktu_data_swr()
+        if waktu_data:
+            jam_data = (datetime.datetime.utcfromtimestamp(waktu_data) + datetime.timedelta(hours=7)).strftime("%H:%M:%S")
+            st.caption(f"🕒 Data per {jam_data}" + (" ⚠️ refresh gagal" if refresh_gagal else ""))
     
     st.markdown("---")
     
@@ -679,6 +1300,28 @@ with st.sidebar:
         csv_exp = df_exp_final.to_csv(index=False).encode("utf-8")
         st.download_button("📥 Download CSV", data=csv_exp, file_name="keuangan_export.csv", mime="text/csv", use_container_width=True)
 
+    df_karantina = data_karantina()
+    if not df_karantina.empty:
+        st.markdown("---")
+        with st.expander(f"🚧 Karantina Data ({len(df_karantina)})", expanded=False):
+            st.caption("Baris transaksi yang ditolak validasi (tidak ikut dihitung).")
+            kolom_tampil = [c for c in ["Asal", "Alasan", "id", "Tanggal", "Tipe", "Kategori", "Nominal", "Sumber", "Status", "Catatan"]
+                            if c in df_karantina.columns]
+            st.dataframe(df_karantina[kolom_tampil], use_container_width=True, hide_index=True)
+
+    st.markdown("---")
+    with st.expander("📊 Statistik Cache", expanded=False):
+        df_stat_cache = statistik_cache()
+        if not df_stat_cache.empty:
+            st.dataframe(df_stat_cache, use_container_width=True, hide_index=True)
+        else:
+            st.caption("Belum ada akses cache.")
+
+        df_stat_query = statistik_query()
+        if not df_stat_query.empty:
+            st.caption(f"Request Supabase dihemat (single-flight): {df_stat_query['Dihemat'].sum()}")
+            st.dataframe(df_stat_query, use_container_width=True, hide_index=True)
+
 is_real_mode = (secret_code == "naufal")
 
 col_title, col_clock = st.columns([2.5, 1.5])
@@ -706,14 +1349,13 @@ with col_clock:
     </script>"""
     components.html(clock_html, height=75)
 
-def cashflow_date(row):
-    if row["Kategori"]=="Scheduled Settlement" and row["Status"]=="Cleared":
-        if pd.notna(row["Tanggal_Bayar"]) and str(row["Tanggal_Bayar"]).strip():
-            return row["Tanggal_Bayar"]
-    return row["Tanggal"]
-
-df_asli["Cashflow_Date"] = df_asli.apply(cashflow_date, axis=1)
-df_asli["Tanggal_dt"]    = pd.to_datetime(df_asli["Cashflow_Date"], errors='coerce')
+# ===== ROLLUP HARIAN (dipelihara inkremental di snapshot ledger) =====
+if not df_cloud.empty:
+    rollup_harian = load_rollup_harian(versi_ledger)
+    index_saldo   = load_index_saldo(versi_ledger)
+else:
+    rollup_harian = ledger.bangun_rollup(df_asli)
+    index_saldo   = ledger.bangun_index_saldo(rollup_harian)
 
 now = datetime.datetime.now()
 
@@ -721,9 +1363,13 @@ mask_aktif  = (df_asli["Tipe"]=="Pengeluaran") & ~((df_asli["Kategori"]=="Schedu
 mask_income = (df_asli["Tipe"]=="Pemasukan")
 mask_pend   = (df_asli["Tipe"]=="Pengeluaran")&(df_asli["Kategori"]=="Scheduled Settlement")&(df_asli["Status"]=="Pending")
 
-total_out   = df_asli[mask_aktif]["Nominal"].sum()
-total_in    = df_asli[mask_income]["Nominal"].sum()
-total_pend  = df_asli[mask_pend]["Nominal"].sum()
+# ===== AGREGASI SEKALI JALAN (periode x Sumber x Tipe x pending) =====
+agg_periode = ledger.agregasi_periode(rollup_harian, hari_ini_wib)
+
+# Total & metric rentang tanggal dibaca dari index saldo kumulatif: dua lookup per angka
+total_out   = ledger.total_rentang(index_saldo, tipe="Pengeluaran", pending=False)
+total_in    = ledger.total_rentang(index_saldo, tipe="Pemasukan")
+total_pend  = ledger.total_rentang(index_saldo, tipe="Pengeluaran", pending=True)
 piutang_blm = df_piutang[df_piutang["Status"]=="Belum Lunas"]["Nominal"].sum() if not df_piutang.empty else 0
 
 
@@ -732,9 +1378,8 @@ penggunaan_cash_minggu = 0
 penggunaan_cash_bulan = 0
 
 try:
-    res = conn.table("penggunaan_cash").select("*").execute()
-    if res.data:
-        df_cash = pd.DataFrame(res.data)
+    df_cash = data_awal["penggunaan_cash"].copy()
+    if not df_cash.empty:
         df_cash["tanggal"] = pd.to_datetime(df_cash["tanggal"])
         today = hari_ini_wib
         df_hari = df_cash[df_cash["tanggal"].dt.date == today]
@@ -759,52 +1404,33 @@ except Exception as e:
 
 
 
-# ===== FILTER UNTUK TRANSAKSI =====
-mask_aktif = (df_asli["Tipe"] == "Pengeluaran") & ~((df_asli["Kategori"] == "Scheduled Settlement") & (df_asli["Status"] == "Pending"))
-
-# ===== FILTER BERDASARKAN SUMBER (AMAN) =====
-if "Sumber" in df_asli.columns:
-    mask_bank = (df_asli["Sumber"] == "Bank") | (df_asli["Sumber"].isna())
-    mask_cash = df_asli["Sumber"] == "Cash"
-else:
-    # Fallback untuk data lama yang belum punya kolom Sumber
-    mask_bank = pd.Series([True] * len(df_asli), index=df_asli.index)
-    mask_cash = pd.Series([False] * len(df_asli), index=df_asli.index)
-
-
+awal_minggu = hari_ini_wib - datetime.timedelta(days=hari_ini_wib.weekday())
+awal_bulan  = hari_ini_wib.replace(day=1)
+akhir_bulan = hari_ini_wib.replace(day=calendar.monthrange(hari_ini_wib.year, hari_ini_wib.month)[1])
 
 # Hari ini
-out_hari_bank = df_asli[mask_aktif & mask_bank & (df_asli["Tanggal_dt"].dt.date == hari_ini_wib)]["Nominal"].sum()
-out_hari_cash = df_asli[mask_aktif & mask_cash & (df_asli["Tanggal_dt"].dt.date == hari_ini_wib)]["Nominal"].sum()
+out_hari_bank = ledger.total_rentang(index_saldo, hari_ini_wib, hari_ini_wib, tipe="Pengeluaran", sumber="Bank", pending=False)
+out_hari_cash = ledger.total_rentang(index_saldo, hari_ini_wib, hari_ini_wib, tipe="Pengeluaran", sumber="Cash", pending=False)
 out_hari = out_hari_bank + out_hari_cash
 
-# Minggu ini
-out_minggu_bank = df_asli[mask_aktif & mask_bank & 
-                          (df_asli["Tanggal_dt"].dt.isocalendar().week == now.isocalendar()[1]) & 
-                          (df_asli["Tanggal_dt"].dt.year == now.year)]["Nominal"].sum()
-out_minggu_cash = df_asli[mask_aktif & mask_cash & 
-                          (df_asli["Tanggal_dt"].dt.isocalendar().week == now.isocalendar()[1]) & 
-                          (df_asli["Tanggal_dt"].dt.year == now.year)]["Nominal"].sum()
+# Minggu ini (Senin - Minggu)
+out_minggu_bank = ledger.total_rentang(index_saldo, awal_minggu, awal_minggu + datetime.timedelta(days=6), tipe="Pengeluaran", sumber="Bank", pending=False)
+out_minggu_cash = ledger.total_rentang(index_saldo, awal_minggu, awal_minggu + datetime.timedelta(days=6), tipe="Pengeluaran", sumber="Cash", pending=False)
 out_minggu = out_minggu_bank + out_minggu_cash
 
 # Bulan ini
-out_bulan_bank = df_asli[mask_aktif & mask_bank & 
-                         (df_asli["Tanggal_dt"].dt.month == now.month) & 
-                         (df_asli["Tanggal_dt"].dt.year == now.year)]["Nominal"].sum()
-out_bulan_cash = df_asli[mask_aktif & mask_cash & 
-                         (df_asli["Tanggal_dt"].dt.month == now.month) & 
-                         (df_asli["Tanggal_dt"].dt.year == now.year)]["Nominal"].sum()
+out_bulan_bank = ledger.total_rentang(index_saldo, awal_bulan, akhir_bulan, tipe="Pengeluaran", sumber="Bank", pending=False)
+out_bulan_cash = ledger.total_rentang(index_saldo, awal_bulan, akhir_bulan, tipe="Pengeluaran", sumber="Cash", pending=False)
 out_bulan = out_bulan_bank + out_bulan_cash
 
 
 due_text = "No Pending"
 if not df_asli[mask_pend].empty:
-    vd = pd.to_datetime(df_asli[mask_pend]["Tenggat_Waktu"], errors='coerce').dropna()
+    vd = df_asli.loc[mask_pend, "Tenggat_Waktu"].dropna()
     if not vd.empty: due_text = f"Due: {vd.min().strftime('%d %b %y')}"
 
 
 SALDO_BANK = REAL_OPERASIONAL - total_out + total_in  
-UANG_CASH = load_cash_cloud()                         
 TABUNGAN = REAL_DARURAT                              
 saldo_op = SALDO_BANK + UANG_CASH - TABUNGAN          
 total_real = SALDO_BANK + UANG_CASH                    
@@ -1175,11 +1801,10 @@ with lc:
             elif sumber_i == "Bank" and tipe_i == "Pengeluaran" and nom_i > SALDO_BANK:
                 st.error(f"❌ Saldo bank tidak cukup! (Sisa: Rp {SALDO_BANK:,.0f})")
                 error = True
-            elif sumber_i == "Cash" and tipe_i == "Pengeluaran":
-                cash_skrg = load_cash_cloud()
-                if nom_i > cash_skrg:
-                    st.error(f"❌ Saldo cash tidak cukup! (Sisa: Rp {cash_skrg:,.0f})")
-                    error = True
+            elif sumber_i == "Cash" and tipe_i == "Pengeluaran" and nom_i > UANG_CASH:
+                # Cek cepat di client; pengecekan final ada di RPC catat_transaksi_atomik
+                st.error(f"❌ Saldo cash tidak cukup! (Sisa: Rp {UANG_CASH:,.0f})")
+                error = True
             
             if not error:
                 # Data transaksi
@@ -1195,21 +1820,20 @@ with lc:
                     "Sumber": sumber_i
                 }
                 
-                # Update cash
+                # Simpan transaksi + update cash dalam satu RPC atomik
+                delta_cash, catatan_cash = 0, ""
                 if sumber_i == "Cash":
-                    cash_skrg = load_cash_cloud()
                     if tipe_i == "Pengeluaran":
-                        update_cash_cloud(cash_skrg - nom_i, f"Transaksi: {cat_i}")
+                        delta_cash, catatan_cash = -nom_i, f"Transaksi: {cat_i}"
                     else:
-                        update_cash_cloud(cash_skrg + nom_i, f"Pemasukan cash: {cat_i}")
-                
-                # Simpan
-                save_to_cloud(nr)
-                df_asli = pd.concat([df_asli, pd.DataFrame([nr])], ignore_index=True)
-                save_data(df_asli)
+                        delta_cash, catatan_cash = nom_i, f"Pemasukan cash: {cat_i}"
                 
-                st.success("✅ Transaksi berhasil disimpan!")
-                st.rerun()
+                if catat_transaksi_atomik([nr], delta_cash, catatan_cash):
+                    df_asli = pd.concat([df_asli, pd.DataFrame([nr])], ignore_index=True)
+                    save_data(df_asli)
+                    
+                    st.success("✅ Transaksi berhasil disimpan!")
+                    st.rerun()
 
 
 
@@ -1232,27 +1856,11 @@ with tab_grafik:
     with g1:
         st.subheader("📈 Tren Pengeluaran Harian (Bank + Cash)")
         
-    df_bank = df_asli[
-        (df_asli["Tipe"] == "Pengeluaran") & 
-        (df_asli["Sumber"] == "Bank") &
-        ~((df_asli["Kategori"] == "Scheduled Settlement") & (df_asli["Status"] == "Pending"))
-    ].copy()
-    df_bank["Tanggal"] = pd.to_datetime(df_bank["Tanggal"]).dt.date
-    df_bank = df_bank.groupby("Tanggal")["Nominal"].sum().reset_index()
-    df_bank["Sumber"] = "Bank"
-    
-    # Data Cash
-    df_cash = df_asli[
-        (df_asli["Tipe"] == "Pengeluaran") & 
-        (df_asli["Sumber"] == "Cash") &
-        ~((df_asli["Kategori"] == "Scheduled Settlement") & (df_asli["Status"] == "Pending"))
-    ].copy()
-    df_cash["Tanggal"] = pd.to_datetime(df_cash["Tanggal"]).dt.date
-    df_cash = df_cash.groupby("Tanggal")["Nominal"].sum().reset_index()
-    df_cash["Sumber"] = "Cash"
-    
-    # Gabungkan
-    df_gabungan = pd.concat([df_bank, df_cash], ignore_index=True)
+    # Langsung dari rollup harian: sudah per (tanggal, Sumber), tidak scan ledger lagi
+    df_gabungan = ledger.pilih_rollup(rollup_harian, tipe="Pengeluaran", pending=False)
+    df_gabungan = df_gabungan[df_gabungan["Sumber"].isin(["Bank", "Cash"])]
+    df_gabungan = df_gabungan.groupby([df_gabungan["Tanggal"].dt.date, "Sumber"], observed=True)["Nominal"].sum().reset_index()
+    df_gabungan["Sumber"] = df_gabungan["Sumber"].astype(str)
     
     if not df_gabungan.empty:
         # Pivot untuk stacked bar
@@ -1264,7 +1872,7 @@ with tab_grafik:
             fill_value=0
         ).reset_index()
         
-        dt_pivot["Total"] = dt_pivot[["Bank", "Cash"]].sum(axis=1)
+        dt_pivot["Total"] = dt_pivot.reindex(columns=["Bank", "Cash"], fill_value=0).sum(axis=1)
         dt_pivot = dt_pivot.sort_values("Tanggal")
         
         # Buat figure
@@ -1321,13 +1929,16 @@ with tab_grafik:
         st.plotly_chart(fig, use_container_width=True)
         
         # Tampilkan statistik
+        total_sumber = df_gabungan.groupby("Sumber")["Nominal"].sum()
+        total_bank = total_sumber.get("Bank", 0)
+        total_cash = total_sumber.get("Cash", 0)
         col_s1, col_s2, col_s3 = st.columns(3)
         with col_s1:
-            st.metric("💰 Total Bank", f"Rp {df_bank['Nominal'].sum():,.0f}")
+            st.metric("💰 Total Bank", f"Rp {total_bank:,.0f}")
         with col_s2:
-            st.metric("💵 Total Cash", f"Rp {df_cash['Nominal'].sum():,.0f}")
+            st.metric("💵 Total Cash", f"Rp {total_cash:,.0f}")
         with col_s3:
-            st.metric("📊 Total", f"Rp {df_bank['Nominal'].sum() + df_cash['Nominal'].sum():,.0f}")
+            st.metric("📊 Total", f"Rp {total_bank + total_cash:,.0f}")
 
     else:
         st.info("Belum ada data pengeluaran.")
@@ -1338,13 +1949,12 @@ with tab_grafik:
         st.subheader("🍩 Distribusi Pengeluaran per Kategori")
         
         # Gabungkan bank dan cash untuk pie chart
-        df_bank_kat = df_asli[mask_aktif].copy()
+        df_bank_kat = ledger.pilih_agregat(agg_periode, "total", tipe="Pengeluaran", pending=False)
         df_bank_kat = df_bank_kat[["Kategori", "Nominal"]]
         
         try:
-            res_cash = conn.table("penggunaan_cash").select("*").execute()
-            if res_cash.data and len(res_cash.data) > 0:
-                df_cash_kat = pd.DataFrame(res_cash.data)
+            df_cash_kat = data_awal["penggunaan_cash"].copy()
+            if not df_cash_kat.empty:
                 df_cash_kat["Kategori"] = df_cash_kat["kategori"] + " (Cash)"
                 df_cash_kat["Nominal"] = df_cash_kat["nominal"]
                 df_cash_kat = df_cash_kat[["Kategori", "Nominal"]]
@@ -1356,7 +1966,7 @@ with tab_grafik:
             df_kat_gab = df_bank_kat
         
         if not df_kat_gab.empty:
-            cd = df_kat_gab.groupby("Kategori")["Nominal"].sum().reset_index()
+            cd = df_kat_gab.groupby("Kategori", observed=True)["Nominal"].sum().reset_index()
             cd = cd.sort_values("Nominal", ascending=False)
             
             col_p1, col_p2 = st.columns([1, 1])
@@ -1414,30 +2024,11 @@ with tab_grafik:
 with g3:
     st.subheader("⚖️ Ringkasan Arus Kas")
     
-    # ===== HITUNG DARI SATU SUMBER (transaksi) =====
-    # Pemasukan (semua)
-    total_pemasukan = df_asli[df_asli["Tipe"] == "Pemasukan"]["Nominal"].sum()
-    
-    # Pengeluaran Bank (Sumber = Bank, bukan pending)
-    total_pengeluaran_bank = df_asli[
-        (df_asli["Tipe"] == "Pengeluaran") & 
-        (df_asli["Sumber"] == "Bank") &
-        ~((df_asli["Kategori"] == "Scheduled Settlement") & (df_asli["Status"] == "Pending"))
-    ]["Nominal"].sum()
-    
-    # Pengeluaran Cash (Sumber = Cash, bukan pending)
-    total_pengeluaran_cash = df_asli[
-        (df_asli["Tipe"] == "Pengeluaran") & 
-        (df_asli["Sumber"] == "Cash") &
-        ~((df_asli["Kategori"] == "Scheduled Settlement") & (df_asli["Status"] == "Pending"))
-    ]["Nominal"].sum()
-    
-    # Pending (Scheduled Settlement yang masih pending)
-    total_pending = df_asli[
-        (df_asli["Tipe"] == "Pengeluaran") & 
-        (df_asli["Kategori"] == "Scheduled Settlement") & 
-        (df_asli["Status"] == "Pending")
-    ]["Nominal"].sum()
+    # ===== BACA DARI HASIL AGREGASI (agg_periode) =====
+    total_pemasukan = ledger.total_agregat(agg_periode, "total", tipe="Pemasukan")
+    total_pengeluaran_bank = ledger.total_agregat(agg_periode, "total", tipe="Pengeluaran", sumber="Bank", pending=False)
+    total_pengeluaran_cash = ledger.total_agregat(agg_periode, "total", tipe="Pengeluaran", sumber="Cash", pending=False)
+    total_pending = total_pend
     
     # ===== BUAT DATAFRAME UNTUK CHART =====
     df_cf = pd.DataFrame({
@@ -1549,7 +2140,7 @@ with tab_budget_t:
                     st.rerun()
 
     if not df_budget.empty:
-        out_bln_kat = df_asli[mask_aktif&(df_asli["Tanggal_dt"].dt.month==now.month)&(df_asli["Tanggal_dt"].dt.year==now.year)].groupby("Kategori")["Nominal"].sum()
+        out_bln_kat = ledger.pilih_agregat(agg_periode, "bulan", tipe="Pengeluaran", pending=False).groupby("Kategori", observed=True)["Nominal"].sum()
         for _,row in df_budget.iterrows():
             kat=row["Kategori"]; tgt=row["Target"]; spent=out_bln_kat.get(kat,0)
             pct_b=min(spent/tgt,1.0) if tgt>0 else 0; sisa=tgt-spent
@@ -1661,7 +2252,27 @@ with tab_piutang_t:
 
 with tab_recurring_t:
     st.subheader("🔄 Recurring Expense")
-    st.caption("Pengeluaran rutin otomatis dicatat setiap bulan/minggu sesuai jadwal yang kamu set.")
+    st.caption("Pengeluaran rutin otomatis dicatat setiap bulan/minggu sesuai jadwal yang kamu set "
+               "(lewat `python recurring_job.py` di cron, atau tick harian dengan RECURRING_TICK=1).")
+
+    if st.button("▶️ Jalankan Recurring Sekarang", key="jalankan_recurring"):
+        try:
+            dibuat = recurring_job.jalankan(client=conn.client, log=lambda *_: None)
+            if dibuat:
+                invalidasi_tabel("transaksi")
+                st.success(f"🔄 {len(dibuat)} recurring expense ditambahkan!")
+            else:
+                st.info("Tidak ada recurring yang jatuh tempo.")
+        except Exception as e:
+            st.error(f"Gagal menjalankan recurring: {e}")
+
+    if os.environ.get("RECURRING_TICK") == "1":
+        tick = _tick_recurring_harian()
+        if tick["error"]:
+            st.error(f"Tick harian gagal ({tick['terakhir']:%d %b %Y %H:%M}): {tick['error']}")
+        elif tick["terakhir"]:
+            st.caption(f"Tick harian terakhir {tick['terakhir']:%d %b %Y %H:%M} WIB, "
+                       f"{tick['dibuat']} recurring ditambahkan.")
 
     with st.form("form_recurring", clear_on_submit=True):
         r1,r2 = st.columns(2)
@@ -1684,13 +2295,15 @@ with tab_recurring_t:
 
     if not df_recurring.empty:
         st.markdown("**📋 Daftar Recurring**")
+        penanda_recurring = recurring_job.baca_penanda()
         for i,row in df_recurring.iterrows():
             aktif=str(row.get("Aktif","True")).lower()=="true"
             ca,cb,cc,cd,ce=st.columns([2.5,2,1.5,1.5,1])
             ca.markdown(f"{'🟢' if aktif else '⚫'} **{row['Nama']}**")
             cb.markdown(f"Rp {row['Nominal']:,.0f} / {row['Frekuensi']}")
             cc.markdown(str(row['Kategori'])[:18])
-            cd.markdown(f"Tgl {pd.to_datetime(row['Tanggal_Mulai']).day}")
+            terakhir = penanda_recurring.get(ledger.kunci_rule(row))
+            cd.markdown(f"Tgl {pd.to_datetime(row['Tanggal_Mulai']).day}" + (f"  \n<small>terakhir {terakhir}</small>" if terakhir else ""), unsafe_allow_html=True)
             if ce.button("⏸" if aktif else "▶", key=f"tog_{i}"):
                 df_recurring.at[i,"Aktif"]=not aktif; save_recurring(df_recurring); st.rerun()
     else:
@@ -1709,12 +2322,13 @@ with tab_laporan_t:
     sel=st.selectbox("Pilih Periode",list(minggu_opts.keys()))
     s_dt,e_dt=minggu_opts[sel]
 
+    # Total dari index saldo, grafik dari rollup harian; ledger mentah cuma untuk tabel detail
+    rl_lap=ledger.pilih_rollup(rollup_harian,tipe="Pengeluaran",pending=False,mulai=s_dt,sampai=e_dt)
     df_lap=df_asli[mask_aktif].copy()
     df_lap=df_lap[(df_lap["Tanggal_dt"].dt.date>=s_dt)&(df_lap["Tanggal_dt"].dt.date<=e_dt)]
-    df_inc_lap=df_asli[mask_income].copy()
-    df_inc_lap=df_inc_lap[(df_inc_lap["Tanggal_dt"].dt.date>=s_dt)&(df_inc_lap["Tanggal_dt"].dt.date<=e_dt)]
 
-    tot_lo=df_lap["Nominal"].sum(); tot_li=df_inc_lap["Nominal"].sum()
+    tot_lo=ledger.total_rentang(index_saldo,s_dt,e_dt,tipe="Pengeluaran",pending=False)
+    tot_li=ledger.total_rentang(index_saldo,s_dt,e_dt,tipe="Pemasukan")
     net_l=tot_li-tot_lo; avg_l=tot_lo/7
 
     la1,la2,la3,la4=st.columns(4)
@@ -1723,14 +2337,14 @@ with tab_laporan_t:
     la3.metric("Net Cash Flow",    f"Rp {net_l:,.0f}", delta="Surplus" if net_l>=0 else "Defisit", delta_color="normal" if net_l>=0 else "inverse")
     la4.metric("Rata-rata Harian", f"Rp {avg_l:,.0f}", delta=f"{'✅ Aman' if avg_l<=batas_hr else '⚠️ Melebihi limit'}", delta_color="off")
 
-    if not df_lap.empty:
-        dd=df_lap.groupby(df_lap["Tanggal_dt"].dt.date)["Nominal"].sum().reset_index()
+    if not rl_lap.empty:
+        dd=rl_lap.groupby(rl_lap["Tanggal"].dt.date)["Nominal"].sum().reset_index()
         dd.columns=["Tanggal","Total"]
         fl=px.bar(dd,x="Tanggal",y="Total",color_discrete_sequence=["#10B981"],title="Pengeluaran Harian")
         fl.add_hline(y=batas_hr,line_dash="dot",line_color="#EF4444",annotation_text="Limit Harian",annotation_font_color="#EF4444")
         fl.update_layout(**PLOT); st.plotly_chart(fl,use_container_width=True)
 
-        top_k=df_lap.groupby("Kategori")["Nominal"].sum().sort_values(ascending=False).reset_index()
+        top_k=rl_lap.groupby("Kategori",observed=True)["Nominal"].sum().sort_values(ascending=False).reset_index()
         st.markdown("**🏆 Top Kategori**")
         for _,r in top_k.iterrows():
             p=r["Nominal"]/tot_lo if tot_lo>0 else 0
@@ -1739,6 +2353,7 @@ with tab_laporan_t:
 
         st.markdown("**📄 Detail Transaksi**")
         ds=df_lap[["Tanggal","Kategori","Nominal","Catatan"]].copy()
+        ds["Tanggal"]=ds["Tanggal"].dt.date
         ds["Nominal"]=ds["Nominal"].apply(lambda x:f"Rp {x:,.0f}")
         st.dataframe(ds,use_container_width=True,hide_index=True)
 
@@ -1764,7 +2379,9 @@ with tab_mandiri:
         m_email = st.text_input("Gmail", placeholder="kamu@gmail.com", key="m_email")
         m_pass  = st.text_input("App Password Gmail", type="password",
                      placeholder="xxxx xxxx xxxx xxxx", key="m_pass")
-        m_limit = st.slider("Ambil berapa email terakhir?", 1, 50, 10)
+        m_limit = st.slider("Ambil berapa email terakhir? (sinkron pertama / scan ulang)", 1, 50, 10)
+        m_rescan = st.checkbox("🔁 Scan ulang email terakhir", value=False,
+                     help="Default cuma email yang belum pernah diproses (per UID). Centang untuk memproses ulang email terakhir.")
 
         if "debug_body" in st.session_state:
             with st.expander("🔍 Debug Body Email"):
@@ -1783,17 +2400,61 @@ with tab_mandiri:
     if st.button("📥 Fetch Email Mandiri", use_container_width=True):
         if m_email and m_pass:
             with st.spinner("📧 Membaca email dari Gmail..."):
-                rows, err = fetch_mandiri_emails(m_email, m_pass, m_limit)
+                debug = {}
+                rows, err = mandiri_imap.fetch_mandiri_emails(m_email, m_pass, m_limit, full_rescan=m_rescan, debug=debug)
+            if "body" in debug:
+                st.session_state["debug_body"] = debug["body"]
             if err:
                 st.error(f"❌ Error: {err}")
             elif not rows:
-                st.warning("Tidak ada email transaksi Mandiri ditemukan.")
+                st.warning("Tidak ada email transaksi Mandiri baru.")
             else:
                 st.session_state["mandiri_rows"] = rows
+                st.session_state["mandiri_dari_antrean"] = False
                 st.success(f"✅ Ditemukan {len(rows)} transaksi!")
         else:
-            st.warning("Isi Gmail dan App Password dulu.")\
-            
+            st.warning("Isi Gmail dan App Password dulu.")
+
+    st.markdown("---")
+    st.markdown("**🛰️ Watcher Otomatis (IMAP IDLE)**")
+    st.caption("Worker di background menunggu notifikasi baru lewat IMAP IDLE dan "
+               "menaruh transaksinya di antrean; tinggal ditinjau lalu diimport.")
+
+    col_w1, col_w2, col_w3 = st.columns(3)
+    with col_w1:
+        if st.button("▶️ Start Watcher", use_container_width=True):
+            if m_email and m_pass:
+                mulai_watcher_mandiri(m_email, m_pass)
+                st.rerun()
+            else:
+                st.warning("Isi Gmail dan App Password dulu.")
+    with col_w2:
+        if st.button("⏹️ Stop Watcher", use_container_width=True,
+                     disabled=m_email not in _watcher_mandiri()["handle"]):
+            hentikan_watcher_mandiri(m_email)
+            st.rerun()
+    with col_w3:
+        st.button("🔄 Refresh Status", use_container_width=True)
+
+    ikon_watcher = {"idle": "🟢", "menghubungkan": "🟡", "menunggu": "🔴", "berhenti": "⚪"}
+    for akun_w, handle_w in list(_watcher_mandiri()["handle"].items()):
+        status_w = handle_w["status"]
+        keadaan_w = status_w.get("keadaan", "menghubungkan")
+        teks_w = (f"{ikon_watcher.get(keadaan_w, '⚪')} **{akun_w}** — {keadaan_w} sejak {status_w.get('sejak', '-')}"
+                  f" · {status_w.get('ditambah', 0)} transaksi masuk antrean")
+        if keadaan_w == "menunggu":
+            teks_w += f" · gagal {status_w.get('gagal')}x, coba lagi ±{status_w.get('coba_lagi')} detik ({status_w.get('error')})"
+        st.markdown(teks_w)
+
+    antrean_rows = mandiri_watcher.isi_antrean(_antrean_mandiri())
+    if antrean_rows:
+        col_q1, col_q2 = st.columns([3, 1])
+        col_q1.info(f"📥 {len(antrean_rows)} transaksi dari watcher menunggu ditinjau.")
+        if col_q2.button("📋 Tinjau", use_container_width=True):
+            st.session_state["mandiri_rows"] = antrean_rows
+            st.session_state["mandiri_dari_antrean"] = True
+            st.rerun()
+
     if "mandiri_rows" in st.session_state:
         rows = st.session_state["mandiri_rows"]
         st.markdown("**📋 Preview Transaksi — edit sebelum disimpan:**")
@@ -1813,52 +2474,89 @@ with tab_mandiri:
         col_imp1, col_imp2 = st.columns(2)
         with col_imp1:
             if st.button("💾 Import Semua ke Database", use_container_width=True):
-                imported = 0
                 new_rows_for_cloud = []
+
+                # Validasi yang sama dengan cloud / CSV; baris gagal masuk karantina
+                edited_valid, karantina_mandiri = ledger.validasi_transaksi(edited, "mandiri")
+                catat_karantina("mandiri", karantina_mandiri)
                 
-                for _, row in edited.iterrows():
-                    dup = df_asli[
-                        (df_asli["Nominal"] == row["Nominal"]) &
-                        (df_asli["Tanggal"].astype(str) == str(row["Tanggal"])) &
-                        (df_asli["Catatan"].astype(str).str.contains(str(row["Catatan"])[:20], na=False))
-                    ]
-                    
-                    if dup.empty:
-                        new_entry = {
-                            "Tanggal": str(row["Tanggal"]),
-                            "Tipe": row["Tipe"], 
-                            "Kategori": row["Kategori"],
-                            "Nominal": row["Nominal"], 
-                            "Catatan": row["Catatan"],
-                            "Status": "Cleared", 
-                            "Tenggat_Waktu": "",
-                            "Tanggal_Bayar": str(row["Tanggal"])
-                        }
-                        
-                        new_row_df = pd.DataFrame([new_entry])
-                        df_asli = pd.concat([df_asli, new_row_df], ignore_index=True)
-                    
-                        cloud_entry = {k.lower(): v for k, v in new_entry.items()}
-                        new_rows_for_cloud.append(cloud_entry)
-                        
-                        imported += 1
-                
-                # Bagian simpan ini masih di dalam blok 'if st.button'
-                save_data(df_asli)
-                
+                # Index sidik ledger dibangun sekali; cek duplikat per baris cukup lookup set
+                sidik_ada = ledger.index_sidik(df_asli)
+                new_entries = []
+                sidik_baris = []
+                for row in edited_valid.to_dict("records"):
+                    sidik = ledger.sidik_transaksi(row["Tanggal"], row["Nominal"], row["Catatan"])
+                    if sidik in sidik_ada:
+                        continue
+                    sidik_ada.add(sidik)  # duplikat di dalam batch import sendiri juga ditolak
+
+                    tgl_str = row["Tanggal"].strftime("%Y-%m-%d")
+                    new_entry = {
+                        "Tanggal": tgl_str,
+                        "Tipe": row["Tipe"],
+                        "Kategori": row["Kategori"],
+                        "Nominal": int(row["Nominal"]),
+                        "Catatan": row["Catatan"],
+                        "Status": "Cleared",
+                        "Tenggat_Waktu": "",
+                        "Tanggal_Bayar": tgl_str,
+                        "Sumber": row["Sumber"]
+                    }
+                    new_entries.append(new_entry)
+                    sidik_baris.append(sidik)
+
+                    cloud_entry = {k.lower(): v for k, v in new_entry.items()}
+                    cloud_entry["sidik"] = sidik
+                    new_rows_for_cloud.append(cloud_entry)
+
+                # Cloud dulu: yang dihitung terimport hanya baris yang benar-benar di-insert server
+                sidik_masuk = None  # None = semua baris dianggap masuk (tanpa sidik / cloud gagal)
                 if new_rows_for_cloud:
                     try:
-                        conn.table("transaksi").insert(new_rows_for_cloud).execute()
-                        st.cache_data.clear() 
+                        # Unique index transaksi.sidik (migrasi 004) menolak duplikat di sisi server juga;
+                        # dengan ignore_duplicates respons cuma berisi baris yang di-insert
+                        res = conn.table("transaksi").upsert(
+                            new_rows_for_cloud, on_conflict="sidik", ignore_duplicates=True
+                        ).execute()
+                        sidik_masuk = {r.get("sidik") for r in res.data or []}
+                        invalidasi_tabel("transaksi")
                     except Exception as e:
-                        st.sidebar.error(f"Gagal kirim ke Cloud: {e}")
+                        if _kolom_tidak_ada(e, "sidik") or "42P10" in str(e):
+                            # Migrasi 004 belum jalan -> insert biasa tanpa sidik
+                            try:
+                                conn.table("transaksi").insert(
+                                    [{k: v for k, v in r.items() if k != "sidik"} for r in new_rows_for_cloud]
+                                ).execute()
+                                invalidasi_tabel("transaksi")
+                            except Exception as e2:
+                                st.sidebar.error(f"Gagal kirim ke Cloud: {e2}")
+                        else:
+                            st.sidebar.error(f"Gagal kirim ke Cloud: {e}")
+
+                if sidik_masuk is not None:
+                    new_entries = [e for e, sidik in zip(new_entries, sidik_baris) if sidik in sidik_masuk]
+                imported = len(new_entries)
+                dilewati = len(sidik_baris) - imported
 
+                # Satu concat + satu tulis CSV untuk seluruh batch
+                if new_entries:
+                    df_asli = pd.concat([df_asli, pd.DataFrame(new_entries)], ignore_index=True)
+                    save_data(df_asli)
+
+                if st.session_state.pop("mandiri_dari_antrean", False):
+                    mandiri_watcher.buang_antrean(_antrean_mandiri(), rows)
                 del st.session_state["mandiri_rows"]
                 st.success(f"✅ {imported} transaksi berhasil diimport ke Cloud & Lokal!")
+                if dilewati:
+                    st.info(f"ℹ️ {dilewati} transaksi sudah ada di Cloud, dilewati")
+                if not karantina_mandiri.empty:
+                    st.warning(f"🚧 {len(karantina_mandiri)} baris tidak valid masuk karantina (lihat sidebar)")
                 st.rerun()
 
         with col_imp2:
             if st.button("🗑️ Batal", use_container_width=True):
+                if st.session_state.pop("mandiri_dari_antrean", False):
+                    mandiri_watcher.buang_antrean(_antrean_mandiri(), rows)
                 del st.session_state["mandiri_rows"]
                 st.rerun()
                 
@@ -1872,8 +2570,7 @@ with tab_cash:
     if "show_cash_amount" not in st.session_state:
         st.session_state.show_cash_amount = False
     
-    # Load data cash
-    UANG_CASH = load_cash_cloud()
+    # Saldo cash sudah ikut di-load saat bootstrap (UANG_CASH)
     
     # ===== HEADER DENGAN HIDE/SHOW =====
     col_hide1, col_hide2 = st.columns([3, 1])
@@ -1915,9 +2612,10 @@ with tab_cash:
     if not df_cash_transactions.empty:
         st.success(f"✅ Ditemukan {len(df_cash_transactions)} transaksi cash")
         
-        # Statistik
-        total_masuk = df_cash_transactions[df_cash_transactions["Tipe"] == "Pemasukan"]["Nominal"].sum()
-        total_keluar = df_cash_transactions[df_cash_transactions["Tipe"] == "Pengeluaran"]["Nominal"].sum()
+        # Statistik dari rollup harian
+        rl_cash = ledger.pilih_rollup(rollup_harian, sumber="Cash")
+        total_masuk = rl_cash[rl_cash["Tipe"] == "Pemasukan"]["Nominal"].sum()
+        total_keluar = rl_cash[rl_cash["Tipe"] == "Pengeluaran"]["Nominal"].sum()
         
         col_r1, col_r2, col_r3 = st.columns(3)
         
@@ -1952,9 +2650,7 @@ with tab_cash:
         
         # ===== GRAFIK PENGGUNAAN CASH =====
         with st.expander("📈 Grafik Penggunaan Cash", expanded=False):
-            df_cash_daily = df_cash_transactions.copy()
-            df_cash_daily["Tanggal"] = pd.to_datetime(df_cash_daily["Tanggal"])
-            df_cash_daily = df_cash_daily[df_cash_daily["Tipe"] == "Pengeluaran"]
+            df_cash_daily = rl_cash[rl_cash["Tipe"] == "Pengeluaran"]
             
             if not df_cash_daily.empty:
                 daily_sum = df_cash_daily.groupby(df_cash_daily["Tanggal"].dt.date)["Nominal"].sum().reset_index()
@@ -1998,15 +2694,15 @@ with tab_cash:
             today = hari_ini_wib
             if filter_bulan_cash == "Bulan Ini":
                 df_display_cash = df_display_cash[
-                    (pd.to_datetime(df_display_cash["Tanggal"]).dt.month == today.month) &
-                    (pd.to_datetime(df_display_cash["Tanggal"]).dt.year == today.year)
+                    (df_display_cash["Tanggal"].dt.month == today.month) &
+                    (df_display_cash["Tanggal"].dt.year == today.year)
                 ]
             elif filter_bulan_cash == "Bulan Lalu":
                 last_month = today.month - 1 if today.month > 1 else 12
                 last_month_year = today.year if today.month > 1 else today.year - 1
                 df_display_cash = df_display_cash[
-                    (pd.to_datetime(df_display_cash["Tanggal"]).dt.month == last_month) &
-                    (pd.to_datetime(df_display_cash["Tanggal"]).dt.year == last_month_year)
+                    (df_display_cash["Tanggal"].dt.month == last_month) &
+                    (df_display_cash["Tanggal"].dt.year == last_month_year)
                 ]
             
             if not df_display_cash.empty:
@@ -2014,6 +2710,7 @@ with tab_cash:
                 df_show = df_display_cash[["Tanggal", "Tipe", "Kategori", "Nominal", "Catatan"]].copy()
                 df_show["Nominal"] = df_show["Nominal"].apply(lambda x: f"Rp {x:,.0f}")
                 df_show = df_show.sort_values("Tanggal", ascending=False)
+                df_show["Tanggal"] = df_show["Tanggal"].dt.date
                 st.dataframe(df_show, use_container_width=True, hide_index=True)
                 st.caption(f"Menampilkan {len(df_show)} transaksi")
             else:
@@ -2082,7 +2779,6 @@ with tab_cash:
                             "Tanggal_Bayar": hari_ini_wib.strftime("%Y-%m-%d"),
                             "Sumber": "Bank"
                         }
-                        save_to_cloud(transaksi_bank)
                         
                         # Transaksi Cash (pemasukan)
                         transaksi_cash = {
@@ -2096,15 +2792,13 @@ with tab_cash:
                             "Tanggal_Bayar": hari_ini_wib.strftime("%Y-%m-%d"),
                             "Sumber": "Cash"
                         }
-                        save_to_cloud(transaksi_cash)
-                        
-                        # Update saldo cash
-                        baru_cash = UANG_CASH + nominal_quick
-                        update_cash_cloud(baru_cash, f"Tarik tunai: {catatan_quick}")
                         
-                        st.success(f"✅ Berhasil tarik Rp {nominal_quick:,.0f}")
-                        del st.session_state["quick_cash"]
-                        st.rerun()
+                        # Dua transaksi + saldo cash bertambah, satu RPC atomik
+                        if catat_transaksi_atomik([transaksi_bank, transaksi_cash], nominal_quick,
+                                                  f"Tarik tunai: {catatan_quick}"):
+                            st.success(f"✅ Berhasil tarik Rp {nominal_quick:,.0f}")
+                            del st.session_state["quick_cash"]
+                            st.rerun()
             
             else:
                 # Transaksi pengeluaran cash biasa
@@ -2132,15 +2826,13 @@ with tab_cash:
                                 "Tanggal_Bayar": hari_ini_wib.strftime("%Y-%m-%d"),
                                 "Sumber": "Cash"
                             }
-                            save_to_cloud(transaksi)
-                            
-                            # Update saldo cash
-                            baru_cash = UANG_CASH - nominal_quick
-                            update_cash_cloud(baru_cash, f"{st.session_state['quick_cash']}: {catatan_quick}")
                             
-                            st.success(f"✅ Berhasil mencatat pengeluaran Rp {nominal_quick:,.0f}")
-                            del st.session_state["quick_cash"]
-                            st.rerun()
+                            # Transaksi + saldo cash berkurang, satu RPC atomik
+                            if catat_transaksi_atomik([transaksi], -nominal_quick,
+                                                      f"{st.session_state['quick_cash']}: {catatan_quick}"):
+                                st.success(f"✅ Berhasil mencatat pengeluaran Rp {nominal_quick:,.0f}")
+                                del st.session_state["quick_cash"]
+                                st.rerun()
                         else:
                             st.error(f"❌ Saldo cash tidak cukup! (Sisa: Rp {UANG_CASH:,.0f})")
             
@@ -2293,23 +2985,8 @@ with tab_tabungan:
                             with col_btn1:
                                 if st.form_submit_button("✅ Setor"):
                                     if nominal_setor > 0:
-                                        # Update nominal terkumpul
-                                        new_terkumpul = row["Terkumpul"] + nominal_setor
-                                        update_data = {
-                                            "nominal_terkumpul": new_terkumpul,
-                                            "status": "Selesai" if new_terkumpul >= row["Target"] else "Aktif"
-                                        }
-                                        if update_tabungan_cloud(row.get("id"), update_data):
-                                            # Catat transaksi
-                                            transaksi_data = {
-                                                "tabungan_id": row.get("id"),
-                                                "tanggal": hari_ini_wib.strftime("%Y-%m-%d"),
-                                                "nominal": nominal_setor,
-                                                "tipe": "Setor",
-                                                "catatan": catatan_setor
-                                            }
-                                            conn.table("transaksi_tabungan").insert(transaksi_data).execute()
-                                            
+                                        # Tambah terkumpul + catat histori di server (atomik)
+                                        if mutasi_tabungan_atomik(row.get("id"), nominal_setor, catatan_setor):
                                             st.success(f"✅ Berhasil setor Rp {nominal_setor:,.0f}!")
                                             st.session_state[f"setor_tabungan_{idx}"] = False
                                             st.rerun()
@@ -2331,21 +3008,8 @@ with tab_tabungan:
                             with col_btn1:
                                 if st.form_submit_button("✅ Tarik"):
                                     if nominal_tarik > 0:
-                                        new_terkumpul = row["Terkumpul"] - nominal_tarik
-                                        update_data = {
-                                            "nominal_terkumpul": new_terkumpul
-                                        }
-                                        if update_tabungan_cloud(row.get("id"), update_data):
-                                            # Catat transaksi
-                                            transaksi_data = {
-                                                "tabungan_id": row.get("id"),
-                                                "tanggal": hari_ini_wib.strftime("%Y-%m-%d"),
-                                                "nominal": nominal_tarik,
-                                                "tipe": "Tarik",
-                                                "catatan": catatan_tarik
-                                            }
-                                            conn.table("transaksi_tabungan").insert(transaksi_data).execute()
-                                            
+                                        # Kurangi terkumpul + catat histori di server (atomik)
+                                        if mutasi_tabungan_atomik(row.get("id"), -nominal_tarik, catatan_tarik):
                                             st.success(f"✅ Berhasil tarik Rp {nominal_tarik:,.0f}!")
                                             st.session_state[f"tarik_tabungan_{idx}"] = False
                                             st.rerun()
@@ -2406,44 +3070,15 @@ st.divider()
 
 st.subheader("📜 Log Transaksi")
 
-# ===== AMBIL DATA DARI TABEL TRANSAKSI =====
-try:
-    res = conn.table("transaksi").select("*").order("tanggal", desc=True).execute()
-    if res.data:
-        df_tampil = pd.DataFrame(res.data)
-        
-        # Rename kolom
-        df_tampil = df_tampil.rename(columns={
-            "tanggal": "Tanggal",
-            "tipe": "Tipe",
-            "kategori": "Kategori",
-            "nominal": "Nominal",
-            "catatan": "Catatan",
-            "status": "Status",
-            "tenggat_waktu": "Tenggat_Waktu",
-            "tanggal_bayar": "Tanggal_Bayar",
-            "sumber": "Sumber"
-        })
-        df_tampil["Nominal"] = pd.to_numeric(df_tampil["Nominal"], errors="coerce").fillna(0)
-        
-        # Pastikan kolom ID ada
-        if "id" not in df_tampil.columns:
-            df_tampil["id"] = range(1, len(df_tampil) + 1)
-    else:
-        df_tampil = pd.DataFrame()
-except Exception as e:
-    st.error(f"Error: {e}")
-    df_tampil = pd.DataFrame()
-
 # ===== AMBIL SEMUA KATEGORI UNIK UNTUK DROPDOWN =====
 semua_kategori = []
-if not df_tampil.empty:
-    semua_kategori = sorted(df_tampil["Kategori"].dropna().unique().tolist())
+if not df_cloud.empty:
+    semua_kategori = sorted(df_cloud["Kategori"].dropna().unique().tolist())
     # Tambah opsi untuk kategori baru
     semua_kategori.append("➕ Tambah Kategori Baru...")
 
 # ===== TAMPILKAN DATA =====
-if not df_tampil.empty:
+if not df_cloud.empty:
     # Filter
     col1, col2, col3, col4 = st.columns(4)
     with col1:
@@ -2455,22 +3090,41 @@ if not df_tampil.empty:
     with col4:
         rows_per_page = st.selectbox("Baris per halaman", [10, 25, 50, 100], index=0, key="rows_per_page")
     
-    # Apply filter
-    df_filter = df_tampil.copy()
-    if filter_tipe != "Semua":
-        df_filter = df_filter[df_filter["Tipe"] == filter_tipe]
-    if filter_sumber != "Semua":
-        df_filter = df_filter[df_filter["Sumber"] == filter_sumber]
-    if filter_status != "Semua":
-        df_filter = df_filter[df_filter["Status"] == filter_status]
+    # ===== KEYSET PAGING =====
+    # log_kursor = tumpukan kursor halaman; reset kalau filter / ukuran halaman berubah
+    kunci_log = (filter_tipe, filter_sumber, filter_status, rows_per_page)
+    if st.session_state.get("log_kunci") != kunci_log:
+        st.session_state.log_kunci = kunci_log
+        st.session_state.log_kursor = [None]
+    
+    total_log = hitung_log_transaksi(filter_tipe, filter_sumber, filter_status)
+    halaman_ke = len(st.session_state.log_kursor)
+    df_filter = load_log_halaman(filter_tipe, filter_sumber, filter_status,
+                                 st.session_state.log_kursor[-1], rows_per_page)
     
     # Format tanggal
     for col in ["Tanggal", "Tenggat_Waktu", "Tanggal_Bayar"]:
         if col in df_filter.columns:
             df_filter[col] = pd.to_datetime(df_filter[col], errors="coerce").dt.date
     
+    col_nav1, col_nav2, col_nav3 = st.columns([1, 2, 1])
+    with col_nav1:
+        if st.button("⬅️ Sebelumnya", use_container_width=True, disabled=halaman_ke <= 1):
+            st.session_state.log_kursor.pop()
+            st.rerun()
+    with col_nav2:
+        total_halaman = max((total_log + rows_per_page - 1) // rows_per_page, 1)
+        st.caption(f"Halaman {halaman_ke} dari {total_halaman}")
+    with col_nav3:
+        ada_berikutnya = len(df_filter) == rows_per_page and halaman_ke * rows_per_page < total_log
+        if st.button("Berikutnya ➡️", use_container_width=True, disabled=not ada_berikutnya):
+            terakhir = df_filter.iloc[-1]
+            tgl_terakhir = terakhir["Tanggal"].strftime("%Y-%m-%d") if pd.notna(terakhir["Tanggal"]) else None
+            st.session_state.log_kursor.append((tgl_terakhir, int(terakhir["id"])))
+            st.rerun()
+    
     # ===== DATA EDITOR DENGAN EDITABLE SEMUA KOLOM =====
-    st.caption(f"Total: {len(df_filter)} transaksi")
+    st.caption(f"Total: {total_log} transaksi")
     
     # Konfigurasi kolom untuk data editor
     column_config = {
@@ -2524,14 +3178,15 @@ if not df_tampil.empty:
         ),
     }
     
-    # Tampilkan data editor
+    # Tampilkan data editor (key per halaman supaya editan tidak nyasar ke halaman lain)
+    kunci_editor = "log_data_editor_" + "_".join(map(str, kunci_log)) + f"_{halaman_ke}"
     edited_df = st.data_editor(
         df_filter,
         use_container_width=True,
         num_rows="dynamic",
         column_config=column_config,
         hide_index=True,
-        key="log_data_editor"
+        key=kunci_editor
     )
     
     # ===== TOMBOL SIMPAN PERUBAHAN =====
@@ -2545,45 +3200,23 @@ if not df_tampil.empty:
                     if (edited_df["Nominal"] <= 0).any():
                         st.error("❌ Ada nominal yang 0 atau kurang!")
                     else:
-                        # Konversi kembali ke format database
-                        data_to_save = edited_df.copy()
-                        
-                        # Format tanggal ke string
-                        for col in ["Tanggal", "Tenggat_Waktu", "Tanggal_Bayar"]:
-                            if col in data_to_save.columns:
-                                data_to_save[col] = data_to_save[col].apply(
-                                    lambda x: x.strftime("%Y-%m-%d") if pd.notnull(x) and hasattr(x, 'strftime') else ""
-                                )
-                        
-                        # Rename ke lowercase untuk Supabase
-                        data_to_save = data_to_save.rename(columns={
-                            "Tanggal": "tanggal",
-                            "Tipe": "tipe",
-                            "Kategori": "kategori",
-                            "Nominal": "nominal",
-                            "Catatan": "catatan",
-                            "Status": "status",
-                            "Tenggat_Waktu": "tenggat_waktu",
-                            "Tanggal_Bayar": "tanggal_bayar",
-                            "Sumber": "sumber"
-                        })
-                        
-                        # Hapus kolom yang tidak ada di database
-                        cols_to_keep = ["tanggal", "tipe", "kategori", "nominal", 
-                                       "catatan", "status", "tenggat_waktu", "tanggal_bayar", "sumber"]
-                        data_to_save = data_to_save[[c for c in cols_to_keep if c in data_to_save.columns]]
-                        
-                        records = data_to_save.to_dict(orient="records")
+                        # Ambil hanya yang berubah: diedit, ditambah, dihapus (berbasis id)
+                        kolom_edit = [c for c in KOLOM_TRANSAKSI.values() if c in edited_df.columns]
+                        diubah, ditambah, ids_hapus = ledger.diff_halaman(df_filter, edited_df, kolom_edit)
                         
-                        # Hapus semua data lama
-                        conn.table("transaksi").delete().neq("id", -1).execute()
+                        records_ubah = _ke_record_transaksi(diubah, dengan_id=True)
+                        records_baru = _ke_record_transaksi(ditambah)
                         
-                        # Insert data baru
-                        if records:
-                            conn.table("transaksi").insert(records).execute()
+                        # Satu upsert untuk baris yang diedit, satu insert untuk baris baru, satu delete in_()
+                        if records_ubah:
+                            conn.table("transaksi").upsert(records_ubah).execute()
+                        if records_baru:
+                            conn.table("transaksi").insert(records_baru).execute()
+                        if ids_hapus:
+                            conn.table("transaksi").delete().in_("id", ids_hapus).execute()
                         
-                        st.success(f"✅ {len(records)} transaksi berhasil disimpan!")
-                        st.cache_data.clear()
+                        st.success(f"✅ {len(records_ubah)} diubah, {len(records_baru)} ditambah, {len(ids_hapus)} dihapus!")
+                        invalidasi_tabel("transaksi")
                         st.rerun()
                         
                 except Exception as e:
@@ -2591,7 +3224,7 @@ if not df_tampil.empty:
     
     with col_simpan2:
         if st.button("🔄 Refresh", use_container_width=True):
-            st.cache_data.clear()
+            invalidasi_tabel("transaksi")
             st.rerun()
     
     # ===== TOMBOL HAPUS MASAL =====
@@ -2603,18 +3236,21 @@ if not df_tampil.empty:
         with col_hapus1:
             if st.button("Hapus Semua Data Bank", use_container_width=True):
                 conn.table("transaksi").delete().eq("sumber", "Bank").execute()
+                invalidasi_tabel("transaksi")
                 st.success("Data bank dihapus!")
                 st.rerun()
         
         with col_hapus2:
             if st.button("Hapus Semua Data Cash", use_container_width=True):
                 conn.table("transaksi").delete().eq("sumber", "Cash").execute()
+                invalidasi_tabel("transaksi")
                 st.success("Data cash dihapus!")
                 st.rerun()
         
         with col_hapus3:
             if st.button("Hapus SEMUA Data", use_container_width=True):
                 conn.table("transaksi").delete().neq("id", -1).execute()
+                invalidasi_tabel("transaksi")
                 st.success("Semua data dihapus!")
                 st.rerun()
         
@@ -2623,6 +3259,7 @@ if not df_tampil.empty:
             id_hapus = st.number_input("ID yang dihapus", min_value=1, step=1, key="id_hapus")
             if st.button("Hapus ID", use_container_width=True):
                 conn.table("transaksi").delete().eq("id", id_hapus).execute()
+                invalidasi_tabel("transaksi")
                 st.success(f"ID {id_hapus} dihapus!")
                 st.rerun()
 
@@ -2653,6 +3290,7 @@ else:
         ]
         for data in contoh:
             conn.table("transaksi").insert(data).execute()
+        invalidasi_tabel("transaksi")
         st.success("Contoh data ditambahkan!")
         st.rerun()
 
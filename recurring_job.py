@@ -0,0 +1,133 @@
+"""Job recurring expense: dijalankan dari cron atau tick harian di pub.py, bukan dari render.
+
+Tiap rule di recurring.csv dibuat paling banyak sekali per periode; jatuh tempo
+terakhir yang sudah diproses disimpan per rule di recurring_state.json.
+
+Contoh cron (tiap hari 00:05 WIB, dari folder app):
+    5 0 * * *  cd /path/ke/app && python recurring_job.py
+
+Opsi:
+    --dry-run   tampilkan transaksi yang akan dibuat, tanpa insert & tanpa update penanda
+    --catch-up  backfill semua jatuh tempo yang terlewat sejak penanda terakhir
+"""
+import argparse
+import datetime
+import json
+import os
+import threading
+import tomllib
+
+import pandas as pd
+
+import ledger
+
+RECURRING_FILE = "recurring.csv"
+STATE_FILE     = "recurring_state.json"
+
+# Tick harian dan tombol manual di app jalan di proses yang sama -> jangan barengan
+_lock = threading.Lock()
+
+
+def hari_ini_wib():
+    return (datetime.datetime.utcnow() + datetime.timedelta(hours=7)).date()
+
+
+def buat_client():
+    """Client Supabase dari secrets.toml (sama seperti pub.py)"""
+    from supabase import create_client
+
+    with open("secrets.toml", "rb") as f:
+        secrets_data = tomllib.load(f)
+    supabase = secrets_data["connections"]["supabase"]
+    return create_client(supabase["SUPABASE_URL"], supabase["SUPABASE_KEY"])
+
+
+def load_recurring():
+    if os.path.exists(RECURRING_FILE):
+        df = pd.read_csv(RECURRING_FILE)
+        df["Nominal"] = pd.to_numeric(df["Nominal"], errors="coerce").fillna(0)
+        return df
+    return pd.DataFrame(columns=["Nama","Kategori","Nominal","Tanggal_Mulai","Frekuensi","Aktif","Catatan"])
+
+
+def baca_penanda():
+    """{kunci_rule: "YYYY-MM-DD"} jatuh tempo terakhir per rule"""
+    try:
+        with open(STATE_FILE, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def simpan_penanda(penanda):
+    # Tulis ke file sementara dulu supaya file penanda tidak pernah setengah jadi
+    tmp = STATE_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(penanda, f, indent=4, ensure_ascii=False)
+    os.replace(tmp, STATE_FILE)
+
+
+def ambil_ledger(client, sejak):
+    """Kolom yang dipakai pengecekan duplikat saja, mulai tanggal `sejak`"""
+    res = (
+        client.table("transaksi")
+        .select("tanggal,kategori,catatan")
+        .gte("tanggal", sejak.strftime("%Y-%m-%d"))
+        .execute()
+    )
+    df = pd.DataFrame(res.data or [], columns=["tanggal", "kategori", "catatan"])
+    return df.rename(columns={"tanggal": "Tanggal", "kategori": "Kategori", "catatan": "Catatan"})
+
+
+def _ke_record(row):
+    record = {k.lower(): v for k, v in row.items()}
+    record["nominal"] = int(round(float(record["nominal"])))
+    return record
+
+
+def jalankan(client=None, today=None, dry_run=False, catch_up=False, log=print):
+    """Satu kali jalan job; return list transaksi yang dibuat (atau akan dibuat kalau dry_run)"""
+    today = today or hari_ini_wib()
+    with _lock:
+        df_recurring = load_recurring()
+        if df_recurring.empty:
+            log("Belum ada recurring expense.")
+            return []
+
+        penanda = baca_penanda()
+        client = client or buat_client()
+
+        # Cukup ambil ledger sejak jatuh tempo paling awal yang mungkin diproses
+        if catch_up:
+            sejak = pd.to_datetime(df_recurring["Tanggal_Mulai"], errors="coerce").min()
+            sejak = sejak.date() if pd.notna(sejak) else today
+            sejak = min([sejak] + [datetime.date.fromisoformat(v) for v in penanda.values()])
+        else:
+            sejak = today.replace(day=1) - datetime.timedelta(days=7)
+        df_main = ambil_ledger(client, sejak)
+
+        rows, penanda_baru = ledger.jadwal_recurring(df_recurring, df_main, today, penanda, catch_up)
+
+        for r in rows:
+            log(f"{'[dry-run] ' if dry_run else ''}{r['Tanggal']}  {r['Kategori']:<25} Rp {r['Nominal']:>12,.0f}  {r['Catatan']}")
+        if dry_run:
+            return rows
+
+        if rows:
+            # Satu batch insert untuk semua rule / semua periode
+            client.table("transaksi").insert([_ke_record(r) for r in rows]).execute()
+        simpan_penanda(penanda_baru)
+        log(f"{len(rows)} transaksi recurring dibuat.")
+        return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate transaksi recurring expense yang jatuh tempo.")
+    parser.add_argument("--dry-run", action="store_true", help="tampilkan saja, tidak insert")
+    parser.add_argument("--catch-up", action="store_true", help="backfill jatuh tempo yang terlewat")
+    args = parser.parse_args()
+    jalankan(dry_run=args.dry_run, catch_up=args.catch_up)
+
+
+if __name__ == "__main__":
+    main()
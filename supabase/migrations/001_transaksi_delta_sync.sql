@@ -0,0 +1,49 @@
+-- Delta sync tabel transaksi (dipakai sync_ledger() di pub.py)
+-- updated_at  : penanda baris baru / berubah
+-- transaksi_hapus : tombstone untuk baris yang dihapus
+
+alter table transaksi
+    add column if not exists updated_at timestamptz not null default now();
+
+create index if not exists transaksi_updated_at_idx on transaksi (updated_at);
+
+create or replace function set_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := now();
+    return new;
+end;
+$$;
+
+drop trigger if exists transaksi_set_updated_at on transaksi;
+create trigger transaksi_set_updated_at
+    before update on transaksi
+    for each row execute function set_updated_at();
+
+
+create table if not exists transaksi_hapus (
+    id           bigint primary key,
+    dihapus_pada timestamptz not null default now()
+);
+
+create index if not exists transaksi_hapus_dihapus_pada_idx on transaksi_hapus (dihapus_pada);
+
+create or replace function catat_transaksi_hapus()
+returns trigger
+language plpgsql
+as $$
+begin
+    insert into transaksi_hapus (id)
+    select id from lama
+    on conflict (id) do update set dihapus_pada = now();
+    return null;
+end;
+$$;
+
+drop trigger if exists transaksi_catat_hapus on transaksi;
+create trigger transaksi_catat_hapus
+    after delete on transaksi
+    referencing old table as lama
+    for each statement execute function catat_transaksi_hapus();
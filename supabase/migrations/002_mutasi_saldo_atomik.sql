@@ -0,0 +1,82 @@
+-- Mutasi saldo atomik (dipanggil lewat RPC dari pub.py)
+-- catat_transaksi_atomik : insert transaksi + ubah saldo cash dalam satu transaksi DB
+-- mutasi_tabungan_atomik : setor / tarik tabungan + catat histori dalam satu transaksi DB
+
+create or replace function catat_transaksi_atomik(
+    p_transaksi    jsonb,             -- array baris transaksi (kolom huruf kecil)
+    p_delta_cash   bigint default 0,  -- perubahan saldo cash (+ masuk, - keluar)
+    p_catatan_cash text   default ''
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_ids  bigint[];
+    v_cash bigint;
+begin
+    with baru as (
+        insert into transaksi (tanggal, tipe, kategori, nominal, catatan, status,
+                               tenggat_waktu, tanggal_bayar, sumber)
+        select r.tanggal, r.tipe, r.kategori, r.nominal, r.catatan, r.status,
+               r.tenggat_waktu, r.tanggal_bayar, r.sumber
+        from jsonb_populate_recordset(null::transaksi, p_transaksi) as r
+        returning id
+    )
+    select array_agg(id) into v_ids from baru;
+
+    if p_delta_cash <> 0 then
+        -- Serialisasi semua mutasi cash supaya tidak ada update yang hilang
+        perform pg_advisory_xact_lock(hashtext('cash'));
+
+        select coalesce((select nominal from cash order by created_at desc limit 1), 0) + p_delta_cash
+        into v_cash;
+
+        if v_cash < 0 then
+            raise exception 'Saldo cash tidak cukup (sisa %)', v_cash - p_delta_cash;
+        end if;
+
+        -- clock_timestamp(): urutan created_at ikut urutan lock, bukan awal transaksi
+        insert into cash (nominal, tanggal_update, catatan, created_at)
+        values (v_cash, (now() at time zone 'Asia/Jakarta')::date, p_catatan_cash, clock_timestamp());
+    end if;
+
+    return jsonb_build_object('ids', v_ids, 'cash', v_cash);
+end;
+$$;
+
+
+create or replace function mutasi_tabungan_atomik(
+    p_tabungan_id bigint,
+    p_delta       bigint,   -- + setor, - tarik
+    p_catatan     text default '',
+    p_tanggal     date default (now() at time zone 'Asia/Jakarta')::date
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_terkumpul bigint;
+    v_status    text;
+begin
+    update tabungan
+    set nominal_terkumpul = nominal_terkumpul + p_delta,
+        status = case
+            when p_delta > 0 and nominal_terkumpul + p_delta >= target_nominal then 'Selesai'
+            when p_delta > 0 then 'Aktif'
+            else status
+        end
+    where id = p_tabungan_id
+      and nominal_terkumpul + p_delta >= 0
+    returning nominal_terkumpul, status into v_terkumpul, v_status;
+
+    if not found then
+        raise exception 'Tabungan % tidak ada atau saldo tidak cukup', p_tabungan_id;
+    end if;
+
+    insert into transaksi_tabungan (tabungan_id, tanggal, nominal, tipe, catatan)
+    values (p_tabungan_id, p_tanggal, abs(p_delta),
+            case when p_delta > 0 then 'Setor' else 'Tarik' end, p_catatan);
+
+    return jsonb_build_object('terkumpul', v_terkumpul, 'status', v_status);
+end;
+$$;
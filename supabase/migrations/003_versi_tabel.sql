@@ -0,0 +1,47 @@
+-- Probe perubahan murah (dipakai probe_versi() di pub.py)
+-- versi_tabel : satu baris per tabel, versi naik setiap ada statement INSERT / UPDATE / DELETE
+-- pub.py baca tabel kecil ini dulu; fetch penuh hanya kalau versinya berubah
+
+create table if not exists versi_tabel (
+    tabel       text primary key,
+    versi       bigint not null default 0,
+    diubah_pada timestamptz not null default now()
+);
+
+insert into versi_tabel (tabel)
+values ('transaksi'), ('tabungan'), ('cash'), ('settings')
+on conflict (tabel) do nothing;
+
+create or replace function naikkan_versi_tabel()
+returns trigger
+language plpgsql
+as $$
+begin
+    insert into versi_tabel (tabel, versi)
+    values (tg_table_name, 1)
+    on conflict (tabel) do update
+        set versi = versi_tabel.versi + 1,
+            diubah_pada = now();
+    return null;
+end;
+$$;
+
+drop trigger if exists transaksi_naikkan_versi on transaksi;
+create trigger transaksi_naikkan_versi
+    after insert or update or delete or truncate on transaksi
+    for each statement execute function naikkan_versi_tabel();
+
+drop trigger if exists tabungan_naikkan_versi on tabungan;
+create trigger tabungan_naikkan_versi
+    after insert or update or delete or truncate on tabungan
+    for each statement execute function naikkan_versi_tabel();
+
+drop trigger if exists cash_naikkan_versi on cash;
+create trigger cash_naikkan_versi
+    after insert or update or delete or truncate on cash
+    for each statement execute function naikkan_versi_tabel();
+
+drop trigger if exists settings_naikkan_versi on settings;
+create trigger settings_naikkan_versi
+    after insert or update or delete or truncate on settings
+    for each statement execute function naikkan_versi_tabel();
@@ -0,0 +1,33 @@
+-- Sidik (fingerprint) transaksi untuk dedup import Mandiri (dipakai tab Mandiri di pub.py)
+-- sidik = md5('YYYY-MM-DD|nominal|catatan'), catatan = huruf kecil, spasi dirapikan,
+-- 20 karakter pertama. Rumusnya harus sama dengan ledger.sidik_transaksi().
+
+alter table transaksi
+    add column if not exists sidik text;
+
+-- Backfill baris lama; kalau sudah ada duplikat, hanya baris pertama yang diberi sidik
+-- supaya unique index di bawah bisa dibuat.
+with dihitung as (
+    select
+        id,
+        md5(
+            left(tanggal::text, 10) || '|' ||
+            round(nominal)::bigint::text || '|' ||
+            left(lower(btrim(regexp_replace(coalesce(catatan, ''), '\s+', ' ', 'g'))), 20)
+        ) as sidik
+    from transaksi
+    where sidik is null
+),
+berurut as (
+    select id, sidik, row_number() over (partition by sidik order by id) as urutan
+    from dihitung
+)
+update transaksi t
+set sidik = b.sidik
+from berurut b
+where t.id = b.id
+  and b.urutan = 1
+  and not exists (select 1 from transaksi x where x.sidik = b.sidik);
+
+-- Sidik kosong (input manual) boleh kembar; yang terisi dijaga unik
+create unique index if not exists transaksi_sidik_key on transaksi (sidik);
@@ -0,0 +1,46 @@
+-- Sidik ikut diperbarui kalau tanggal / nominal / catatan diedit (editor Log Transaksi dsb.)
+-- Tanpa ini sidik lama tertinggal: transaksi asli berikutnya dengan nilai lama itu
+-- ditolak upsert ignore_duplicates. Rumus sama dengan migrasi 004 / ledger.sidik_transaksi().
+
+create or replace function sidik_transaksi(t transaksi)
+returns text
+language sql
+immutable
+as $$
+    select md5(
+        left(t.tanggal::text, 10) || '|' ||
+        round(t.nominal)::bigint::text || '|' ||
+        left(lower(btrim(regexp_replace(coalesce(t.catatan, ''), '\s+', ' ', 'g'))), 20)
+    );
+$$;
+
+create or replace function perbarui_sidik()
+returns trigger
+language plpgsql
+as $$
+declare
+    v_sidik text;
+begin
+    -- Baris tanpa sidik (input manual) tetap tanpa sidik; sidik yang di-set eksplisit dihormati
+    if old.sidik is null or new.sidik is distinct from old.sidik then
+        return new;
+    end if;
+
+    v_sidik := sidik_transaksi(new);
+    -- Sidik baru sudah dipakai baris lain -> kosongkan (sama seperti backfill 004),
+    -- supaya edit tidak gagal karena unique index
+    if v_sidik is not null
+       and exists (select 1 from transaksi where sidik = v_sidik and id <> new.id) then
+        v_sidik := null;
+    end if;
+    new.sidik := v_sidik;
+    return new;
+end;
+$$;
+
+drop trigger if exists transaksi_perbarui_sidik on transaksi;
+create trigger transaksi_perbarui_sidik
+    before update of tanggal, nominal, catatan on transaksi
+    for each row
+    when ((new.tanggal, new.nominal, new.catatan) is distinct from (old.tanggal, old.nominal, old.catatan))
+    execute function perbarui_sidik();